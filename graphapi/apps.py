@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class GraphapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'graphapi'
+
+    def ready(self):
+        # Starts the boot clock only: the preload and the warm-up run from
+        # kgbackend/wsgi.py / asgi.py, so manage.py commands skip them
+        from graphapi.services import startup  # noqa: F401
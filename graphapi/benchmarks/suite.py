@@ -0,0 +1,363 @@
+import inspect
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from graphapi.benchmarks.synthetic import FakeLLMClient, SyntheticGraph, populate
+from graphapi.services import graph_read, graph_write, llm_gateway, query_engine
+from graphapi.services.backends import set_backend
+from graphapi.services.backends.memory import MemoryGraph
+from graphapi.services.backends.neo4j import Neo4jBackend
+from graphapi.services.cache import read_cache
+from graphapi.services.diagnosis import diagnosis_ranker
+from graphapi.services.entity_matcher import entity_matcher
+from graphapi.services.entity_resolver import entity_resolver
+from graphapi.services.extraction_cache import extraction_cache
+
+
+# ======================================================
+#           MICROBENCHMARKS (SERVICE LAYER / ENGINE)
+# ======================================================
+#
+# One case per public function of graph_read / graph_write plus the query
+# engine stages, with FakeLLMClient instead of Groq. Backends:
+#   synthetic -> the Cypher backend against SyntheticGraph: measures our own
+#                code (query building, row handling, matching, reasoning),
+#                not the network
+#   memory    -> the embedded MemoryGraph, populated at the requested size
+
+QUESTIONS = {
+    "possible_diseases": "What diseases can be indicated by symptom 12 and symptom 40?",
+    "symptoms_of_disease": "What symptoms are associated with disease 7?",
+    "treatments_for_disease": "What treatments are recommended for disease 7?",
+    "visits_of_patient": "Show the visits of patient 3",
+    "tests_of_visit": "What tests were performed during visit V001?",
+}
+
+# LLM answers for questions the matcher cannot settle
+RECORDED_LLM = {
+    "Which illness could explain a sore throat and fever?": {
+        "intent": "",
+        "symptoms": ["sore throat", "fever"],
+        "diseases": [],
+        "patients": [],
+        "tests": [],
+        "observations": [],
+        "visits": [],
+    },
+}
+LLM_QUESTION = "Which illness could explain a sore throat and fever?"
+
+
+def _analysis(intent: str, **entities) -> dict:
+    analysis = {
+        "intent": intent,
+        "symptoms": [],
+        "diseases": [],
+        "patients": [],
+        "tests": [],
+        "observations": [],
+        "visits": [],
+    }
+    analysis.update(entities)
+    return analysis
+
+
+# Two-clause questions: one plan, one round trip
+PLANNED_QUESTIONS = {
+    "patient_then_diseases": "What are the symptoms of patient 3 and what diseases could they indicate?",
+    "treatments_and_visits": "What treatments are recommended for disease 7 and what visits did patient 3 have?",
+}
+
+# One question per declared intent (intents.py), for the classification throughput
+INTENT_QUESTIONS = {
+    "observations_of_visit": "What observations were recorded during visit V{n:03}?",
+    "tests_of_visit": "What tests were performed during visit V{n:03}?",
+    "visits_of_patient": "Show the visits of patient {n}",
+    "symptoms_of_disease": "What symptoms are associated with disease {n}?",
+    "possible_diseases": "What diseases can be indicated by symptom {n} and symptom 40?",
+    "treatments_for_disease": "What treatments are recommended for disease {n}?",
+    "tests_for_disease": "Which tests are used to diagnose disease {n}?",
+    "observations_for_disease": "Which observations support disease {n}?",
+    "symptoms_of_patient": "What are the symptoms of patient {n}?",
+    "risk_factors_of_patient": "What risk factors does patient {n} have?",
+    "diseases_diagnosed_by_test": "Which diseases can test {n} detect?",
+    "diseases_supported_by_observation": "Which diseases does observation {n} support?",
+}
+CLASSIFY_QUESTIONS = 100_000
+
+ANALYSES = {
+    "possible_diseases": _analysis("possible_diseases", symptoms=["fever", "cough", "fatigue"]),
+    "symptoms_of_disease": _analysis("symptoms_of_disease", diseases=["flu", "covid-19"]),
+    "visits_of_patient": _analysis("visits_of_patient", patients=["omar"]),
+    "observations_of_visit": _analysis("observations_of_visit", visits=["V001"]),
+}
+
+
+def _batch(func, items: int):
+    """Cas qui traite `items` éléments par appel : le rapport donne aussi le débit."""
+    func.items = items
+    return func
+
+
+def _intent_corpus(n: int) -> list:
+    # Entities matched once per template: the intent only depends on which
+    # lists are filled, the question text changes with n
+    templates = []
+    for template in INTENT_QUESTIONS.values():
+        analysis = query_engine.match_entities(template.format(n=3))[0] or _analysis("")
+        templates.append((template, analysis))
+    return [
+        (template.format(n=i), analysis)
+        for i in range(n // len(templates) + 1)
+        for template, analysis in templates
+    ][:n]
+
+
+def _consume(iterator):
+    for _ in iterator:
+        pass
+
+
+def _bulk_rows(n: int) -> tuple[list, list]:
+    nodes = [{"label": "Patient", "props": {"name": f"bench {i}", "age": i % 90}} for i in range(n)]
+    rels = [{"type": "HAS_SYMPTOM", "from": f"bench {i}", "to": f"symptom {i % 50}"} for i in range(n)]
+    return nodes, rels
+
+
+def read_cases() -> dict:
+    r = graph_read
+    return {
+        "all_symptoms": lambda: r.all_symptoms(),
+        "all_diseases": lambda: r.all_diseases(),
+        "all_patients": lambda: r.all_patients(),
+        "all_tests": lambda: r.all_tests(),
+        "all_observations": lambda: r.all_observations(),
+        "list_patients": lambda: r.list_patients(limit=50),
+        "stream_patients": lambda: _consume(r.stream_patients()),
+        "get_patient": lambda: r.get_patient("omar"),
+        "patient_symptoms": lambda: r.patient_symptoms("omar"),
+        "patient_risk_factors": lambda: r.patient_risk_factors("omar"),
+        "patient_visits": lambda: r.patient_visits("omar", limit=50),
+        "stream_patient_visits": lambda: _consume(r.stream_patient_visits("omar")),
+        "visit_observations": lambda: r.visit_observations("V001", limit=50),
+        "stream_visit_observations": lambda: _consume(r.stream_visit_observations("V001")),
+        "visit_tests": lambda: r.visit_tests("V001"),
+        "diseases_for_symptom": lambda: r.diseases_for_symptom("fever"),
+        "symptoms_for_disease": lambda: r.symptoms_for_disease("flu"),
+        "treatments_for_disease": lambda: r.treatments_for_disease("flu"),
+        "diseases_for_test": lambda: r.diseases_for_test("pcr"),
+        "diseases_for_observation": lambda: r.diseases_for_observation("temperature"),
+        "tests_for_disease": lambda: r.tests_for_disease("flu"),
+        "diseases_for_symptoms": lambda: r.diseases_for_symptoms(["fever", "cough", "fatigue"]),
+        "symptoms_for_diseases": lambda: r.symptoms_for_diseases(["flu", "covid-19"]),
+        "treatments_for_diseases": lambda: r.treatments_for_diseases(["flu", "covid-19"]),
+        "tests_for_diseases": lambda: r.tests_for_diseases(["flu", "covid-19"]),
+        "observations_for_diseases": lambda: r.observations_for_diseases(["flu", "covid-19"]),
+        "symptom_disease_weights": lambda: _consume(r.symptom_disease_weights()),
+        "search_graph": lambda: r.search_graph("chest pain", limit=20),
+        "search_graph[prefix]": lambda: r.search_graph("fev", limit=20, mode="prefix"),
+        "stream_search": lambda: _consume(r.stream_search("fever")),
+    }
+
+
+def write_cases() -> dict:
+    w = graph_write
+    nodes, rels = _bulk_rows(1000)
+    return {
+        "merge_node": lambda: w.merge_node("Symptom", {"name": "fever", "code": "R50"}),
+        "create_patient": lambda: w.create_patient("omar", age=40, gender="M"),
+        "patient_add_symptom": lambda: w.patient_add_symptom("omar", "fever", severity="high", onset_days=2),
+        "patient_add_risk_factor": lambda: w.patient_add_risk_factor("omar", "smoking", category="lifestyle"),
+        "patient_add_visit": lambda: w.patient_add_visit("omar", "V001", date="2024-01-01", reason="fever"),
+        "visit_add_observation": lambda: w.visit_add_observation("V001", "temperature", 39.2, unit="C"),
+        "visit_add_test": lambda: w.visit_add_test("V001", "pcr", test_type="lab"),
+        "symptom_indicates_disease": lambda: w.symptom_indicates_disease("fever", "flu", weight=0.8),
+        "disease_add_treatment": lambda: w.disease_add_treatment("flu", "rest", line=1, recommended=True),
+        "test_used_for_diagnosis": lambda: w.test_used_for_diagnosis("pcr", "covid-19"),
+        "observation_supports_disease": lambda: w.observation_supports_disease("temperature", "flu"),
+        "bulk_write[1000+1000]": lambda: w.bulk_write(nodes, rels, chunk_size=500),
+    }
+
+
+def engine_cases() -> dict:
+    q = query_engine
+    cases = {}
+    for intent, question in QUESTIONS.items():
+        analysis = q.match_entities(question)[0] or _analysis("")
+        cases[f"infer_intent[{intent}]"] = (lambda qu=question, a=analysis: q.infer_intent(qu, a))
+    for intent, analysis in ANALYSES.items():
+        cases[f"execute_graph_queries[{intent}]"] = (lambda a=analysis: q.execute_graph_queries(a))
+        results = q.execute_graph_queries(analysis)
+        cases[f"build_reasoning[{intent}]"] = (
+            lambda a=analysis, res=results: q.build_reasoning("question", a, res)
+        )
+    for intent, question in QUESTIONS.items():
+        cases[f"process_query[{intent}]"] = (lambda qu=question: q.process_query(qu))
+    cases["process_query[llm]"] = lambda: q.process_query(LLM_QUESTION)
+    for name, question in PLANNED_QUESTIONS.items():
+        analysis = q.match_entities(question)[0] or _analysis("")
+        plan = q.plan_intents(question, analysis)
+        cases[f"plan_intents[{name}]"] = (lambda qu=question, a=analysis: q.plan_intents(qu, a))
+        cases[f"execute_plan[{name}]"] = (lambda p=plan, a=analysis: q.execute_plan(p, a))
+    corpus = _intent_corpus(CLASSIFY_QUESTIONS)
+    cases["infer_intent[100k questions]"] = _batch(
+        lambda: [q.infer_intent(qu, a) for qu, a in corpus], len(corpus)
+    )
+    cases["resolve_entities[typos]"] = lambda: q.resolve_entities(
+        _analysis("", symptoms=["feaver", "sore throaat"], patients=["omarr"])
+    )
+    symptoms = ANALYSES["possible_diseases"]["symptoms"]
+    cases["rank_diseases[k=10]"] = lambda: diagnosis_ranker.rank(symptoms, k=10)
+    return cases
+
+
+GROUPS = {
+    "read": read_cases,
+    "write": write_cases,
+    "engine": engine_cases,
+}
+
+
+def uncovered_functions() -> list[str]:
+    """Fonctions publiques de graph_read / graph_write sans cas de benchmark."""
+    covered = {name.split("[")[0] for name in (*read_cases(), *write_cases())}
+    missing = []
+    for module in (graph_read, graph_write):
+        for name, obj in inspect.getmembers(module, inspect.isfunction):
+            if name.startswith("_") or obj.__module__ != module.__name__:
+                continue
+            if name not in covered:
+                missing.append(f"{module.__name__}.{name}")
+    return missing
+
+
+# ---------------------------
+# ENVIRONMENT
+# ---------------------------
+
+BACKENDS = ("synthetic", "memory")
+
+
+@contextmanager
+def offline_environment(nodes: int, graph_latency: float = 0.0, llm_latency: float = 0.0,
+                        backend: str = "synthetic"):
+    """Graphe hors ligne, LLM enregistré, caches neutralisés (chaque appel fait le travail)."""
+    if backend == "memory":
+        graph = populate(MemoryGraph(), nodes)
+        selected = graph
+    else:
+        graph = SyntheticGraph(nodes, latency=graph_latency)
+        selected = Neo4jBackend(graph)
+    llm = FakeLLMClient(RECORDED_LLM, latency=llm_latency)
+    with ExitStack() as stack:
+        stack.callback(set_backend, set_backend(selected))
+        stack.enter_context(mock.patch.object(graph_write, "bump", lambda scopes: None))
+        # Recorded answers, no account limits: every question reaches the fake
+        stack.enter_context(mock.patch.object(llm_gateway, "get_client", lambda: llm))
+        stack.enter_context(mock.patch.object(llm_gateway.llm_gateway, "requests", llm_gateway.TokenBucket(0)))
+        stack.enter_context(mock.patch.object(llm_gateway.llm_gateway, "tokens", llm_gateway.TokenBucket(0)))
+        stack.enter_context(mock.patch.object(read_cache, "max_entries", 0))
+        stack.enter_context(mock.patch.object(extraction_cache, "path", ""))
+        stack.enter_context(mock.patch.object(entity_matcher, "ttl", float("inf")))
+        stack.enter_context(mock.patch.object(entity_matcher, "background", False))
+        stack.enter_context(mock.patch.object(diagnosis_ranker, "ttl", float("inf")))
+        stack.enter_context(mock.patch.object(entity_resolver, "ttl", float("inf")))
+        for index in (entity_matcher, diagnosis_ranker, entity_resolver):
+            index.mark_stale()
+        try:
+            yield graph, llm
+        finally:
+            for index in (entity_matcher, diagnosis_ranker, entity_resolver):
+                index.mark_stale()
+
+
+# ---------------------------
+# TIMING
+# ---------------------------
+
+def measure(func, min_time: float = 0.2, min_runs: int = 5, max_runs: int = 10000) -> dict:
+    func()  # warm-up (imports, automaton build, ...)
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() < deadline):
+        t = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t)
+
+    timings.sort()
+    mean = statistics.fmean(timings)
+    return {
+        "runs": len(timings),
+        "mean_us": round(mean * 1e6, 2),
+        "median_us": round(statistics.median(timings) * 1e6, 2),
+        "p95_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1e6, 2),
+        "min_us": round(timings[0] * 1e6, 2),
+        "ops_per_sec": round(1 / mean, 1) if mean > 0 else None,
+    }
+
+
+def run(sizes, groups=None, pattern: str = "", min_time: float = 0.2, max_runs: int = 10000, log=print,
+        backend: str = "synthetic") -> list:
+    results = []
+    for label, nodes in sizes:
+        with offline_environment(nodes, backend=backend):
+            for group in groups or GROUPS:
+                for name, func in GROUPS[group]().items():
+                    if pattern and pattern not in name:
+                        continue
+                    stats = measure(func, min_time=min_time, max_runs=max_runs)
+                    items = getattr(func, "items", None)
+                    if items and stats["median_us"]:
+                        stats["items_per_sec"] = round(items / stats["median_us"] * 1e6)
+                    results.append({
+                        "backend": backend, "group": group, "name": name, "size": label, "nodes": nodes, **stats,
+                    })
+                    throughput = f", {stats['items_per_sec']:,}/s" if "items_per_sec" in stats else ""
+                    log(f"{label:>6} {group:<7} {name:<42} {stats['median_us']:>12,.1f} µs  "
+                        f"({stats['runs']} runs{throughput})")
+    return results
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(baseline: list, current: list, threshold: float = 0.10) -> list:
+    """Lignes (nom, taille, avant, après, ratio, régression?) pour les cas communs aux deux runs."""
+    def case(r):
+        return r.get("backend", "synthetic"), r["group"], r["name"], r["size"]
+
+    before = {case(r): r for r in baseline}
+    rows = []
+    for r in current:
+        old = before.get(case(r))
+        if old is None or not old["median_us"]:
+            continue
+        ratio = r["median_us"] / old["median_us"]
+        rows.append({
+            "backend": r.get("backend", "synthetic"),
+            "group": r["group"],
+            "name": r["name"],
+            "size": r["size"],
+            "before_us": old["median_us"],
+            "after_us": r["median_us"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
@@ -0,0 +1,331 @@
+import json
+import random
+import re
+import time
+import zlib
+from types import SimpleNamespace
+
+from graphapi.services.schema import NODE_KEYS, RELATIONSHIPS
+
+
+# ======================================================
+#       DETERMINISTIC GRAPH STAND-IN (NO NEO4J NEEDED)
+# ======================================================
+#
+# SyntheticGraph answers the Cypher sent by graph_read / graph_write with rows
+# of the right shape: the columns are read from the RETURN clause and the
+# number of rows follows the graph size (label-wide scans), the page size
+# ($limit) or the average fan-out of the relationship in the query. The same
+# query and parameters always give the same rows, so runs are comparable.
+
+# Share of the nodes per label
+LABEL_SHARES = {
+    "Patient": 0.20,
+    "Visit": 0.30,
+    "Observation": 0.25,
+    "Symptom": 0.06,
+    "Disease": 0.06,
+    "Treatment": 0.05,
+    "Test": 0.05,
+    "RiskFactor": 0.03,
+}
+
+# Average number of neighbours reached through one relationship
+FANOUT = {
+    "HAS_SYMPTOM": 5,
+    "HAS_RISK_FACTOR": 2,
+    "HAS_VISIT": 3,
+    "HAS_OBSERVATION": 8,
+    "HAS_TEST": 3,
+    "INDICATES": 6,
+    "TREATED_BY": 4,
+    "USED_FOR_DIAGNOSIS_OF": 3,
+    "SUPPORTS": 4,
+}
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+
+_RETURN = re.compile(r"\bRETURN\b(?!.*\bRETURN\b)(.*?)(?:\bORDER BY\b|\bSKIP\b|\bLIMIT\b|$)", re.S)
+_LABEL = re.compile(r"\(\w*:(\w+)")
+_REL = re.compile(r"\[\w*:(\w+)\]")
+_ALIAS = re.compile(r"\bAS\s+(\w+)\s*$", re.I)
+_LIST_COLUMNS = {"matched", "labels", "symptoms", "treatments", "tests", "observations"}
+_INT_COLUMNS = {"age", "match_count", "onset_days", "updated"}
+_FLOAT_COLUMNS = {"score", "value", "weight"}
+# Query plans (backends.neo4j.compile_plan): one unit subquery per read
+_PLAN_PART = re.compile(r"CALL \{\n  CALL \{\n(.*?)\n  \}\n  RETURN collect\(.*?\) AS r(\d+)\n\}", re.S)
+
+
+def parse_size(value) -> int:
+    if isinstance(value, int):
+        return value
+    if value in SIZES:
+        return SIZES[value]
+    return int(float(value))
+
+
+def return_columns(query: str) -> list[str]:
+    match = _RETURN.search(query)
+    if not match:
+        return []
+    columns, depth, current = [], 0, ""
+    for ch in match.group(1):
+        if ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        if ch == "," and depth == 0:
+            columns.append(current)
+            current = ""
+        else:
+            current += ch
+    columns.append(current)
+
+    names = []
+    for column in columns:
+        column = column.strip()
+        alias = _ALIAS.search(column)
+        names.append(alias.group(1) if alias else column.split(".")[-1])
+    return [n for n in names if n]
+
+
+class SyntheticGraph:
+    """Remplace GraphConnection : mêmes méthodes read / write / stream / auto_commit."""
+
+    def __init__(self, nodes: int = 1000, latency: float = 0.0):
+        self.nodes = nodes
+        self.latency = latency
+        self.counts = {label: max(1, int(nodes * share)) for label, share in LABEL_SHARES.items()}
+        self.database = None
+        self.queries = 0
+        self.rows = 0
+
+    # ---------------------------
+    # CONNECTION API
+    # ---------------------------
+
+    def read(self, query: str, /, **params) -> list[dict]:
+        if query.startswith("CALL {\n  CALL {"):
+            return [self._answer_plan(query, params)]
+        return self._answer(query, params)
+
+    def write(self, query: str, /, **params) -> list[dict]:
+        if "UNWIND $rows" in query:
+            # bulk_write chunks: nothing is returned, the cost is the rows sent
+            self._answer_count(len(params.get("rows", ())))
+            return []
+        return self._answer(query, params, limit=1)
+
+    auto_commit = write
+
+    def stream(self, query: str, /, **params):
+        yield from self._answer(query, params)
+
+    def read_transaction(self, work, *args, **kwargs):
+        return work(SimpleNamespace(run=lambda q, p=None, **kw: _Result(self.read(q, **(p or {}), **kw))), *args, **kwargs)
+
+    write_transaction = read_transaction
+
+    def metrics(self) -> dict:
+        return {"synthetic": True, "nodes": self.nodes, "queries": self.queries, "rows": self.rows}
+
+    # ---------------------------
+    # ROW GENERATION
+    # ---------------------------
+
+    def _answer_count(self, n: int):
+        self.queries += 1
+        self.rows += n
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _row_count(self, query: str, params: dict) -> int:
+        rels = _REL.findall(query)
+        labels = _LABEL.findall(query)
+        if "limit" in params:
+            if rels:
+                available = FANOUT.get(rels[0], 5) * 20
+            else:
+                available = self.counts.get(labels[0], self.nodes) if labels else self.nodes
+            return min(int(params["limit"]), available)
+        if "UNWIND $" in query:
+            items = next((v for v in params.values() if isinstance(v, list)), [])
+            return len(items) * (FANOUT.get(rels[0], 5) if rels and "collect(DISTINCT" in query else 1)
+        if rels:
+            # Relationship scan (diagnosis matrix): every start node's neighbours
+            scanned = self.counts.get(labels[0], 1) if labels and not params else 1
+            return FANOUT.get(rels[0], 5) * scanned
+        if labels and not params:
+            return self.counts.get(labels[0], 0)
+        return 1
+
+    def _answer_plan(self, query: str, params: dict) -> dict:
+        # Each read of the plan is answered as if it had been sent alone
+        row = {}
+        for body, i in _PLAN_PART.findall(query):
+            prefix = f"p{i}_"
+            sub_params = {k[len(prefix):]: v for k, v in params.items() if k.startswith(prefix)}
+            row[f"r{i}"] = self._answer(body.replace(f"${prefix}", "$"), sub_params)
+        return row
+
+    def _answer(self, query: str, params: dict, limit: int | None = None) -> list[dict]:
+        columns = return_columns(query)
+        labels = _LABEL.findall(query)
+        rels = _REL.findall(query)
+        n = self._row_count(query, params) if limit is None else limit
+        self._answer_count(n)
+
+        # Target label of the rows: the last node pattern of the query
+        target = (labels[-1] if labels else "Node").lower()
+        seed = zlib.crc32((query + json.dumps(params, sort_keys=True, default=str)).encode("utf-8"))
+        after = str(params.get("after_key") or "")
+        fanout = FANOUT.get(rels[0], 5) if rels else 5
+        # Label scans (all_symptoms...) name the nodes "symptom 0", "symptom 1"...
+        # so that benchmark questions can mention entities that exist
+        scan = bool(labels) and not rels and not params
+        rows = [self._row(columns, target, seed, i, after, fanout, scan) for i in range(n)]
+
+        # Batched lookups (UNWIND $names): rows echo the names they were asked for
+        items = next((v for v in params.values() if isinstance(v, list)), None) if "UNWIND $" in query else None
+        if items:
+            keys = [str(item).strip().lower() for item in items]
+            for i, row in enumerate(rows):
+                if "matched" in row:
+                    row["matched"] = keys[:1 + i % len(keys)]
+                    row["match_count"] = len(row["matched"])
+                elif columns:
+                    row[columns[0]] = keys[i % len(keys)]
+
+        # Relationship scans: `fanout` consecutive rows per start node
+        if rels and labels and not params:
+            start = labels[0].lower()
+            for i, row in enumerate(rows):
+                if start in row:
+                    row[start] = f"{start} {i // fanout}"
+        return rows
+
+    def _row(self, columns, target: str, seed: int, i: int, after: str, fanout: int, scan: bool = False) -> dict:
+        ident = i if scan else (seed + i * 7919) % max(1, self.nodes)
+        row = {}
+        for column in columns:
+            if column == "_key":
+                row[column] = f"{after}{i:08d}"
+            elif column == "_id":
+                row[column] = f"4:synthetic:{ident}"
+            elif column in _LIST_COLUMNS:
+                if column == "labels":
+                    row[column] = [target.capitalize()]
+                else:
+                    row[column] = [f"{column[:-1]} {(ident + k) % 997}" for k in range(fanout)]
+            elif column in _INT_COLUMNS:
+                row[column] = ident % 90
+            elif column in _FLOAT_COLUMNS:
+                row[column] = round(1.0 / (i + 1), 4)
+            elif column in NODE_KEYS.values() or column in ("disease", "symptom", "treatment", "test",
+                                                             "observation", "risk_factor", "visit_id", "key",
+                                                             "disease_key"):
+                row[column] = f"{target} {ident}"
+            else:
+                row[column] = f"{column} {ident % 101}"
+        return row
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return self.rows
+
+
+# ======================================================
+#          POPULATED EMBEDDED GRAPH (GRAPH_BACKEND=memory)
+# ======================================================
+#
+# Same label shares and fan-outs as SyntheticGraph, stored for real in a
+# MemoryGraph. The first nodes carry the names used by the benchmark cases
+# (omar, V001, fever, flu...), the others "<label> <n>".
+
+SEED_NAMES = {
+    "Patient": ["omar"],
+    "Visit": ["V001"],
+    "Symptom": ["fever", "cough", "fatigue", "chest pain", "sore throat"],
+    "Disease": ["flu", "covid-19"],
+    "Treatment": ["rest"],
+    "Test": ["pcr"],
+    "Observation": ["temperature"],
+    "RiskFactor": ["smoking"],
+}
+
+
+def _node_props(label: str, i: int, rng: random.Random) -> dict:
+    seeds = SEED_NAMES.get(label, [])
+    props = {NODE_KEYS[label]: seeds[i] if i < len(seeds) else f"{label.lower()} {i}"}
+    if label == "Patient":
+        props.update(age=rng.randint(1, 95), gender=rng.choice(["F", "M"]))
+    elif label == "Visit":
+        props.update(date=f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", reason="check-up")
+    elif label == "Observation":
+        props.update(value=round(rng.uniform(35, 41), 1), unit="C")
+    elif label == "Test":
+        props.update(type=rng.choice(["lab", "imaging"]))
+    return props
+
+
+def _edge_props(rel_type: str, rng: random.Random):
+    if rel_type == "HAS_SYMPTOM":
+        return {"severity": rng.choice(["low", "medium", "high"]), "onset_days": rng.randint(0, 30)}
+    if rel_type == "INDICATES":
+        return {"weight": round(rng.random(), 3)}
+    return None
+
+
+def populate(graph, nodes: int, seed: int = 0):
+    """Remplit une MemoryGraph vide : nœuds puis relations (voisins tirés sans doublon)."""
+    rng = random.Random(seed or nodes)
+    counts = {label: max(1, int(nodes * share)) for label, share in LABEL_SHARES.items()}
+    for label, count in counts.items():
+        for i in range(count):
+            graph.add_node(label, _node_props(label, i, rng))
+    for rel_type, (start, end) in RELATIONSHIPS.items():
+        fanout = min(FANOUT.get(rel_type, 5), counts[end])
+        for a in range(counts[start]):
+            for b in rng.sample(range(counts[end]), fanout):
+                graph.add_edge(rel_type, a, b, _edge_props(rel_type, rng))
+    graph.compact()
+    return graph
+
+
+# ======================================================
+#                 RECORDED / FAKE LLM CLIENT
+# ======================================================
+
+class FakeLLMClient:
+    """
+    Même interface que groq.Groq (client.chat.completions.create).
+    Rejoue les réponses enregistrées, sinon renvoie une extraction vide.
+    """
+
+    def __init__(self, recorded: dict | None = None, latency: float = 0.0):
+        self.recorded = recorded or {}
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]["content"] if messages else ""
+        question = prompt.rsplit("QUESTION:", 1)[-1].strip()
+        payload = self.recorded.get(question) or {
+            "intent": "",
+            "symptoms": [],
+            "diseases": [],
+            "patients": [],
+            "tests": [],
+            "observations": [],
+            "visits": [],
+        }
+        message = SimpleNamespace(content=json.dumps(payload))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
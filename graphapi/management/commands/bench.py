@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from graphapi.benchmarks import suite
+from graphapi.benchmarks.synthetic import SIZES, parse_size
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the service-layer microbenchmarks offline (synthetic graph, recorded "
+        "LLM answers) and save the results as JSON to compare commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1k", help=f"Comma-separated graph sizes ({', '.join(SIZES)} or a number)")
+        parser.add_argument("--backend", choices=suite.BACKENDS, default="synthetic",
+                            help="synthetic: Cypher backend on a stand-in graph; memory: embedded graph")
+        parser.add_argument("--group", action="append", choices=list(suite.GROUPS), help="Only these groups")
+        parser.add_argument("-k", dest="pattern", default="", help="Only cases whose name contains this text")
+        parser.add_argument("--min-time", type=float, default=0.2, help="Seconds spent per case")
+        parser.add_argument("--max-runs", type=int, default=10000, help="Upper bound on runs per case")
+        parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+        parser.add_argument("--compare", help="Previous results file to compare against")
+        parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown reported as a regression")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [(s.strip(), parse_size(s.strip())) for s in options["sizes"].split(",") if s.strip()]
+        except ValueError as exc:
+            raise CommandError(f"Invalid --sizes: {exc}")
+
+        missing = suite.uncovered_functions()
+        if missing:
+            self.stderr.write(self.style.WARNING("No benchmark for: " + ", ".join(missing)))
+
+        results = suite.run(
+            sizes,
+            groups=options["group"],
+            pattern=options["pattern"],
+            min_time=options["min_time"],
+            max_runs=options["max_runs"],
+            log=self.stdout.write,
+            backend=options["backend"],
+        )
+        report = {"meta": {**suite.metadata(), "sizes": dict(sizes), "backend": options["backend"]}, "results": results}
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} results written to {options['output']}"))
+
+        if options["compare"]:
+            self._compare(options)
+
+    def _compare(self, options):
+        try:
+            with open(options["compare"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            with open(options["output"], encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot compare: {exc}")
+
+        rows = suite.compare(baseline["results"], current["results"], threshold=options["threshold"])
+        regressions = [r for r in rows if r["regression"]]
+        self.stdout.write(f"\nCompared with {options['compare']} (commit {baseline['meta'].get('commit')}):")
+        for r in sorted(rows, key=lambda r: -r["ratio"]):
+            line = (f"{r['size']:>6} {r['group']:<7} {r['name']:<42} "
+                    f"{r['before_us']:>12,.1f} → {r['after_us']:>12,.1f} µs  x{r['ratio']:.2f}")
+            self.stdout.write(self.style.ERROR(line) if r["regression"] else line)
+
+        if regressions:
+            message = f"{len(regressions)} regressions over {options['threshold']:.0%}"
+            if options["fail_on_regression"]:
+                raise CommandError(message)
+            self.stderr.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No regression"))
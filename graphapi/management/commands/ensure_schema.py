@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from graphapi.services.db import get_graph
+from graphapi.services.schema import (
+    UNIQUE_LABELS,
+    backfill_keys,
+    duplicate_keys,
+    schema_statements,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the uniqueness constraints and indexes used by graph_read "
+        "(n.key per label), optionally backfilling n.key on existing nodes first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", action="store_true", help="Compute n.key on nodes that lack it")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Nodes per backfill transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Print the statements without running them")
+
+    def handle(self, *args, **options):
+        statements = schema_statements()
+        if options["dry_run"]:
+            for statement in statements:
+                self.stdout.write(statement + ";")
+            return
+
+        if getattr(settings, "GRAPH_BACKEND", "neo4j") != "neo4j":
+            raise CommandError("ensure_schema only applies to GRAPH_BACKEND=neo4j")
+
+        graph = get_graph()
+
+        if options["backfill"]:
+            backfill_keys(graph, batch_size=options["batch_size"], log=self.stdout.write)
+
+        failed = 0
+        for statement in statements:
+            try:
+                graph.auto_commit(statement)
+                self.stdout.write(f"OK  {statement}")
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"ERR {statement}\n    {exc}")
+
+        # A uniqueness constraint cannot be created while two nodes share a key
+        for label in UNIQUE_LABELS:
+            duplicates = duplicate_keys(graph, label)
+            if duplicates:
+                failed += 1
+                listed = ", ".join(f"{d['key']!r} x{d['nodes']}" for d in duplicates)
+                self.stderr.write(f"{label}: duplicate keys must be merged first: {listed}")
+
+        if failed:
+            self.stderr.write(self.style.WARNING(f"Schema partially applied ({failed} problems)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Schema is up to date"))
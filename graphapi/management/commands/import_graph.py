@@ -0,0 +1,265 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from graphapi.services.backends import get_backend
+from graphapi.services.graph_write import bulk_write
+from graphapi.services.schema import NODE_KEYS
+
+
+# ======================================================
+#   STREAMING IMPORT (NDJSON / CSV -> bulk_write batches)
+# ======================================================
+#
+# NDJSON lines use the same shape as /api/bulk/:
+#   {"label": "Patient", "props": {"name": "Omar", "age": 40}}
+#   {"type": "HAS_SYMPTOM", "from": "Omar", "to": "fever", "props": {"severity": "high"}}
+#
+# CSV files hold a single kind of row, given on the command line:
+#   --label Patient          -> every column is a node property
+#   --rel HAS_SYMPTOM        -> "from" and "to" columns, other columns are properties
+
+
+def _coerce(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_ndjson(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                row = f"{exc}"
+            # Keep row numbering stable: a bad line is reported as rejected
+            yield row if isinstance(row, dict) else {"invalid": f"line {line_no}: not a JSON object ({row})"}
+
+
+def read_csv(path: str, label: str | None, rel_type: str | None):
+    # Identifiers stay strings ("001" is not 1)
+    keys = {NODE_KEYS.get(label)} if label else {"from", "to"}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            props = {
+                k: v if k in keys else _coerce(v)
+                for k, v in row.items()
+                if k and v not in (None, "")
+            }
+            if label:
+                yield {"label": label, "props": props}
+            else:
+                start = props.pop("from", None)
+                end = props.pop("to", None)
+                yield {"type": rel_type, "from": start, "to": end, "props": props}
+
+
+def batches(rows, size: int):
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_batch(rows: list, dry_run: bool = False) -> dict:
+    nodes, node_rows = [], []
+    relationships, rel_rows = [], []
+    errors = []
+    for offset, row in enumerate(rows):
+        if "invalid" in row:
+            errors.append({"offset": offset, "error": row["invalid"]})
+        elif "type" in row:
+            relationships.append(row)
+            rel_rows.append(offset)
+        else:
+            nodes.append(row)
+            node_rows.append(offset)
+
+    result = bulk_write(nodes, relationships, chunk_size=len(rows), dry_run=dry_run)
+    errors.extend(
+        {"offset": (node_rows if e["kind"] == "node" else rel_rows)[e["index"]], "error": e["error"]}
+        for e in result["errors"]
+    )
+    return {"written": result["written"], "errors": errors}
+
+
+class Checkpoint:
+    """
+    Nombre de lignes déjà importées (préfixe contigu du fichier).
+    Écrit de façon atomique pour survivre à un crash.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        self.rows_done = 0
+        self.written = 0
+        self.failed = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("source") != self.source:
+            raise CommandError(f"Checkpoint {self.path} belongs to {data.get('source')}")
+        self.rows_done = data["rows_done"]
+        self.written = data.get("written", 0)
+        self.failed = data.get("failed", 0)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": self.source,
+                "rows_done": self.rows_done,
+                "written": self.written,
+                "failed": self.failed,
+            }, f)
+        os.replace(tmp, self.path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream NDJSON/CSV files into the graph through bulk_write, with parallel "
+        "writers and a resumable checkpoint. Point NEO4J_URI at a local Neo4j to "
+        "rehearse an import, or use --dry-run to only validate the files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON (.ndjson/.jsonl) or CSV file")
+        parser.add_argument("--label", help="CSV: node label of every row")
+        parser.add_argument("--rel", dest="rel_type", help="CSV: relationship type of every row")
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "BULK_CHUNK_SIZE", 500))
+        parser.add_argument("--workers", type=int, default=4, help="Parallel writer threads")
+        parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+        parser.add_argument("--errors", help="Write rejected rows to this NDJSON file")
+        parser.add_argument("--dry-run", action="store_true", help="Validate the rows without writing")
+        parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between progress lines")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+
+        if path.endswith(".csv"):
+            if bool(options["label"]) == bool(options["rel_type"]):
+                raise CommandError("CSV import needs exactly one of --label or --rel")
+            rows = read_csv(path, options["label"], options["rel_type"])
+        else:
+            rows = read_ndjson(path)
+
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        dry_run = options["dry_run"]
+
+        checkpoint = Checkpoint(options["checkpoint"] or path + ".checkpoint", os.path.abspath(path))
+        if not options["restart"] and not dry_run:
+            checkpoint.load()
+        if checkpoint.rows_done:
+            self.stdout.write(f"Resuming after {checkpoint.rows_done} rows")
+            rows = islice(rows, checkpoint.rows_done, None)
+
+        errors_file = open(options["errors"], "a", encoding="utf-8") if options["errors"] else None
+
+        started = time.perf_counter()
+        last_report = started
+        base = checkpoint.rows_done
+        next_batch = 0
+        finished = {}   # batch number -> (rows, result) not yet folded into the checkpoint
+        pending = {}    # future -> (batch number, first row number, rows)
+        imported = 0
+
+        def fold(future):
+            nonlocal next_batch, imported
+            number, first_row, batch = pending.pop(future)
+            result = future.result()
+            for error in result["errors"]:
+                if errors_file:
+                    errors_file.write(json.dumps({
+                        "row": first_row + error["offset"],
+                        "error": error["error"],
+                        "data": batch[error["offset"]],
+                    }) + "\n")
+            finished[number] = (len(batch), result)
+            # Only a contiguous prefix of finished batches moves the checkpoint
+            while next_batch in finished:
+                count, res = finished.pop(next_batch)
+                checkpoint.rows_done += count
+                checkpoint.written += res["written"]
+                checkpoint.failed += len(res["errors"])
+                imported += count
+                next_batch += 1
+            if not dry_run:
+                checkpoint.save()
+
+        # Finished batches are folded in order: a failing batch must not hide
+        # an earlier one that completed alongside it from the checkpoint
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                first_row = base
+                for number, batch in enumerate(batches(rows, batch_size)):
+                    # Bounded queue: keeps memory flat whatever the file size
+                    while len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in sorted(done, key=lambda f: pending[f][0]):
+                            fold(future)
+                    future = pool.submit(write_batch, batch, dry_run)
+                    pending[future] = (number, first_row, batch)
+                    first_row += len(batch)
+
+                    now = time.perf_counter()
+                    if now - last_report >= options["progress_every"]:
+                        last_report = now
+                        self._progress(imported, now - started, checkpoint)
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in sorted(done, key=lambda f: pending[f][0]):
+                        fold(future)
+        finally:
+            if errors_file:
+                errors_file.close()
+            if not dry_run:
+                self._save_snapshot()
+
+        elapsed = time.perf_counter() - started
+        self._progress(imported, elapsed, checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {imported} rows in {elapsed:.1f}s "
+            f"({checkpoint.written} written, {checkpoint.failed} rejected in total)"
+        ))
+
+    def _save_snapshot(self):
+        # Embedded backend: the graph only lives in this process until saved
+        backend = get_backend()
+        if backend.name != "memory":
+            return
+        if not backend.snapshot_path:
+            self.stderr.write(self.style.WARNING("GRAPH_BACKEND=memory without GRAPH_SNAPSHOT_PATH: nothing is kept"))
+            return
+        backend.save()
+        self.stdout.write(f"Snapshot saved to {backend.snapshot_path}")
+
+    def _progress(self, rows: int, elapsed: float, checkpoint: Checkpoint):
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            f"{checkpoint.rows_done} rows done, {rate:,.0f} rows/sec, "
+            f"{checkpoint.failed} rejected"
+        )
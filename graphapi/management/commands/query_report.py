@@ -0,0 +1,120 @@
+import gzip
+import json
+import math
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from graphapi.services.query_profiler import query_profiler
+
+SORTS = ("total_ms", "mean_ms", "p95_ms", "max_ms", "calls", "rows", "bytes")
+
+
+class Command(BaseCommand):
+    help = (
+        "Top Cypher offenders from the slow-query log (QUERY_SLOW_LOG and its "
+        "rotated copies): runs, total / mean / p95 / max time, rows and bytes per statement. "
+        "Only logged runs count (over QUERY_SLOW_MS, or profiled): for every call, "
+        "see GET /api/db/queries/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Slow-query log (default: QUERY_SLOW_LOG)")
+        parser.add_argument("--top", type=int, default=10, help="Statements to show (default: 10)")
+        parser.add_argument("--sort", choices=SORTS, default="total_ms")
+        parser.add_argument("--since", help="Ignore entries before this ISO timestamp (UTC)")
+        parser.add_argument("--plans", action="store_true", help="Print the last PROFILE plan of each statement")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        path = options["path"] or query_profiler.log_path
+        if not path:
+            raise CommandError("No slow-query log: pass one or set QUERY_SLOW_LOG")
+
+        # Rotated copies first (path.N is the oldest, maybe gzipped by
+        # logrotate), then the live file
+        backups = [
+            name
+            for i in range(99, 0, -1)
+            for name in (f"{path}.{i}", f"{path}.{i}.gz")
+            if os.path.exists(name)
+        ]
+        statements, skipped = {}, 0
+        try:
+            for name in [*backups, path]:
+                opener = gzip.open if name.endswith(".gz") else open
+                with opener(name, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            ts, ms = entry["ts"], float(entry["ms"])
+                        except (ValueError, KeyError, TypeError):
+                            skipped += 1
+                            continue
+                        if options["since"] and ts < options["since"]:
+                            continue
+                        stats = statements.setdefault(entry.get("statement") or "?", {
+                            "statement": entry.get("statement") or "?",
+                            "query": entry.get("query", ""),
+                            "timings": [], "db_ms": 0.0, "rows": 0, "bytes": 0, "errors": 0,
+                            "first": ts, "last": ts, "plan": None,
+                        })
+                        stats["timings"].append(ms)
+                        stats["db_ms"] += entry.get("db_ms") or 0
+                        stats["rows"] += entry.get("rows") or 0
+                        stats["bytes"] += entry.get("bytes") or 0
+                        stats["errors"] += bool(entry.get("error"))
+                        stats["first"], stats["last"] = min(stats["first"], ts), max(stats["last"], ts)
+                        if entry.get("plan"):
+                            stats["plan"] = entry["plan"]
+        except OSError as exc:
+            raise CommandError(f"Cannot read {exc.filename or path}: {exc}")
+
+        runs = sum(len(s["timings"]) for s in statements.values())
+        report = [_summarize(stats) for stats in statements.values()]
+        report.sort(key=lambda s: -s[options["sort"]])
+        report = report[:max(options["top"], 0)]
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"log": path, "runs": runs, "skipped": skipped, "statements": report}, indent=2))
+            return
+
+        self.stdout.write(
+            f"{path}: {runs} logged runs (slow or profiled only), {len(statements)} statements, "
+            f"sorted by {options['sort']}"
+        )
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"{skipped} unreadable lines skipped"))
+        self.stdout.write(
+            f"\n{'statement':<12} {'calls':>7} {'total ms':>11} {'mean ms':>9} {'p95 ms':>9} "
+            f"{'max ms':>9} {'rows':>9} {'bytes':>11}"
+        )
+        for s in report:
+            self.stdout.write(
+                f"{s['statement']:<12} {s['calls']:>7} {s['total_ms']:>11.1f} {s['mean_ms']:>9.1f} "
+                f"{s['p95_ms']:>9.1f} {s['max_ms']:>9.1f} {s['rows']:>9} {s['bytes']:>11}"
+            )
+            self.stdout.write(f"    {s['query'][:160]}")
+            if options["plans"] and s["plan"]:
+                for line in _plan_lines(s["plan"]):
+                    self.stdout.write(f"    {line}")
+
+
+def _summarize(stats: dict) -> dict:
+    timings = sorted(stats.pop("timings"))
+    calls = len(timings)
+    return {
+        **stats,
+        "calls": calls,
+        "total_ms": round(sum(timings), 3),
+        "mean_ms": round(sum(timings) / calls, 3),
+        "p95_ms": round(timings[min(calls - 1, math.ceil(0.95 * calls) - 1)], 3),
+        "max_ms": round(timings[-1], 3),
+        "db_ms": round(stats["db_ms"], 3),
+    }
+
+
+def _plan_lines(plan: dict, depth: int = 0):
+    yield f"{'  ' * depth}+ {plan.get('operator')}  rows={plan.get('rows')}  db_hits={plan.get('db_hits')}"
+    for child in plan.get("children") or []:
+        yield from _plan_lines(child, depth + 1)
@@ -0,0 +1,125 @@
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from graphapi.services import metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+
+
+# ======================================================
+#          RESPONSE COMPRESSION (brotli, else gzip)
+# ======================================================
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Brotli quand le client l'accepte et que le paquet brotli est installé,
+    gzip sinon. Les flux (NDJSON, SSE) sont compressés morceau par morceau
+    (flush à chaque morceau) pour rester lisibles au fil de l'eau.
+    """
+
+    def process_response(self, request, response):
+        if not getattr(settings, "RESPONSE_COMPRESSION", True):
+            return response
+        min_bytes = getattr(settings, "RESPONSE_COMPRESSION_MIN_BYTES", 1024)
+        if not response.streaming and len(response.content) < min_bytes:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is not None and re_accepts_br.search(ae):
+            encoding = "br"
+        elif response.streaming and re_accepts_gzip.search(ae):
+            # Django's gzip holds a stream back until its buffer fills
+            encoding = "gzip"
+        else:
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        quality = getattr(settings, "RESPONSE_BROTLI_QUALITY", 4)
+
+        if response.streaming:
+            if encoding == "br":
+                compressor = brotli.Compressor(quality=quality)
+                flush, finish = compressor.flush, compressor.finish
+                compress = compressor.process
+            else:
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                flush, finish = (lambda: compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+                compress = compressor.compress
+            response.streaming_content = self._flushed_stream(response, compress, flush, finish)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _flushed_stream(response, compress, flush, finish):
+        original = response.streaming_content
+
+        if response.is_async:
+            async def wrapper():
+                async for chunk in original:
+                    yield compress(chunk) + flush()
+                yield finish()
+        else:
+            def wrapper():
+                for chunk in original:
+                    yield compress(chunk) + flush()
+                yield finish()
+        return wrapper()
+
+
+# ======================================================
+#        REQUEST METRICS (histograms + Server-Timing)
+# ======================================================
+
+class MetricsMiddleware:
+    """
+    Latence et statut par endpoint, en-tête Server-Timing avec la durée de
+    chaque étape chronométrée pendant la requête (services/metrics.py).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not metrics.ENABLED:
+            return self.get_response(request)
+        state = metrics.begin_request()
+        response = self.get_response(request)
+        return metrics.end_request(request, response, state)
+
+    async def __acall__(self, request):
+        if not metrics.ENABLED:
+            return await self.get_response(request)
+        state = metrics.begin_request()
+        response = await self.get_response(request)
+        return metrics.end_request(request, response, state)
@@ -1,3 +1,15 @@
 from django.db import models
 
-# Create your models here.
+
+class GraphVersion(models.Model):
+    """
+    Compteur de version d'une portée du graphe ("Patient:omar", "Patient:*", "*"...).
+    Incrémenté par graph_write, lu par les GET conditionnels (ETag / 304).
+    """
+
+    scope = models.CharField(max_length=255, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.scope}@{self.version}"
@@ -0,0 +1,79 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from graphapi.services.metrics import timed
+
+try:
+    import orjson
+except ImportError:  # optional dependency: fall back to the stdlib encoder
+    orjson = None
+
+
+# ======================================================
+#              FAST JSON (orjson when installed)
+# ======================================================
+
+_fallback = DjangoJSONEncoder()
+
+
+def _default(value):
+    # Types orjson does not know (Decimal, lazy strings, neo4j temporal values...)
+    if hasattr(value, "iso_format"):
+        return value.iso_format()
+    return _fallback.default(value)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(data) -> bytes:
+        return orjson.dumps(data, default=_default, option=_OPTIONS)
+else:
+    import json
+
+    def dumps(data) -> bytes:
+        return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONRenderer(BaseRenderer):
+    """Renderer JSON compact ; délègue au renderer DRF pour l'indentation demandée par le client."""
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        with timed("serialize"):
+            if accepted_media_type and "indent=" in accepted_media_type:
+                return JSONRenderer().render(data, accepted_media_type, renderer_context)
+            return dumps(data)
+
+
+# ======================================================
+#        STREAMED ANSWERS (SSE / NDJSON EVENTS)
+# ======================================================
+
+def event_bytes(mode: str, event: str, data) -> bytes:
+    """Un événement au format du flux : "sse" (text/event-stream) ou "ndjson"."""
+    if mode == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+    return dumps({"event": event, "data": data}) + b"\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Rend Accept: text/event-stream acceptable pour la négociation DRF. Les
+    réponses en flux sont construites par la vue ; seules les erreurs (400...)
+    passent ici, envoyées comme un unique événement "error".
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return event_bytes("sse", "error", data)
@@ -0,0 +1,177 @@
+import asyncio
+import time
+from functools import wraps
+
+from graphapi.services import graph_read
+from graphapi.services.backends import get_backend
+from graphapi.services.db import get_async_driver, get_graph
+from graphapi.services.cache import cached_read
+from graphapi.services.metrics import timed
+from graphapi.services.pagination import keyset_params, keyset_result
+from graphapi.services.query_profiler import query_profiler
+from graphapi.services.backends.neo4j import (
+    compile_plan,
+    record_plan,
+    replay_plan,
+    PATIENT_SYMPTOMS_QUERY,
+    PATIENT_RISK_FACTORS_QUERY,
+    PATIENT_VISITS_QUERY,
+    VISIT_OBSERVATIONS_QUERY,
+    VISIT_TESTS_QUERY,
+    DISEASES_FOR_TEST_QUERY,
+    DISEASES_FOR_OBSERVATION_QUERY,
+    DISEASES_FOR_SYMPTOMS_QUERY,
+    SYMPTOMS_FOR_DISEASES_QUERY,
+    TREATMENTS_FOR_DISEASES_QUERY,
+    TESTS_FOR_DISEASES_QUERY,
+    OBSERVATIONS_FOR_DISEASES_QUERY,
+)
+
+
+# ======================================================
+#        ASYNC LOOKUPS (neo4j async driver, same Cypher)
+# ======================================================
+#
+# Async twins of the graph_read functions used by the /query/ pipeline.
+# They share the Cypher text and the read cache tags of graph_read, so
+# graph_write invalidates both. With an embedded backend (GRAPH_BACKEND=memory)
+# there is no I/O to await: the synchronous graph_read function answers.
+
+
+def _embedded(sync_read):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if get_backend().name != "neo4j":
+                return sync_read(*args, **kwargs)
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def _data(q: str, **params) -> list[dict]:
+    started = time.perf_counter()
+    try:
+        records, summary, _ = await get_async_driver().execute_query(
+            query_profiler.statement(q), parameters_=params, routing_="r", database_=get_graph().database
+        )
+    except Exception:
+        query_profiler.record(q, params, time.perf_counter() - started, error=True)
+        raise
+    rows = [r.data() for r in records]
+    query_profiler.record(q, params, time.perf_counter() - started, rows, summary=summary)
+    return rows
+
+
+@_embedded(graph_read.patient_symptoms)
+@timed("graph_read")
+@cached_read("Patient")
+async def patient_symptoms(name: str):
+    return await _data(PATIENT_SYMPTOMS_QUERY, name=name)
+
+
+@_embedded(graph_read.patient_risk_factors)
+@timed("graph_read")
+@cached_read("Patient")
+async def patient_risk_factors(name: str):
+    return await _data(PATIENT_RISK_FACTORS_QUERY, name=name)
+
+
+@_embedded(graph_read.patient_visits)
+@timed("graph_read")
+@cached_read("Patient")
+async def patient_visits(name: str, limit: int = 50, cursor: dict | None = None):
+    records = await _data(PATIENT_VISITS_QUERY + "\nLIMIT $limit", name=name, limit=limit + 1, **keyset_params(cursor))
+    return keyset_result(records, limit)
+
+
+@_embedded(graph_read.visit_observations)
+@timed("graph_read")
+@cached_read("Visit")
+async def visit_observations(visit_id: str, limit: int = 50, cursor: dict | None = None):
+    records = await _data(VISIT_OBSERVATIONS_QUERY + "\nLIMIT $limit", id=visit_id, limit=limit + 1, **keyset_params(cursor))
+    return keyset_result(records, limit)
+
+
+@_embedded(graph_read.visit_tests)
+@timed("graph_read")
+@cached_read("Visit")
+async def visit_tests(visit_id: str):
+    return await _data(VISIT_TESTS_QUERY, id=visit_id)
+
+
+@_embedded(graph_read.diseases_for_test)
+@timed("graph_read")
+@cached_read("Test")
+async def diseases_for_test(test_name: str):
+    records = await _data(DISEASES_FOR_TEST_QUERY, name=test_name)
+    return [r["disease"] for r in records]
+
+
+@_embedded(graph_read.diseases_for_observation)
+@timed("graph_read")
+@cached_read("Observation")
+async def diseases_for_observation(obs_name: str):
+    records = await _data(DISEASES_FOR_OBSERVATION_QUERY, name=obs_name)
+    return [r["disease"] for r in records]
+
+
+@_embedded(graph_read.diseases_for_symptoms)
+@timed("graph_read")
+@cached_read("Symptom")
+async def diseases_for_symptoms(symptoms: list[str]):
+    return await _data(DISEASES_FOR_SYMPTOMS_QUERY, symptoms=list(symptoms))
+
+
+async def _per_disease(q: str, diseases: list[str], field: str):
+    records = await _data(q, diseases=list(diseases))
+    return {r["disease"]: r[field] for r in records}
+
+
+@_embedded(graph_read.symptoms_for_diseases)
+@timed("graph_read")
+@cached_read("Disease")
+async def symptoms_for_diseases(diseases: list[str]):
+    return await _per_disease(SYMPTOMS_FOR_DISEASES_QUERY, diseases, "symptoms")
+
+
+@_embedded(graph_read.treatments_for_diseases)
+@timed("graph_read")
+@cached_read("Disease")
+async def treatments_for_diseases(diseases: list[str]):
+    return await _per_disease(TREATMENTS_FOR_DISEASES_QUERY, diseases, "treatments")
+
+
+@_embedded(graph_read.tests_for_diseases)
+@timed("graph_read")
+@cached_read("Disease")
+async def tests_for_diseases(diseases: list[str]):
+    return await _per_disease(TESTS_FOR_DISEASES_QUERY, diseases, "tests")
+
+
+@_embedded(graph_read.observations_for_diseases)
+@timed("graph_read")
+@cached_read("Disease")
+async def observations_for_diseases(diseases: list[str]):
+    return await _per_disease(OBSERVATIONS_FOR_DISEASES_QUERY, diseases, "observations")
+
+
+# ---------------------------
+# MULTI-INTENT PLANS
+# ---------------------------
+
+@timed("graph_read")
+async def run_plan(calls: dict) -> dict:
+    """
+    Variante async de backend.run_plan : avec Neo4j, le plan compilé part en
+    un seul aller-retour par le driver async, puis chaque lecture est rejouée.
+    """
+    backend = get_backend()
+    statements = record_plan(calls) if backend.name == "neo4j" else None
+    if statements is None:
+        # Embedded graph: nothing to await, the plan runs in a worker thread
+        # (also a Neo4j read that is not one statement: none of them today)
+        return await asyncio.to_thread(backend.run_plan, calls)
+    query, params = compile_plan(statements)
+    rows = await _data(query, **params)
+    return replay_plan(calls, rows[0])
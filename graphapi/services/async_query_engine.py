@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+from graphapi.services import async_graph_read as reads
+from graphapi.services.intents import intent_registry
+from graphapi.services.llm_gateway import llm_gateway
+from graphapi.services.metrics import observe_question, timed
+from graphapi.services.query_engine import (
+    EXTRACTION_PROMPT,
+    LLM_MODEL,
+    PAGINATED_READS,
+    PER_DISEASE_READS,
+    QUERY_PAGE_SIZE,
+    assemble_plan,
+    build_reasoning,
+    cached_extraction,
+    flatten_per_disease,
+    graph_blocks,
+    match_entities,
+    parse_llm_extraction,
+    plan_intents,
+    plan_reads,
+    possible_diseases,
+    resolve_entities,
+)
+
+
+# ======================================================
+#          ASYNC PIPELINE (ASGI: /query/async/)
+# ======================================================
+#
+# Same stages as query_engine.process_query, but the Groq call and the
+# Neo4j lookups are awaited, so one worker can hold many questions in flight.
+
+async def aanalyze_with_llm(question: str, extraction: dict | None = None) -> dict:
+    # The extraction cache is SQLite: its reads and writes run off the loop
+    cached = await asyncio.to_thread(cached_extraction, question)
+    if cached is not None:
+        if extraction is not None:
+            extraction["source"] = "llm_cache"
+        return cached
+
+    with timed("llm"):
+        response = await llm_gateway.acomplete(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": EXTRACTION_PROMPT + question}]
+        )
+    return await asyncio.to_thread(parse_llm_extraction, question, response.choices[0].message.content)
+
+
+async def aextract_entities(question: str) -> tuple[dict, dict]:
+    # The matcher may (re)build its vocabulary from Neo4j: keep it off the loop
+    analysis, extraction = await asyncio.to_thread(match_entities, question)
+    if analysis is not None:
+        return analysis, extraction
+    return await aanalyze_with_llm(question, extraction), extraction
+
+
+async def aexecute_graph_queries(analysis: dict) -> dict:
+    # Same dispatch as query_engine.execute_graph_queries, through the async
+    # reads. An intent declares one read: nothing to run concurrently here;
+    # several intents go through aexecute_plan, one round trip for them all.
+    intent = intent_registry.get(analysis.get("intent"))
+    if intent is None:
+        return {}
+
+    if intent.read is None:
+        # The ranker may (re)load its matrix from the graph: off the loop
+        return await asyncio.to_thread(possible_diseases, analysis["symptoms"])
+
+    entities = analysis[intent.slots[0]]
+    read = getattr(reads, intent.read)
+    if intent.read in PER_DISEASE_READS:
+        return {intent.result: flatten_per_disease(await read(entities), entities) if entities else []}
+    if not entities:
+        return {}
+    if intent.read in PAGINATED_READS:
+        # Paginated reads: the answer only carries the rows
+        return {intent.result: (await read(entities[0], limit=QUERY_PAGE_SIZE))["results"]}
+    return {intent.result: await read(entities[0])}
+
+
+async def aexecute_plan(plan: list, analysis: dict) -> dict:
+    """Même résultat que query_engine.execute_plan : le plan en un aller-retour, attendu."""
+    calls = plan_reads(plan, analysis)
+    fetched = await reads.run_plan(calls) if calls else {}
+    if "possible_diseases" in plan:
+        # The ranker may (re)load its matrix from the graph: off the loop
+        return await asyncio.to_thread(assemble_plan, plan, analysis, fetched)
+    return assemble_plan(plan, analysis, fetched)
+
+
+async def arun_graph_queries(analysis: dict) -> dict:
+    if len(analysis["intents"]) > 1:
+        return await aexecute_plan(analysis["intents"], analysis)
+    return await aexecute_graph_queries(analysis)
+
+
+async def aprocess_query(question: str) -> dict:
+    started = time.perf_counter()
+    with timed("extract"):
+        analysis, extraction = await aextract_entities(question)
+    # The resolver may (re)build its index from the graph: off the loop too
+    with timed("resolve"):
+        corrections = await asyncio.to_thread(resolve_entities, analysis)
+    with timed("intent"):
+        analysis["intents"] = plan_intents(question, analysis)
+    analysis["intent"] = analysis["intents"][0] if analysis["intents"] else ""
+
+    with timed("graph"):
+        graph_results = await arun_graph_queries(analysis)
+    with timed("reasoning"):
+        reasoning = build_reasoning(question, analysis, graph_results)
+    observe_question(analysis["intents"], time.perf_counter() - started)
+
+    return {
+        "question": question,
+        "analysis": analysis,
+        "extraction": extraction,
+        "corrections": corrections,
+        "graph_results": graph_results,
+        "reasoning": reasoning
+    }
+
+
+async def astream_query(question: str):
+    """Version asynchrone de query_engine.stream_query (mêmes événements)."""
+    started = time.perf_counter()
+
+    def elapsed():
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    with timed("extract"):
+        analysis, extraction = await aextract_entities(question)
+    with timed("resolve"):
+        corrections = await asyncio.to_thread(resolve_entities, analysis)
+    yield "extraction", {
+        "analysis": dict(analysis),
+        "extraction": extraction,
+        "corrections": corrections,
+        "elapsed_ms": elapsed(),
+    }
+
+    with timed("intent"):
+        analysis["intents"] = plan_intents(question, analysis)
+    analysis["intent"] = analysis["intents"][0] if analysis["intents"] else ""
+    yield "intent", {"intent": analysis["intent"], "intents": analysis["intents"], "elapsed_ms": elapsed()}
+
+    with timed("graph"):
+        graph_results = await arun_graph_queries(analysis)
+    for intent, results in graph_blocks(analysis, graph_results):
+        yield "graph_results", {"intent": intent, "results": results, "elapsed_ms": elapsed()}
+
+    with timed("reasoning"):
+        reasoning = build_reasoning(question, analysis, graph_results)
+    yield "reasoning", {"reasoning": reasoning, "elapsed_ms": elapsed()}
+    observe_question(analysis["intents"], time.perf_counter() - started)
+    yield "done", {"elapsed_ms": elapsed()}
@@ -0,0 +1,67 @@
+import atexit
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from graphapi.services.backends.base import GraphBackend
+
+
+# ======================================================
+#           BACKEND SELECTION (settings.GRAPH_BACKEND)
+# ======================================================
+#
+#   "neo4j"  -> Cypher through the pooled driver (default)
+#   "memory" -> embedded graph, loaded from GRAPH_SNAPSHOT_PATH when the file
+#               exists; one copy per process (edge deployments, tests, demos)
+
+BACKENDS = ("neo4j", "memory")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _create(name: str) -> GraphBackend:
+    if name == "neo4j":
+        from graphapi.services.backends.neo4j import Neo4jBackend
+
+        return Neo4jBackend()
+
+    if name == "memory":
+        from graphapi.services.backends.memory import MemoryGraph
+
+        path = getattr(settings, "GRAPH_SNAPSHOT_PATH", "")
+        graph = MemoryGraph.load(path) if path and os.path.exists(path) else MemoryGraph()
+        graph.snapshot_path = path
+        if path and getattr(settings, "GRAPH_SNAPSHOT_AUTOSAVE", False):
+            atexit.register(_autosave, graph)
+        return graph
+
+    raise ImproperlyConfigured(f"Unknown GRAPH_BACKEND {name!r} (expected one of {', '.join(BACKENDS)})")
+
+
+def _autosave(graph):
+    if graph.version != graph.saved_version:
+        try:
+            graph.save()
+        except Exception as exc:
+            print("\n⚠️ GRAPH SNAPSHOT SAVE FAILED:", exc)
+
+
+def get_backend() -> GraphBackend:
+    """Backend partagé par tout le processus, créé au premier appel."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create(getattr(settings, "GRAPH_BACKEND", "neo4j"))
+    return _backend
+
+
+def set_backend(backend: GraphBackend | None) -> GraphBackend | None:
+    """Remplace le backend du processus (benchmarks, scripts) ; renvoie le précédent."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
@@ -0,0 +1,162 @@
+# ======================================================
+#              GRAPH BACKEND INTERFACE
+# ======================================================
+#
+# graph_read / graph_write keep the public functions, the read cache and the
+# invalidation; the backend only answers the queries. Two implementations:
+#   neo4j.Neo4jBackend  -> Cypher through the pooled driver (GraphConnection)
+#   memory.MemoryGraph  -> embedded in-process store (CSR adjacency)
+#
+# Row shapes are those of the Cypher queries: paginated reads return their
+# sort key as _key (and _id when the key is not unique), see pagination.py.
+
+
+class GraphBackend:
+    name = "base"
+
+    # ---------------------------
+    # GLOBAL
+    # ---------------------------
+
+    def names(self, label: str) -> list:
+        """toLower(name) de chaque nœud du label (vocabulaires de l'entity matcher)."""
+        raise NotImplementedError
+
+    # ---------------------------
+    # PATIENTS / VISITS
+    # ---------------------------
+    # limit=None : toutes les lignes, en flux (itérateur)
+
+    def patients(self, after_key: str = "", after_id: str = "", limit: int | None = None):
+        raise NotImplementedError
+
+    def patient(self, name: str) -> list:
+        raise NotImplementedError
+
+    def patient_symptoms(self, name: str) -> list:
+        raise NotImplementedError
+
+    def patient_risk_factors(self, name: str) -> list:
+        raise NotImplementedError
+
+    def patient_visits(self, name: str, after_key: str = "", after_id: str = "", limit: int | None = None):
+        raise NotImplementedError
+
+    def visit_observations(self, visit_id: str, after_key: str = "", after_id: str = "", limit: int | None = None):
+        raise NotImplementedError
+
+    def visit_tests(self, visit_id: str) -> list:
+        raise NotImplementedError
+
+    # ---------------------------
+    # SYMPTOM / DISEASE / TREATMENT
+    # ---------------------------
+
+    def diseases_for_symptom(self, symptom: str) -> list:
+        raise NotImplementedError
+
+    def symptoms_for_disease(self, disease: str) -> list:
+        raise NotImplementedError
+
+    def treatments_for_disease(self, disease: str) -> list:
+        raise NotImplementedError
+
+    def diseases_for_test(self, test_name: str) -> list:
+        raise NotImplementedError
+
+    def diseases_for_observation(self, obs_name: str) -> list:
+        raise NotImplementedError
+
+    def tests_for_disease(self, disease: str) -> list:
+        raise NotImplementedError
+
+    def diseases_for_symptoms(self, symptoms: list) -> list:
+        """[{"disease", "match_count", "matched"}] triés par match_count décroissant puis nom."""
+        raise NotImplementedError
+
+    def symptoms_for_diseases(self, diseases: list) -> dict:
+        raise NotImplementedError
+
+    def indicates_weights(self):
+        """Itérateur sur chaque INDICATES : {"symptom" (clé), "disease_key", "disease", "weight"}."""
+        raise NotImplementedError
+
+    def treatments_for_diseases(self, diseases: list) -> dict:
+        raise NotImplementedError
+
+    def tests_for_diseases(self, diseases: list) -> dict:
+        raise NotImplementedError
+
+    def observations_for_diseases(self, diseases: list) -> dict:
+        raise NotImplementedError
+
+    def run_plan(self, calls: dict) -> dict:
+        """
+        calls : {clé: (méthode, args, kwargs)} de lectures ci-dessus ; même
+        résultat que chaque appel, en un aller-retour quand le backend le permet.
+        """
+        return {key: getattr(self, method)(*args, **kwargs) for key, (method, args, kwargs) in calls.items()}
+
+    # ---------------------------
+    # SEARCH
+    # ---------------------------
+
+    def search(self, term: str, labels: list, offset: int = 0, limit: int | None = None):
+        """[{"name", "labels", "score"}] par pertinence ; limit=None : itérateur sur tout."""
+        raise NotImplementedError
+
+    def search_prefix(self, prefix: str, labels: list, after_key: str, after_label: str, limit: int) -> list:
+        """[{"name", "labels", "key", "label", "score"}] triés par (key, label)."""
+        raise NotImplementedError
+
+    # ---------------------------
+    # WRITES
+    # ---------------------------
+
+    def merge_node(self, label: str, props: dict) -> list:
+        raise NotImplementedError
+
+    def patient_add_symptom(self, patient, symptom, severity=None, onset_days=None) -> list:
+        raise NotImplementedError
+
+    def patient_add_risk_factor(self, patient, risk_name) -> list:
+        raise NotImplementedError
+
+    def patient_add_visit(self, patient, visit_id) -> list:
+        raise NotImplementedError
+
+    def visit_add_observation(self, visit_id, name) -> list:
+        raise NotImplementedError
+
+    def visit_add_test(self, visit_id, test_name) -> list:
+        raise NotImplementedError
+
+    def symptom_indicates_disease(self, symptom, disease, weight=None) -> list:
+        raise NotImplementedError
+
+    def disease_add_treatment(self, disease, treatment, line=None, recommended=None) -> list:
+        raise NotImplementedError
+
+    def test_used_for_diagnosis(self, test_name, disease) -> list:
+        raise NotImplementedError
+
+    def observation_supports_disease(self, observation_name, disease) -> list:
+        raise NotImplementedError
+
+    def write_nodes(self, label: str, rows: list):
+        """rows : [{"key", "props"}] ; tout ou rien (bulk_write découpe en cas d'échec)."""
+        raise NotImplementedError
+
+    def write_relationships(self, rel_type: str, rows: list):
+        """rows : [{"start", "end", "props"}] ; tout ou rien."""
+        raise NotImplementedError
+
+    # ---------------------------
+    # ADMIN
+    # ---------------------------
+
+    def metrics(self) -> dict:
+        return {"backend": self.name}
+
+    def close(self):
+        pass
@@ -0,0 +1,766 @@
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import wraps
+
+from graphapi.services.backends.base import GraphBackend
+from graphapi.services.cache import entity_key
+from graphapi.services.schema import NODE_KEYS, RELATIONSHIPS, UNIQUE_LABELS
+
+
+# ======================================================
+#          EMBEDDED IN-MEMORY GRAPH (CSR ADJACENCY)
+# ======================================================
+#
+# Nodes are stored per label in parallel arrays indexed by a local node
+# number: the normalised key (n.key) as an id in a string table, and a dict
+# with the other properties. Every relationship type connects two fixed
+# labels (schema.RELATIONSHIPS), so its adjacency is a CSR over local numbers,
+# kept in both directions:
+#   offsets[i] .. offsets[i + 1]  -> slice of targets / edges for node i
+# Edges added since the last compaction wait in a small per-node buffer;
+# the CSR is rebuilt when the buffer outgrows the arrays.
+#
+# Answers the same rows as the Cypher of neo4j.Neo4jBackend. Everything runs
+# in-process: one copy of the graph per worker, persisted as a snapshot file.
+
+SNAPSHOT_FORMAT = 1
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokens(value) -> list[str]:
+    return _TOKEN.findall(str(value).lower()) if value is not None else []
+
+
+def _display(props: dict):
+    # coalesce(n.name, n.id)
+    name = props.get("name")
+    return name if name is not None else props.get("id")
+
+
+def _lower(value):
+    # toLower() is only defined on strings; other values give null here
+    return value.lower() if isinstance(value, str) else None
+
+
+class StringTable:
+    """Chaque chaîne distincte est stockée une fois et référencée par son numéro."""
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.ids = {s: i for i, s in enumerate(self.strings)}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def get(self, value: str):
+        return self.ids.get(value)
+
+    def intern(self, value: str) -> int:
+        i = self.ids.get(value)
+        if i is None:
+            i = len(self.strings)
+            self.strings.append(value)
+            self.ids[value] = i
+        return i
+
+    def canonical(self, value):
+        """La copie partagée de value (chaînes et listes de chaînes), pour les propriétés."""
+        if isinstance(value, str):
+            return self.strings[self.intern(value)]
+        if isinstance(value, list):
+            return [self.canonical(v) for v in value]
+        return value
+
+
+class _NodeTable:
+    def __init__(self, unique: bool):
+        self.unique = unique
+        self.keys = array("q")      # string id of n.key, per node
+        self.props = []             # other properties, per node
+        self.index = {}             # key id -> node (unique labels) or [nodes]
+        self._ordered = None        # (keys, nodes) sorted by (key, node), rebuilt lazily
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, key_id) -> list:
+        found = self.index.get(key_id)
+        if found is None:
+            return []
+        return [found] if self.unique else found
+
+    def add(self, key_id: int, props: dict) -> int:
+        node = len(self.keys)
+        self.keys.append(key_id)
+        self.props.append(props)
+        if self.unique:
+            self.index[key_id] = node
+        else:
+            self.index.setdefault(key_id, []).append(node)
+        self._ordered = None
+        return node
+
+    def ordered(self, strings: StringTable):
+        if self._ordered is None:
+            pairs = sorted((strings[k], node) for node, k in enumerate(self.keys))
+            self._ordered = ([k for k, _ in pairs], [n for _, n in pairs])
+        return self._ordered
+
+
+class _Adjacency:
+    """CSR (offsets / targets / edges) + tampon des arêtes ajoutées depuis le dernier compactage."""
+
+    def __init__(self):
+        self.offsets = array("q", [0])
+        self.targets = array("q")
+        self.edges = array("q")
+        self.pending = {}           # node -> [(target, edge)]
+        self.pending_count = 0
+
+    def __len__(self):
+        return len(self.targets) + self.pending_count
+
+    def neighbours(self, node: int) -> list:
+        out = []
+        if node + 1 < len(self.offsets):
+            start, end = self.offsets[node], self.offsets[node + 1]
+            if start != end:
+                out = list(zip(self.targets[start:end], self.edges[start:end]))
+        extra = self.pending.get(node)
+        if extra:
+            out.extend(extra)
+        return out
+
+    def add(self, node: int, target: int, edge: int):
+        self.pending.setdefault(node, []).append((target, edge))
+        self.pending_count += 1
+
+    def needs_compaction(self) -> bool:
+        # Geometric: rebuilding costs O(nodes + edges), at most once per doubling
+        return self.pending_count > max(4096, len(self.targets))
+
+    def compact(self, node_count: int):
+        if not self.pending_count and len(self.offsets) == node_count + 1:
+            return
+        old_offsets, old_targets, old_edges = self.offsets, self.targets, self.edges
+        offsets, targets, edges = array("q", [0]), array("q"), array("q")
+        covered = len(old_offsets) - 1
+        for node in range(node_count):
+            if node < covered:
+                start, end = old_offsets[node], old_offsets[node + 1]
+                if start != end:
+                    targets.extend(old_targets[start:end])
+                    edges.extend(old_edges[start:end])
+            extra = self.pending.get(node)
+            if extra:
+                targets.extend(t for t, _ in extra)
+                edges.extend(e for _, e in extra)
+            offsets.append(len(targets))
+        self.offsets, self.targets, self.edges = offsets, targets, edges
+        self.pending = {}
+        self.pending_count = 0
+
+
+def _locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class MemoryGraph(GraphBackend):
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.strings = StringTable()
+        self.nodes = {label: _NodeTable(label in UNIQUE_LABELS) for label in NODE_KEYS}
+        self.out = {rel: _Adjacency() for rel in RELATIONSHIPS}
+        self.inc = {rel: _Adjacency() for rel in RELATIONSHIPS}
+        self.rel_props = {rel: [] for rel in RELATIONSHIPS}
+        self.terms = {}             # full-text token -> [(label, node)]
+        self.version = 0
+        self.saved_version = 0
+        self.snapshot_path = ""
+        self.last_saved = None
+        self.load_seconds = None
+        self.compactions = 0
+
+    # ---------------------------
+    # NODES / EDGES (INTERNAL)
+    # ---------------------------
+
+    def _key_id(self, value):
+        return None if value is None else self.strings.get(entity_key(value))
+
+    def _match(self, label: str, value) -> list:
+        """Nœuds du label dont n.key = toLower(trim(toString(value)))."""
+        key_id = self._key_id(value)
+        return [] if key_id is None else self.nodes[label].find(key_id)
+
+    def _set_props(self, props: dict, updates: dict):
+        # SET n += $props / SET r.x = $x : a null value removes the property
+        for k, v in updates.items():
+            if v is None:
+                props.pop(k, None)
+            else:
+                props[self.strings.canonical(k)] = self.strings.canonical(v)
+
+    def add_node(self, label: str, props: dict, key=None) -> int:
+        """Crée toujours un nœud (chargement de snapshot, copie depuis Neo4j)."""
+        props = dict(props)
+        props.pop("key", None)
+        if key is None:
+            key = entity_key(props.get(NODE_KEYS[label]))
+        stored = {}
+        self._set_props(stored, props)
+        node = self.nodes[label].add(self.strings.intern(key), stored)
+        self._index_text(label, node, stored)
+        self.version += 1
+        return node
+
+    def _index_text(self, label: str, node: int, props: dict):
+        # Full-text index over the display properties (FULLTEXT_INDEX: name, id)
+        seen = set()
+        for field in sorted(set(NODE_KEYS.values())):
+            for token in _tokens(props.get(field)):
+                if token not in seen:
+                    seen.add(token)
+                    self.terms.setdefault(self.strings.canonical(token), []).append((label, node))
+
+    def _edge(self, rel_type: str, start: int, end: int):
+        for target, edge in self.out[rel_type].neighbours(start):
+            if target == end:
+                return edge
+        return None
+
+    def add_edge(self, rel_type: str, start: int, end: int, props: dict | None = None) -> int:
+        edge = len(self.rel_props[rel_type])
+        stored = None
+        if props:
+            stored = {}
+            self._set_props(stored, props)
+        self.rel_props[rel_type].append(stored or None)
+        self.out[rel_type].add(start, end, edge)
+        self.inc[rel_type].add(end, start, edge)
+        self.version += 1
+        self._maybe_compact(rel_type)
+        return edge
+
+    def _merge_edge(self, rel_type: str, start: int, end: int, props: dict | None) -> int:
+        edge = self._edge(rel_type, start, end)
+        if edge is None:
+            return self.add_edge(rel_type, start, end, props)
+        if props:
+            stored = self.rel_props[rel_type][edge] or {}
+            self._set_props(stored, props)
+            self.rel_props[rel_type][edge] = stored or None
+            self.version += 1
+        return edge
+
+    def _maybe_compact(self, rel_type: str):
+        start, end = RELATIONSHIPS[rel_type]
+        if self.out[rel_type].needs_compaction():
+            self.out[rel_type].compact(len(self.nodes[start]))
+            self.compactions += 1
+        if self.inc[rel_type].needs_compaction():
+            self.inc[rel_type].compact(len(self.nodes[end]))
+            self.compactions += 1
+
+    def compact(self):
+        with self._lock:
+            for rel_type, (start, end) in RELATIONSHIPS.items():
+                self.out[rel_type].compact(len(self.nodes[start]))
+                self.inc[rel_type].compact(len(self.nodes[end]))
+
+    def _merge_by_key(self, label: str, value) -> list:
+        # MERGE (n:Label {key: toLower(trim(toString(value)))}) ON CREATE SET n.<key field> = value
+        if value is None:
+            raise ValueError(f"Cannot merge {label} node using null property value for key")
+        nodes = self._match(label, value)
+        if not nodes:
+            nodes = [self.add_node(label, {NODE_KEYS[label]: value}, key=entity_key(value))]
+        return nodes
+
+    def _node_data(self, label: str, node: int) -> dict:
+        table = self.nodes[label]
+        return {**table.props[node], "key": self.strings[table.keys[node]]}
+
+    def _element_id(self, label: str, node: int) -> str:
+        # Zero-padded so that string order (elementId in Cypher) is node order
+        return f"{label}:{node:010d}"
+
+    # ---------------------------
+    # READS
+    # ---------------------------
+
+    def _targets(self, rel_type: str, nodes: list) -> list:
+        return [(t, e) for n in nodes for t, e in self.out[rel_type].neighbours(n)]
+
+    def _sources(self, rel_type: str, nodes: list) -> list:
+        return [(s, e) for n in nodes for s, e in self.inc[rel_type].neighbours(n)]
+
+    def _names_of(self, label: str, pairs: list, field: str = "name") -> list:
+        props = self.nodes[label].props
+        return [props[n].get(field) for n, _ in pairs]
+
+    @staticmethod
+    def _page(rows: list, limit: int | None):
+        return iter(rows) if limit is None else rows[:limit]
+
+    @_locked
+    def names(self, label):
+        return [_lower(p.get("name")) for p in self.nodes[label].props]
+
+    @_locked
+    def patients(self, after_key="", after_id="", limit=None):
+        table = self.nodes["Patient"]
+        keys, nodes = table.ordered(self.strings)
+        start = bisect_right(keys, after_key)
+        end = len(keys) if limit is None else min(len(keys), start + limit)
+        rows = []
+        for i in range(start, end):
+            p = table.props[nodes[i]]
+            rows.append({"_key": keys[i], "name": p.get("name"), "age": p.get("age"), "gender": p.get("gender")})
+        return self._page(rows, limit)
+
+    @_locked
+    def patient(self, name):
+        props = self.nodes["Patient"].props
+        return [
+            {"name": props[n].get("name"), "age": props[n].get("age"), "gender": props[n].get("gender")}
+            for n in self._match("Patient", name)
+        ]
+
+    @_locked
+    def patient_symptoms(self, name):
+        symptoms = self.nodes["Symptom"].props
+        rel_props = self.rel_props["HAS_SYMPTOM"]
+        rows = []
+        for s, e in self._targets("HAS_SYMPTOM", self._match("Patient", name)):
+            r = rel_props[e] or {}
+            rows.append({"symptom": symptoms[s].get("name"), "severity": r.get("severity"), "onset_days": r.get("onset_days")})
+        return rows
+
+    @_locked
+    def patient_risk_factors(self, name):
+        pairs = self._targets("HAS_RISK_FACTOR", self._match("Patient", name))
+        return [{"risk_factor": n} for n in self._names_of("RiskFactor", pairs)]
+
+    @_locked
+    def patient_visits(self, name, after_key="", after_id="", limit=None):
+        table = self.nodes["Visit"]
+        rows = []
+        for v, _ in self._targets("HAS_VISIT", self._match("Patient", name)):
+            key = self.strings[table.keys[v]]
+            if key > after_key:
+                p = table.props[v]
+                rows.append({"_key": key, "visit_id": p.get("id"), "date": p.get("date"), "reason": p.get("reason")})
+        rows.sort(key=lambda r: r["_key"])
+        return self._page(rows, limit)
+
+    @_locked
+    def visit_observations(self, visit_id, after_key="", after_id="", limit=None):
+        table = self.nodes["Observation"]
+        after = (after_key, after_id)
+        rows = []
+        for o, _ in self._targets("HAS_OBSERVATION", self._match("Visit", visit_id)):
+            position = (self.strings[table.keys[o]], self._element_id("Observation", o))
+            if position > after:
+                p = table.props[o]
+                rows.append({
+                    "_key": position[0],
+                    "_id": position[1],
+                    "observation": p.get("name"),
+                    "value": p.get("value"),
+                    "unit": p.get("unit"),
+                    "time": p.get("time"),
+                })
+        rows.sort(key=lambda r: (r["_key"], r["_id"]))
+        return self._page(rows, limit)
+
+    @_locked
+    def visit_tests(self, visit_id):
+        tests = self.nodes["Test"].props
+        return [
+            {"test": tests[t].get("name"), "type": tests[t].get("type")}
+            for t, _ in self._targets("HAS_TEST", self._match("Visit", visit_id))
+        ]
+
+    @_locked
+    def diseases_for_symptom(self, symptom):
+        return self._names_of("Disease", self._targets("INDICATES", self._match("Symptom", symptom)))
+
+    @_locked
+    def symptoms_for_disease(self, disease):
+        return self._names_of("Symptom", self._sources("INDICATES", self._match("Disease", disease)))
+
+    @_locked
+    def treatments_for_disease(self, disease):
+        return self._names_of("Treatment", self._targets("TREATED_BY", self._match("Disease", disease)))
+
+    @_locked
+    def diseases_for_test(self, test_name):
+        return self._names_of("Disease", self._targets("USED_FOR_DIAGNOSIS_OF", self._match("Test", test_name)))
+
+    @_locked
+    def diseases_for_observation(self, obs_name):
+        return self._names_of("Disease", self._targets("SUPPORTS", self._match("Observation", obs_name)))
+
+    @_locked
+    def tests_for_disease(self, disease):
+        return self._names_of("Test", self._sources("USED_FOR_DIAGNOSIS_OF", self._match("Disease", disease)))
+
+    @_locked
+    def diseases_for_symptoms(self, symptoms):
+        symptom_keys = self.nodes["Symptom"].keys
+        matched = {}    # disease node -> distinct symptom keys, in match order
+        for name in symptoms:
+            for s in self._match("Symptom", name):
+                key = self.strings[symptom_keys[s]]
+                for d, _ in self.out["INDICATES"].neighbours(s):
+                    keys = matched.setdefault(d, [])
+                    if key not in keys:
+                        keys.append(key)
+        diseases = self.nodes["Disease"].props
+        rows = [
+            {"disease": diseases[d].get("name"), "match_count": len(keys), "matched": keys}
+            for d, keys in matched.items()
+        ]
+        # ORDER BY match_count DESC, disease (nulls last)
+        rows.sort(key=lambda r: (-r["match_count"], r["disease"] is None, str(r["disease"] or "")))
+        return rows
+
+    def _per_disease(self, diseases: list, neighbours, label: str) -> dict:
+        props = self.nodes[label].props
+        result = {}
+        for name in diseases:
+            values = [props[n].get("name") for d in self._match("Disease", name) for n, _ in neighbours(d)]
+            if values:
+                result.setdefault(entity_key(name), []).extend(values)
+        return result
+
+    @_locked
+    def symptoms_for_diseases(self, diseases):
+        return self._per_disease(diseases, self.inc["INDICATES"].neighbours, "Symptom")
+
+    @_locked
+    def treatments_for_diseases(self, diseases):
+        return self._per_disease(diseases, self.out["TREATED_BY"].neighbours, "Treatment")
+
+    @_locked
+    def tests_for_diseases(self, diseases):
+        return self._per_disease(diseases, self.inc["USED_FOR_DIAGNOSIS_OF"].neighbours, "Test")
+
+    @_locked
+    def observations_for_diseases(self, diseases):
+        return self._per_disease(diseases, self.inc["SUPPORTS"].neighbours, "Observation")
+
+    @_locked
+    def indicates_weights(self):
+        symptoms, diseases = self.nodes["Symptom"], self.nodes["Disease"]
+        rel_props = self.rel_props["INDICATES"]
+        rows = []
+        for s in range(len(symptoms)):
+            for d, e in self.out["INDICATES"].neighbours(s):
+                rows.append({
+                    "symptom": self.strings[symptoms.keys[s]],
+                    "disease_key": self.strings[diseases.keys[d]],
+                    "disease": diseases.props[d].get("name"),
+                    "weight": (rel_props[e] or {}).get("weight"),
+                })
+        return iter(rows)
+
+    # ---------------------------
+    # SEARCH
+    # ---------------------------
+
+    @_locked
+    def search(self, term, labels, offset=0, limit=None):
+        # Every token must match (AND), scored like Lucene: idf / sqrt(name length)
+        tokens = _tokens(term)
+        postings = [self.terms.get(t, ()) for t in tokens]
+        if not tokens or not all(postings):
+            return self._page([], limit)
+        allowed = set(labels)
+        total = sum(len(self.nodes[label]) for label in NODE_KEYS) or 1
+        idf = sum(math.log(1 + total / len(p)) for p in postings)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+
+        scored = []
+        for label, node in candidates:
+            if label not in allowed:
+                continue
+            props = self.nodes[label].props[node]
+            length = len(_tokens(props.get("name"))) + len(_tokens(props.get("id")))
+            scored.append((-idf / math.sqrt(max(1, length)), self._element_id(label, node), label, node))
+        scored.sort()
+
+        window = scored[offset:] if limit is None else scored[offset:offset + limit]
+        rows = [
+            {"name": _display(self.nodes[label].props[node]), "labels": [label], "score": round(-score, 6)}
+            for score, _, label, node in window
+        ]
+        return self._page(rows, limit)
+
+    @_locked
+    def search_prefix(self, prefix, labels, after_key, after_label, limit):
+        rows = []
+        for label in labels:
+            table = self.nodes[label]
+            keys, nodes = table.ordered(self.strings)
+            start = bisect_left(keys, max(prefix, after_key))
+            taken = 0
+            for i in range(start, len(keys)):
+                key = keys[i]
+                if taken >= limit or not key.startswith(prefix):
+                    break
+                if key > after_key or (key == after_key and label > after_label):
+                    rows.append((key, label, nodes[i]))
+                    taken += 1
+        rows.sort(key=lambda r: (r[0], r[1]))
+        return [
+            {
+                "name": _display(self.nodes[label].props[node]),
+                "labels": [label],
+                "key": key,
+                "label": label,
+                "score": len(prefix) / len(key),
+            }
+            for key, label, node in rows[:limit]
+        ]
+
+    # ---------------------------
+    # WRITES
+    # ---------------------------
+
+    @_locked
+    def merge_node(self, label, props):
+        key_field = NODE_KEYS[label]
+        table = self.nodes[label]
+        if table.unique:
+            nodes = self._merge_by_key(label, props.get(key_field))
+            extra = {k: v for k, v in props.items() if k != key_field}
+        else:
+            # MERGE on all the given properties (Observation)
+            if any(v is None for v in props.values()):
+                raise ValueError(f"Cannot merge {label} node using null property value")
+            nodes = [n for n in self._match(label, props.get(key_field))
+                     if all(table.props[n].get(k) == v for k, v in props.items())]
+            if not nodes:
+                nodes = [self.add_node(label, props)]
+            extra = {}
+        for node in nodes:
+            if extra:
+                self._set_props(table.props[node], extra)
+                self.version += 1
+        return [{"n": self._node_data(label, n)} for n in nodes]
+
+    def _link(self, rel_type: str, start, end, columns: tuple, rel_column: str | None = None,
+              props: dict | None = None) -> list:
+        """MATCH les deux extrémités par clé puis MERGE la relation (et SET de ses propriétés)."""
+        start_label, end_label = RELATIONSHIPS[rel_type]
+        rows = []
+        for a in self._match(start_label, start):
+            for b in self._match(end_label, end):
+                self._merge_edge(rel_type, a, b, props)
+                a_data, b_data = self._node_data(start_label, a), self._node_data(end_label, b)
+                row = {columns[0]: a_data, columns[1]: b_data}
+                if rel_column:
+                    # Same shape as neo4j Record.data() for a relationship
+                    row[rel_column] = (a_data, rel_type, b_data)
+                rows.append(row)
+        return rows
+
+    @_locked
+    def patient_add_symptom(self, patient, symptom, severity=None, onset_days=None):
+        return self._link("HAS_SYMPTOM", patient, symptom, ("p", "s"), "r",
+                          {"severity": severity, "onset_days": onset_days})
+
+    @_locked
+    def patient_add_risk_factor(self, patient, risk_name):
+        return self._link("HAS_RISK_FACTOR", patient, risk_name, ("p", "r"))
+
+    @_locked
+    def patient_add_visit(self, patient, visit_id):
+        return self._link("HAS_VISIT", patient, visit_id, ("p", "v"))
+
+    @_locked
+    def visit_add_observation(self, visit_id, name):
+        return self._link("HAS_OBSERVATION", visit_id, name, ("v", "o"))
+
+    @_locked
+    def visit_add_test(self, visit_id, test_name):
+        return self._link("HAS_TEST", visit_id, test_name, ("v", "t"))
+
+    @_locked
+    def symptom_indicates_disease(self, symptom, disease, weight=None):
+        return self._link("INDICATES", symptom, disease, ("s", "d"), "r", {"weight": weight})
+
+    @_locked
+    def disease_add_treatment(self, disease, treatment, line=None, recommended=None):
+        return self._link("TREATED_BY", disease, treatment, ("d", "t"), "r",
+                          {"line": line, "recommended": recommended})
+
+    @_locked
+    def test_used_for_diagnosis(self, test_name, disease):
+        return self._link("USED_FOR_DIAGNOSIS_OF", test_name, disease, ("t", "d"))
+
+    @_locked
+    def observation_supports_disease(self, observation_name, disease):
+        return self._link("SUPPORTS", observation_name, disease, ("o", "d"))
+
+    @_locked
+    def write_nodes(self, label, rows):
+        # All or nothing, like one UNWIND transaction: check every row first
+        for row in rows:
+            if row.get("key") is None:
+                raise ValueError(f"Cannot merge {label} node using null property value for key")
+        for row in rows:
+            for node in self._merge_by_key(label, row["key"]):
+                if row.get("props"):
+                    self._set_props(self.nodes[label].props[node], row["props"])
+                    self.version += 1
+
+    @_locked
+    def write_relationships(self, rel_type, rows):
+        start_label, end_label = RELATIONSHIPS[rel_type]
+        for row in rows:
+            if row.get("start") is None or row.get("end") is None:
+                raise ValueError(f"Cannot merge {rel_type} endpoints using null property value for key")
+        for row in rows:
+            for a in self._merge_by_key(start_label, row["start"]):
+                for b in self._merge_by_key(end_label, row["end"]):
+                    self._merge_edge(rel_type, a, b, row.get("props") or None)
+
+    # ---------------------------
+    # SNAPSHOT (ZIP: JSON + RAW ARRAYS)
+    # ---------------------------
+
+    def save(self, path: str | None = None) -> str:
+        """Écrit le graphe dans path (fichier temporaire puis renommage atomique)."""
+        path = path or self.snapshot_path
+        if not path:
+            raise ValueError("No snapshot path (GRAPH_SNAPSHOT_PATH)")
+        with self._lock:
+            self.compact()
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, tmp = tempfile.mkstemp(prefix=".graph-snapshot-", dir=directory)
+            os.close(fd)
+            try:
+                with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as z:
+                    z.writestr("meta.json", json.dumps({
+                        "format": SNAPSHOT_FORMAT,
+                        "byteorder": sys.byteorder,
+                        "version": self.version,
+                        "saved_at": time.time(),
+                        "counts": self._counts(),
+                    }))
+                    z.writestr("strings.json", json.dumps(self.strings.strings))
+                    for label, table in self.nodes.items():
+                        z.writestr(f"nodes/{label}.keys", table.keys.tobytes())
+                        z.writestr(f"nodes/{label}.props.json", json.dumps(table.props))
+                    for rel_type in RELATIONSHIPS:
+                        for direction, adjacency in (("out", self.out[rel_type]), ("in", self.inc[rel_type])):
+                            for part in ("offsets", "targets", "edges"):
+                                z.writestr(f"rels/{rel_type}.{direction}.{part}", getattr(adjacency, part).tobytes())
+                        z.writestr(f"rels/{rel_type}.props.json", json.dumps(self.rel_props[rel_type]))
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self.saved_version = self.version
+            self.last_saved = time.time()
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "MemoryGraph":
+        started = time.perf_counter()
+        graph = cls()
+        with zipfile.ZipFile(path) as z:
+            meta = json.loads(z.read("meta.json"))
+            if meta.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"Unsupported graph snapshot format {meta.get('format')!r}")
+            swap = meta.get("byteorder") != sys.byteorder
+
+            def arr(name):
+                values = array("q")
+                values.frombytes(z.read(name))
+                if swap:
+                    values.byteswap()
+                return values
+
+            graph.strings = StringTable(json.loads(z.read("strings.json")))
+            for label, table in graph.nodes.items():
+                table.keys = arr(f"nodes/{label}.keys")
+                table.props = [
+                    {k: graph.strings.canonical(v) for k, v in p.items()}
+                    for p in json.loads(z.read(f"nodes/{label}.props.json"))
+                ]
+                for node, key_id in enumerate(table.keys):
+                    if table.unique:
+                        table.index[key_id] = node
+                    else:
+                        table.index.setdefault(key_id, []).append(node)
+                    graph._index_text(label, node, table.props[node])
+            for rel_type in RELATIONSHIPS:
+                for direction, adjacency in (("out", graph.out[rel_type]), ("in", graph.inc[rel_type])):
+                    for part in ("offsets", "targets", "edges"):
+                        setattr(adjacency, part, arr(f"rels/{rel_type}.{direction}.{part}"))
+                graph.rel_props[rel_type] = json.loads(z.read(f"rels/{rel_type}.props.json"))
+        graph.version = graph.saved_version = meta.get("version", 0)
+        graph.snapshot_path = path
+        graph.last_saved = meta.get("saved_at")
+        graph.load_seconds = round(time.perf_counter() - started, 4)
+        return graph
+
+    # ---------------------------
+    # ADMIN
+    # ---------------------------
+
+    def _counts(self) -> dict:
+        return {
+            "nodes": {label: len(table) for label, table in self.nodes.items()},
+            "relationships": {rel: len(self.rel_props[rel]) for rel in RELATIONSHIPS},
+        }
+
+    @_locked
+    def metrics(self):
+        array_bytes = sum(
+            a.buffer_info()[1] * a.itemsize
+            for rel in RELATIONSHIPS
+            for adjacency in (self.out[rel], self.inc[rel])
+            for a in (adjacency.offsets, adjacency.targets, adjacency.edges)
+        ) + sum(t.keys.buffer_info()[1] * t.keys.itemsize for t in self.nodes.values())
+        return {
+            "backend": self.name,
+            **self._counts(),
+            "strings": len(self.strings),
+            "terms": len(self.terms),
+            "pending_edges": sum(a.pending_count for adj in (self.out, self.inc) for a in adj.values()),
+            "compactions": self.compactions,
+            "array_bytes": array_bytes,
+            "version": self.version,
+            "unsaved_changes": self.version != self.saved_version,
+            "snapshot_path": self.snapshot_path or None,
+            "last_saved": self.last_saved,
+            "load_seconds": self.load_seconds,
+        }
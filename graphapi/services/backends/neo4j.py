@@ -0,0 +1,584 @@
+import re
+
+from graphapi.services.backends.base import GraphBackend
+from graphapi.services.schema import (
+    FULLTEXT_INDEX,
+    KEY_PROPERTY,
+    NODE_KEYS,
+    RELATIONSHIPS,
+    UNIQUE_LABELS,
+    key_expr,
+)
+
+
+# ======================================================
+#            NEO4J BACKEND (CYPHER, POOLED DRIVER)
+# ======================================================
+#
+# Every query returns flat columns with only the properties the API shows
+# (never whole nodes/relationships): smaller rows on the wire, in the read
+# cache and in the JSON responses. The *_QUERY constants are shared with
+# async_graph_read.
+
+def _names_query(label: str) -> str:
+    return f"MATCH (n:{label}) RETURN toLower(n.name) AS name"
+
+
+PATIENTS_QUERY = """
+MATCH (p:Patient)
+WHERE p.key > $after_key
+RETURN p.key AS _key, p.name AS name, p.age AS age, p.gender AS gender
+ORDER BY p.key
+"""
+
+PATIENT_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($name)))})
+RETURN p.name AS name, p.age AS age, p.gender AS gender
+"""
+
+PATIENT_SYMPTOMS_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($name)))})
+MATCH (p)-[r:HAS_SYMPTOM]->(s:Symptom)
+RETURN s.name AS symptom, r.severity AS severity, r.onset_days AS onset_days
+"""
+
+PATIENT_RISK_FACTORS_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($name)))})
+MATCH (p)-[:HAS_RISK_FACTOR]->(r:RiskFactor)
+RETURN r.name AS risk_factor
+"""
+
+PATIENT_VISITS_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($name)))})
+MATCH (p)-[:HAS_VISIT]->(v:Visit)
+WHERE v.key > $after_key
+RETURN v.key AS _key, v.id AS visit_id, v.date AS date, v.reason AS reason
+ORDER BY v.key
+"""
+
+# Several Observation nodes may share a key: elementId breaks the ties
+VISIT_OBSERVATIONS_QUERY = """
+MATCH (v:Visit {key: toLower(trim(toString($id)))})
+MATCH (v)-[:HAS_OBSERVATION]->(o:Observation)
+WHERE o.key > $after_key OR (o.key = $after_key AND elementId(o) > $after_id)
+RETURN o.key AS _key, elementId(o) AS _id, o.name AS observation, o.value AS value, o.unit AS unit, o.time AS time
+ORDER BY o.key, elementId(o)
+"""
+
+VISIT_TESTS_QUERY = """
+MATCH (v:Visit {key: toLower(trim(toString($id)))})
+MATCH (v)-[:HAS_TEST]->(t:Test)
+RETURN t.name AS test, t.type AS type
+"""
+
+DISEASES_FOR_SYMPTOM_QUERY = """
+MATCH (s:Symptom {key: toLower(trim(toString($symptom)))})
+MATCH (s)-[:INDICATES]->(d:Disease)
+RETURN d.name AS disease
+"""
+
+SYMPTOMS_FOR_DISEASE_QUERY = """
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MATCH (s:Symptom)-[:INDICATES]->(d)
+RETURN s.name AS symptom
+"""
+
+TREATMENTS_FOR_DISEASE_QUERY = """
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MATCH (d)-[:TREATED_BY]->(t:Treatment)
+RETURN t.name AS treatment
+"""
+
+DISEASES_FOR_TEST_QUERY = """
+MATCH (t:Test {key: toLower(trim(toString($name)))})
+MATCH (t)-[:USED_FOR_DIAGNOSIS_OF]->(d:Disease)
+RETURN d.name AS disease
+"""
+
+DISEASES_FOR_OBSERVATION_QUERY = """
+MATCH (o:Observation {key: toLower(trim(toString($name)))})
+MATCH (o)-[:SUPPORTS]->(d:Disease)
+RETURN d.name AS disease
+"""
+
+TESTS_FOR_DISEASE_QUERY = """
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MATCH (t:Test)-[:USED_FOR_DIAGNOSIS_OF]->(d)
+RETURN t.name AS test
+"""
+
+# ---------------------------
+# BATCHED LOOKUPS (ONE ROUND TRIP FOR N ENTITIES)
+# ---------------------------
+
+DISEASES_FOR_SYMPTOMS_QUERY = """
+UNWIND $symptoms AS name
+MATCH (s:Symptom {key: toLower(trim(toString(name)))})
+MATCH (s)-[:INDICATES]->(d:Disease)
+WITH d, collect(DISTINCT s.key) AS matched
+RETURN d.name AS disease, size(matched) AS match_count, matched
+ORDER BY match_count DESC, disease
+"""
+
+SYMPTOMS_FOR_DISEASES_QUERY = """
+UNWIND $diseases AS name
+MATCH (d:Disease {key: toLower(trim(toString(name)))})
+MATCH (s:Symptom)-[:INDICATES]->(d)
+RETURN toLower(trim(toString(name))) AS disease, collect(s.name) AS symptoms
+"""
+
+TREATMENTS_FOR_DISEASES_QUERY = """
+UNWIND $diseases AS name
+MATCH (d:Disease {key: toLower(trim(toString(name)))})
+MATCH (d)-[:TREATED_BY]->(t:Treatment)
+RETURN toLower(trim(toString(name))) AS disease, collect(t.name) AS treatments
+"""
+
+TESTS_FOR_DISEASES_QUERY = """
+UNWIND $diseases AS name
+MATCH (d:Disease {key: toLower(trim(toString(name)))})
+MATCH (t:Test)-[:USED_FOR_DIAGNOSIS_OF]->(d)
+RETURN toLower(trim(toString(name))) AS disease, collect(t.name) AS tests
+"""
+
+OBSERVATIONS_FOR_DISEASES_QUERY = """
+UNWIND $diseases AS name
+MATCH (d:Disease {key: toLower(trim(toString(name)))})
+MATCH (o:Observation)-[:SUPPORTS]->(d)
+RETURN toLower(trim(toString(name))) AS disease, collect(o.name) AS observations
+"""
+
+# Every weighted edge of the symptom -> disease matrix (diagnosis.py)
+INDICATES_WEIGHTS_QUERY = """
+MATCH (s:Symptom)-[r:INDICATES]->(d:Disease)
+RETURN s.key AS symptom, d.key AS disease_key, d.name AS disease, r.weight AS weight
+"""
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+
+# Characters with a meaning in Lucene query syntax
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def _lucene_query(term: str) -> str:
+    tokens = [_LUCENE_SPECIAL.sub(r"\\\1", t) for t in term.lower().split()]
+    return " AND ".join(tokens)
+
+
+SEARCH_QUERY = f"""
+CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $query)
+YIELD node, score
+WHERE any(l IN labels(node) WHERE l IN $labels)
+RETURN coalesce(node.name, node.id) AS name, labels(node) AS labels, score
+ORDER BY score DESC, elementId(node)
+"""
+
+
+def _search_prefix_query(labels: list) -> str:
+    # One index-backed branch per label, merged on the key
+    branches = "\n        UNION ALL\n".join(
+        f"""
+        MATCH (n:{label})
+        WHERE n.key STARTS WITH $prefix AND (n.key > $after_key OR (n.key = $after_key AND '{label}' > $after_label))
+        RETURN coalesce(n.name, n.id) AS name, labels(n) AS labels, n.key AS key, '{label}' AS label
+        ORDER BY n.key
+        LIMIT $limit"""
+        for label in labels
+    )
+    return f"""
+    CALL {{{branches}
+    }}
+    RETURN name, labels, key, label, toFloat(size($prefix)) / size(key) AS score
+    ORDER BY key, label
+    LIMIT $limit
+    """
+
+
+# ---------------------------
+# WRITES
+# ---------------------------
+
+PATIENT_ADD_SYMPTOM_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($patient)))})
+MATCH (s:Symptom {key: toLower(trim(toString($symptom)))})
+MERGE (p)-[r:HAS_SYMPTOM]->(s)
+SET r.severity = $severity,
+    r.onset_days = $onset_days
+RETURN p, r, s
+"""
+
+PATIENT_ADD_RISK_FACTOR_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($patient)))})
+MATCH (r:RiskFactor {key: toLower(trim(toString($risk_name)))})
+MERGE (p)-[:HAS_RISK_FACTOR]->(r)
+RETURN p, r
+"""
+
+PATIENT_ADD_VISIT_QUERY = """
+MATCH (p:Patient {key: toLower(trim(toString($patient)))})
+MATCH (v:Visit {key: toLower(trim(toString($visit_id)))})
+MERGE (p)-[:HAS_VISIT]->(v)
+RETURN p, v
+"""
+
+VISIT_ADD_OBSERVATION_QUERY = """
+MATCH (v:Visit {key: toLower(trim(toString($visit_id)))})
+MATCH (o:Observation {key: toLower(trim(toString($name)))})
+MERGE (v)-[:HAS_OBSERVATION]->(o)
+RETURN v, o
+"""
+
+VISIT_ADD_TEST_QUERY = """
+MATCH (v:Visit {key: toLower(trim(toString($visit_id)))})
+MATCH (t:Test {key: toLower(trim(toString($test_name)))})
+MERGE (v)-[:HAS_TEST]->(t)
+RETURN v, t
+"""
+
+SYMPTOM_INDICATES_DISEASE_QUERY = """
+MATCH (s:Symptom {key: toLower(trim(toString($symptom)))})
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MERGE (s)-[r:INDICATES]->(d)
+SET r.weight = $weight
+RETURN s, r, d
+"""
+
+DISEASE_ADD_TREATMENT_QUERY = """
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MATCH (t:Treatment {key: toLower(trim(toString($treatment)))})
+MERGE (d)-[r:TREATED_BY]->(t)
+SET r.line = $line,
+    r.recommended = $recommended
+RETURN d, r, t
+"""
+
+TEST_USED_FOR_DIAGNOSIS_QUERY = """
+MATCH (t:Test {key: toLower(trim(toString($test_name)))})
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MERGE (t)-[:USED_FOR_DIAGNOSIS_OF]->(d)
+RETURN t, d
+"""
+
+OBSERVATION_SUPPORTS_DISEASE_QUERY = """
+MATCH (o:Observation {key: toLower(trim(toString($obs)))})
+MATCH (d:Disease {key: toLower(trim(toString($disease)))})
+MERGE (o)-[:SUPPORTS]->(d)
+RETURN o, d
+"""
+
+
+def _node_batch_query(label: str) -> str:
+    key = NODE_KEYS[label]
+    return f"""
+    UNWIND $rows AS row
+    MERGE (n:{label} {{{KEY_PROPERTY}: {key_expr("row.key")}}})
+    ON CREATE SET n.{key} = row.key
+    SET n += row.props
+    """
+
+
+def _relationship_batch_query(rel_type: str) -> str:
+    start, end = RELATIONSHIPS[rel_type]
+    return f"""
+    UNWIND $rows AS row
+    MERGE (a:{start} {{{KEY_PROPERTY}: {key_expr("row.start")}}})
+    ON CREATE SET a.{NODE_KEYS[start]} = row.start
+    MERGE (b:{end} {{{KEY_PROPERTY}: {key_expr("row.end")}}})
+    ON CREATE SET b.{NODE_KEYS[end]} = row.end
+    MERGE (a)-[r:{rel_type}]->(b)
+    SET r += row.props
+    """
+
+
+# ---------------------------
+# QUERY PLANS (SEVERAL READS, ONE STATEMENT)
+# ---------------------------
+#
+# Each read of a plan becomes a unit subquery that collects its rows into
+# one list column (r0, r1...), so the whole plan is one statement and one
+# round trip; parameters are prefixed per read (p0_name, p1_name...).
+
+_PARAM = re.compile(r"\$(\w+)")
+_LAST_RETURN = re.compile(r"\bRETURN\b(?!.*\bRETURN\b)(.*?)(?:\bORDER BY\b|\bSKIP\b|\bLIMIT\b|$)", re.S)
+_ALIAS = re.compile(r"\bAS\s+(\w+)\s*$", re.I)
+
+
+def _return_columns(query: str) -> list[str]:
+    columns, depth, current = [], 0, ""
+    for ch in _LAST_RETURN.search(query).group(1):
+        depth += (ch in "([{") - (ch in ")]}")
+        if ch == "," and not depth:
+            columns.append(current)
+            current = ""
+        else:
+            current += ch
+    columns.append(current)
+    names = []
+    for column in columns:
+        alias = _ALIAS.search(column.strip())
+        names.append(alias.group(1) if alias else column.strip())
+    return names
+
+
+def compile_plan(statements: list) -> tuple[str, dict]:
+    """statements : [(query, params)] -> (requête unique, paramètres)."""
+    parts, params = [], {}
+    for i, (query, values) in enumerate(statements):
+        prefix = f"p{i}_"
+        body = _PARAM.sub(lambda m: f"${prefix}{m.group(1)}", query.strip())
+        fields = ", ".join(f"{c}: {c}" for c in _return_columns(query))
+        parts.append(f"CALL {{\n  CALL {{\n{body}\n  }}\n  RETURN collect({{{fields}}}) AS r{i}\n}}")
+        params.update({prefix + name: value for name, value in values.items()})
+    columns = ", ".join(f"r{i}" for i in range(len(statements)))
+    return "\n".join(parts) + f"\nRETURN {columns}", params
+
+
+class _PlanRecorder:
+    """Tient lieu de connexion : note la requête de chaque lecture sans l'exécuter."""
+
+    def __init__(self):
+        self.statements = []
+
+    def read(self, query, /, **params):
+        self.statements.append((query, params))
+        return []
+
+    def stream(self, query, /, **params):
+        self.statements.append((query, params))
+        return iter(())
+
+
+class _PlanReplay:
+    """Rejoue les lignes d'une sous-requête du plan dans la méthode de lecture."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def read(self, query, /, **params):
+        return self.rows
+
+    def stream(self, query, /, **params):
+        return iter(self.rows)
+
+
+def record_plan(calls: dict) -> list | None:
+    """
+    Requêtes des lectures du plan, notées sans être exécutées.
+    None quand une lecture n'est pas une requête unique.
+    """
+    recorder = _PlanRecorder()
+    for method, args, kwargs in calls.values():
+        getattr(Neo4jBackend(recorder), method)(*args, **kwargs)
+    if len(recorder.statements) != len(calls):
+        return None
+    return recorder.statements
+
+
+def replay_plan(calls: dict, row: dict) -> dict:
+    """Résultat de chaque lecture, façonné par sa méthode à partir de sa colonne r{i}."""
+    return {
+        key: getattr(Neo4jBackend(_PlanReplay(row[f"r{i}"])), method)(*args, **kwargs)
+        for i, (key, (method, args, kwargs)) in enumerate(calls.items())
+    }
+
+
+class Neo4jBackend(GraphBackend):
+    name = "neo4j"
+
+    def __init__(self, graph=None):
+        self._graph = graph
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            from graphapi.services.db import get_graph
+
+            self._graph = get_graph()
+        return self._graph
+
+    def _rows(self, q: str, limit: int | None, **params):
+        """limit=None : flux depuis le curseur Neo4j ; sinon une page."""
+        if limit is None:
+            return self.graph.stream(q, **params)
+        return self.graph.read(q + "\nLIMIT $limit", limit=limit, **params)
+
+    def _column(self, q: str, column: str, **params) -> list:
+        return [r[column] for r in self.graph.read(q, **params)]
+
+    def _per_disease(self, q: str, diseases: list, field: str) -> dict:
+        records = self.graph.read(q, diseases=list(diseases))
+        return {r["disease"]: r[field] for r in records}
+
+    # ---------------------------
+    # READS
+    # ---------------------------
+
+    def names(self, label):
+        return self._column(_names_query(label), "name")
+
+    def patients(self, after_key="", after_id="", limit=None):
+        return self._rows(PATIENTS_QUERY, limit, after_key=after_key, after_id=after_id)
+
+    def patient(self, name):
+        return self.graph.read(PATIENT_QUERY, name=name)
+
+    def patient_symptoms(self, name):
+        return self.graph.read(PATIENT_SYMPTOMS_QUERY, name=name)
+
+    def patient_risk_factors(self, name):
+        return self.graph.read(PATIENT_RISK_FACTORS_QUERY, name=name)
+
+    def patient_visits(self, name, after_key="", after_id="", limit=None):
+        return self._rows(PATIENT_VISITS_QUERY, limit, name=name, after_key=after_key, after_id=after_id)
+
+    def visit_observations(self, visit_id, after_key="", after_id="", limit=None):
+        return self._rows(VISIT_OBSERVATIONS_QUERY, limit, id=visit_id, after_key=after_key, after_id=after_id)
+
+    def visit_tests(self, visit_id):
+        return self.graph.read(VISIT_TESTS_QUERY, id=visit_id)
+
+    def diseases_for_symptom(self, symptom):
+        return self._column(DISEASES_FOR_SYMPTOM_QUERY, "disease", symptom=symptom)
+
+    def symptoms_for_disease(self, disease):
+        return self._column(SYMPTOMS_FOR_DISEASE_QUERY, "symptom", disease=disease)
+
+    def treatments_for_disease(self, disease):
+        return self._column(TREATMENTS_FOR_DISEASE_QUERY, "treatment", disease=disease)
+
+    def diseases_for_test(self, test_name):
+        return self._column(DISEASES_FOR_TEST_QUERY, "disease", name=test_name)
+
+    def diseases_for_observation(self, obs_name):
+        return self._column(DISEASES_FOR_OBSERVATION_QUERY, "disease", name=obs_name)
+
+    def tests_for_disease(self, disease):
+        return self._column(TESTS_FOR_DISEASE_QUERY, "test", disease=disease)
+
+    def diseases_for_symptoms(self, symptoms):
+        return self.graph.read(DISEASES_FOR_SYMPTOMS_QUERY, symptoms=list(symptoms))
+
+    def symptoms_for_diseases(self, diseases):
+        return self._per_disease(SYMPTOMS_FOR_DISEASES_QUERY, diseases, "symptoms")
+
+    def treatments_for_diseases(self, diseases):
+        return self._per_disease(TREATMENTS_FOR_DISEASES_QUERY, diseases, "treatments")
+
+    def tests_for_diseases(self, diseases):
+        return self._per_disease(TESTS_FOR_DISEASES_QUERY, diseases, "tests")
+
+    def observations_for_diseases(self, diseases):
+        return self._per_disease(OBSERVATIONS_FOR_DISEASES_QUERY, diseases, "observations")
+
+    def indicates_weights(self):
+        return self.graph.stream(INDICATES_WEIGHTS_QUERY)
+
+    def run_plan(self, calls):
+        # The read methods build the statements and shape the rows as usual:
+        # recorded first, then replayed on their slice of the combined row
+        statements = record_plan(calls)
+        if statements is None:
+            return super().run_plan(calls)
+
+        query, params = compile_plan(statements)
+        return replay_plan(calls, self.graph.read(query, **params)[0])
+
+    def search(self, term, labels, offset=0, limit=None):
+        params = {"query": _lucene_query(term), "labels": labels}
+        if limit is None:
+            return self.graph.stream(SEARCH_QUERY, **params)
+        return self.graph.read(SEARCH_QUERY + "SKIP $offset\nLIMIT $limit", offset=offset, limit=limit, **params)
+
+    def search_prefix(self, prefix, labels, after_key, after_label, limit):
+        return self.graph.read(
+            _search_prefix_query(labels),
+            prefix=prefix,
+            after_key=after_key,
+            after_label=after_label,
+            limit=limit,
+        )
+
+    # ---------------------------
+    # WRITES
+    # ---------------------------
+
+    def merge_node(self, label, props):
+        # Unique labels MERGE on the normalised key and update the other
+        # properties; Observation nodes MERGE on all their properties
+        key_field = NODE_KEYS[label]
+        if label in UNIQUE_LABELS:
+            query = f"""
+            MERGE (n:{label} {{{KEY_PROPERTY}: {key_expr("$key")}}})
+            ON CREATE SET n.{key_field} = $key
+            SET n += $props
+            RETURN n
+            """
+            extra = {k: v for k, v in props.items() if k != key_field}
+            return self.graph.write(query, key=props[key_field], props=extra)
+
+        fields = ", ".join([f"{k}: ${k}" for k in props.keys()])
+        query = f"""
+        MERGE (n:{label} {{ {fields} }})
+        SET n.{KEY_PROPERTY} = {key_expr(f"n.{key_field}")}
+        RETURN n
+        """
+        return self.graph.write(query, **props)
+
+    def patient_add_symptom(self, patient, symptom, severity=None, onset_days=None):
+        return self.graph.write(
+            PATIENT_ADD_SYMPTOM_QUERY,
+            patient=patient,
+            symptom=symptom,
+            severity=severity,
+            onset_days=onset_days,
+        )
+
+    def patient_add_risk_factor(self, patient, risk_name):
+        return self.graph.write(PATIENT_ADD_RISK_FACTOR_QUERY, patient=patient, risk_name=risk_name)
+
+    def patient_add_visit(self, patient, visit_id):
+        return self.graph.write(PATIENT_ADD_VISIT_QUERY, patient=patient, visit_id=visit_id)
+
+    def visit_add_observation(self, visit_id, name):
+        return self.graph.write(VISIT_ADD_OBSERVATION_QUERY, visit_id=visit_id, name=name)
+
+    def visit_add_test(self, visit_id, test_name):
+        return self.graph.write(VISIT_ADD_TEST_QUERY, visit_id=visit_id, test_name=test_name)
+
+    def symptom_indicates_disease(self, symptom, disease, weight=None):
+        return self.graph.write(SYMPTOM_INDICATES_DISEASE_QUERY, symptom=symptom, disease=disease, weight=weight)
+
+    def disease_add_treatment(self, disease, treatment, line=None, recommended=None):
+        return self.graph.write(
+            DISEASE_ADD_TREATMENT_QUERY,
+            disease=disease,
+            treatment=treatment,
+            line=line,
+            recommended=recommended,
+        )
+
+    def test_used_for_diagnosis(self, test_name, disease):
+        return self.graph.write(TEST_USED_FOR_DIAGNOSIS_QUERY, test_name=test_name, disease=disease)
+
+    def observation_supports_disease(self, observation_name, disease):
+        return self.graph.write(OBSERVATION_SUPPORTS_DISEASE_QUERY, obs=observation_name, disease=disease)
+
+    def write_nodes(self, label, rows):
+        # One managed transaction per chunk (replayed on transient errors)
+        self.graph.write(_node_batch_query(label), rows=rows)
+
+    def write_relationships(self, rel_type, rows):
+        self.graph.write(_relationship_batch_query(rel_type), rows=rows)
+
+    # ---------------------------
+    # ADMIN
+    # ---------------------------
+
+    def metrics(self):
+        return {"backend": self.name, **self.graph.metrics()}
+
+    def close(self):
+        if self._graph is not None:
+            self._graph.close()
@@ -0,0 +1,394 @@
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+
+# ======================================================
+#          READ-THROUGH CACHE FOR graph_read LOOKUPS
+# ======================================================
+#
+# Entries are tagged with the entities they depend on:
+#   "Symptom:fever"  -> a lookup keyed on one entity
+#   "Symptom:*"      -> a lookup over the whole label (all_symptoms, ...)
+#   "*"              -> a lookup over the whole graph (search)
+#
+# graph_write calls invalidate(label, name) for every entity it touches, which
+# drops the entity tag, the label-wide tag and the global tag.
+#
+# invalidate() only reaches this process. A GET answered with an ETag pins
+# the graph version counters it was computed from (ReadCache.pinned): an entry
+# loaded under other versions, e.g. before another worker's write, is a miss.
+
+GLOBAL_TAG = "*"
+
+
+def entity_key(value) -> str:
+    # graph_read matches names with toLower(...) so the cache does the same
+    return str(value).strip().lower() if value is not None else ""
+
+
+def entity_tag(label: str, name) -> str:
+    return f"{label}:{entity_key(name)}"
+
+
+def label_tag(label: str) -> str:
+    return f"{label}:*"
+
+
+# Version stamp of the conditional GET being served (None: no ETag)
+_stamp = contextvars.ContextVar("graph_read_stamp", default=None)
+
+
+def _copy(value):
+    """
+    Copie des listes / dicts d'un résultat : l'entrée du cache n'est jamais
+    partagée avec un appelant qui pourrait la modifier.
+    """
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    return value
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadCache:
+    def __init__(self, max_entries: int = 2048, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, value, tags, stamp)
+        self._tags = {}                 # tag -> set(keys)
+        self._inflight = {}             # (key, stamp) -> _InFlight
+        self._ainflight = {}            # (event loop, key, stamp) -> asyncio.Future
+        self._generation = 0
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.outdated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    # ---------------------------
+    # LOOKUP
+    # ---------------------------
+
+    @contextmanager
+    def pinned(self, stamp):
+        """
+        Pendant le bloc, une entrée n'est servie que si elle a été chargée
+        sous le même stamp (versions du graphe lues par la requête).
+        stamp=None : pas de contrainte.
+        """
+        token = _stamp.set(stamp)
+        try:
+            yield
+        finally:
+            _stamp.reset(token)
+
+    def _lookup(self, key, stamp):
+        """Entrée valide pour ce stamp (verrou tenu) ; sinon None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        if stamp is not None and entry[3] != stamp:
+            # Loaded before a write this process was not told about
+            self._drop(key)
+            self.outdated += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def get_or_load(self, key, tags, loader):
+        if not self.enabled:
+            return loader()
+
+        stamp = _stamp.get()
+        flight_key = (key, stamp)
+        with self._lock:
+            entry = self._lookup(key, stamp)
+            if entry is not None:
+                return _copy(entry[1])
+
+            call = self._inflight.get(flight_key)
+            if call is not None:
+                # Someone is already loading this key: wait for their result
+                self.coalesced += 1
+                owner = False
+            else:
+                call = _InFlight()
+                self._inflight[flight_key] = call
+                self.misses += 1
+                owner = True
+            generation = self._generation
+
+        if not owner:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return _copy(call.value)
+
+        try:
+            value = loader()
+        except Exception as exc:
+            call.error = exc
+            with self._lock:
+                self._inflight.pop(flight_key, None)
+            call.event.set()
+            raise
+
+        # The caller gets `value`; the cache and the waiters share a copy
+        call.value = _copy(value)
+        with self._lock:
+            self._inflight.pop(flight_key, None)
+            # A write landed while we were loading: the value may be stale
+            if generation == self._generation:
+                self._store(key, tags, call.value, stamp)
+        call.event.set()
+        return value
+
+    async def aget_or_load(self, key, tags, loader):
+        """Variante asyncio : loader() renvoie une coroutine."""
+        if not self.enabled:
+            return await loader()
+
+        loop = asyncio.get_running_loop()
+        stamp = _stamp.get()
+        flight_key = (id(loop), key, stamp)
+        with self._lock:
+            entry = self._lookup(key, stamp)
+            if entry is not None:
+                return _copy(entry[1])
+
+            future = self._ainflight.get(flight_key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = loop.create_future()
+                self._ainflight[flight_key] = future
+                self.misses += 1
+                owner = True
+            generation = self._generation
+
+        if not owner:
+            # shield: a cancelled waiter must not cancel the shared load
+            return _copy(await asyncio.shield(future))
+
+        try:
+            value = await loader()
+        except BaseException as exc:
+            with self._lock:
+                self._ainflight.pop(flight_key, None)
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+                future.exception()  # marks it retrieved when nobody was waiting
+            raise
+
+        shared = _copy(value)
+        with self._lock:
+            self._ainflight.pop(flight_key, None)
+            if generation == self._generation:
+                self._store(key, tags, shared, stamp)
+        future.set_result(shared)
+        return value
+
+    def _store(self, key, tags, value, stamp=None):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tags, stamp)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    # ---------------------------
+    # INVALIDATION
+    # ---------------------------
+
+    def invalidate(self, label: str, name=None):
+        """
+        Invalide les lectures qui dépendent de l'entité (label, name).
+        Sans name, toutes les lectures du label sont invalidées.
+        """
+        if name is None:
+            prefix = f"{label}:"
+            with self._lock:
+                tags = [t for t in self._tags if t.startswith(prefix)]
+        else:
+            tags = [entity_tag(label, name), label_tag(label)]
+        tags.append(GLOBAL_TAG)
+
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener(label, name)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def add_listener(self, callback):
+        """callback(label, name) est appelé après chaque invalidation."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    # ---------------------------
+    # STATS
+    # ---------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "outdated": self.outdated,
+                "in_flight": len(self._inflight) + len(self._ainflight),
+            }
+
+
+read_cache = ReadCache(
+    max_entries=getattr(settings, "GRAPH_CACHE_MAX_ENTRIES", 2048),
+    ttl=getattr(settings, "GRAPH_CACHE_TTL", 300),
+)
+
+
+# cached_read(label) without `entity`: the first parameter names the entity
+FIRST_PARAMETER = object()
+
+
+def _freeze(value, entity: bool = False):
+    """
+    Valeur hashable pour la clé du cache. Seuls les noms d'entités sont
+    normalisés (comme les requêtes : toLower(trim(...))) ; les autres
+    arguments (curseurs, limites, modes) sont gardés tels quels.
+    """
+    if isinstance(value, str):
+        return entity_key(value) if entity else value
+    if isinstance(value, (list, tuple, set)):
+        if entity:
+            return tuple(sorted(_freeze(v, True) for v in value))
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def cached_read(label: str | None = None, entity=FIRST_PARAMETER):
+    """
+    Décorateur read-through pour les fonctions de graph_read.
+
+    label=None        -> dépend de tout le graphe (tag global)
+    pas d'entité      -> dépend de tout le label (fonction sans paramètre,
+                         ou entity=None : list_patients(limit, cursor))
+    sinon             -> dépend de l'entité passée en paramètre `entity`
+                         (le premier par défaut ; une liste d'entités donne
+                         un tag par entité)
+    Les arguments sont liés à la signature : f("x", 10) et f("x", limit=10)
+    partagent la même entrée.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        names = list(signature.parameters)
+        if entity is FIRST_PARAMETER:
+            entity_name = names[0] if names else None
+        else:
+            entity_name = entity
+
+        def tags_and_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            value = arguments.get(entity_name) if entity_name else None
+
+            if label is None:
+                tags = (GLOBAL_TAG,)
+            elif entity_name is None:
+                tags = (label_tag(label),)
+            elif isinstance(value, (list, tuple, set)):
+                tags = tuple(entity_tag(label, v) for v in value)
+            else:
+                tags = (entity_tag(label, value),)
+
+            key = (
+                func.__module__,
+                func.__name__,
+                tuple((name, _freeze(v, name == entity_name)) for name, v in arguments.items()),
+            )
+            return tags, key
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                tags, key = tags_and_key(args, kwargs)
+                return await read_cache.aget_or_load(key, tags, lambda: func(*args, **kwargs))
+
+            async_wrapper.uncached = func
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tags, key = tags_and_key(args, kwargs)
+            return read_cache.get_or_load(key, tags, lambda: func(*args, **kwargs))
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
@@ -1,11 +1,256 @@
 #la connexion au driver Neo4j
-from py2neo import Graph
+import asyncio
+import threading
+import time
+import weakref
+
 import os
 from dotenv import load_dotenv   # AJOUT
 
-load_dotenv()   
-def get_graph():
-    return Graph(
-        os.getenv("NEO4J_URI"),
-        auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
-    )
+from graphapi.services.query_profiler import query_profiler
+
+load_dotenv()
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Réglages du pool (voir README) ; lus ici plutôt que dans settings pour que
+# les scripts et migrations puissent ouvrir une connexion sans Django
+POOL_CONFIG = {
+    "max_connection_pool_size": int(_env_float("NEO4J_MAX_POOL_SIZE", 100)),
+    "connection_acquisition_timeout": _env_float("NEO4J_ACQUISITION_TIMEOUT", 60.0),
+    "max_connection_lifetime": _env_float("NEO4J_MAX_CONNECTION_LIFETIME", 3600.0),
+    "connection_timeout": _env_float("NEO4J_CONNECTION_TIMEOUT", 30.0),
+    "max_transaction_retry_time": _env_float("NEO4J_MAX_RETRY_TIME", 30.0),
+    "keep_alive": True,
+}
+
+
+# ======================================================
+#        SHARED CONNECTION MANAGER (neo4j driver pool)
+# ======================================================
+#
+# One driver per process, shared by graph_read, graph_write and the
+# management commands. read()/write() run managed transactions: the driver
+# retries them on transient errors (leader switch, deadlock, lost
+# connection) for up to max_transaction_retry_time seconds, so the query
+# functions passed in must be idempotent.
+
+class GraphConnection:
+    def __init__(self, uri, user, password, database=None, **config):
+        self.uri = uri
+        self.auth = (user, password)
+        self.database = database or None
+        self.config = config
+        self._driver = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.transactions = {"read": 0, "write": 0, "auto": 0}
+        self.retries = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    from neo4j import GraphDatabase
+                    self._driver = GraphDatabase.driver(self.uri, auth=self.auth, **self.config)
+        return self._driver
+
+    def close(self):
+        with self._lock:
+            if self._driver is not None:
+                self._driver.close()
+                self._driver = None
+
+    # ---------------------------
+    # SESSIONS / TRANSACTIONS
+    # ---------------------------
+
+    def _session(self, mode: str):
+        access = "READ" if mode == "read" else "WRITE"
+        return self.driver.session(database=self.database, default_access_mode=access)
+
+    def _borrow(self, kind: str):
+        with self._stats_lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.transactions[kind] += 1
+        return time.perf_counter()
+
+    def _give_back(self, started: float, failed: bool = False):
+        with self._stats_lock:
+            self.in_use -= 1
+            self.busy_seconds += time.perf_counter() - started
+            if failed:
+                self.failures += 1
+
+    def _managed(self, kind: str, work, *args, **kwargs):
+        attempts = 0
+
+        def unit(tx):
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1:
+                with self._stats_lock:
+                    self.retries += 1
+            return work(tx, *args, **kwargs)
+
+        started = self._borrow(kind)
+        failed = True
+        try:
+            with self._session(kind) as session:
+                if kind == "read":
+                    result = session.execute_read(unit)
+                else:
+                    result = session.execute_write(unit)
+            failed = False
+            return result
+        finally:
+            self._give_back(started, failed)
+
+    def read_transaction(self, work, *args, **kwargs):
+        """Exécute work(tx, ...) dans une transaction de lecture rejouée en cas d'erreur transitoire."""
+        return self._managed("read", work, *args, **kwargs)
+
+    def write_transaction(self, work, *args, **kwargs):
+        """Exécute work(tx, ...) dans une transaction d'écriture rejouée en cas d'erreur transitoire."""
+        return self._managed("write", work, *args, **kwargs)
+
+    def read(self, query: str, /, **params) -> list[dict]:
+        return self.read_transaction(_fetch, query, params)
+
+    def write(self, query: str, /, **params) -> list[dict]:
+        return self.write_transaction(_fetch, query, params)
+
+    def auto_commit(self, query: str, /, **params) -> list[dict]:
+        """Requête hors transaction explicite (DDL : contraintes, index)."""
+        started = self._borrow("auto")
+        failed = True
+        try:
+            with self._session("write") as session:
+                rows = query_profiler.run(session.run, query, params)
+            failed = False
+            return rows
+        finally:
+            self._give_back(started, failed)
+
+    def stream(self, query: str, /, **params):
+        """
+        Itère sur les lignes au fil de leur arrivée, sans tout charger en
+        mémoire. Pas de rejeu possible : une erreur en cours de route remonte.
+        """
+        started = self._borrow("read")
+        failed = True
+        try:
+            with self._session("read") as session:
+                yield from query_profiler.stream(session.run, query, params)
+            failed = False
+        finally:
+            self._give_back(started, failed)
+
+    # ---------------------------
+    # METRICS
+    # ---------------------------
+
+    def _pool_connections(self) -> dict:
+        # The driver has no public pool API: read its connection table,
+        # and report nothing rather than fail if the internals change
+        try:
+            pool = self._driver._pool
+            with pool.lock:
+                return {
+                    str(address): {
+                        "open": len(connections),
+                        "in_use": sum(1 for c in connections if c.in_use),
+                    }
+                    for address, connections in pool.connections.items()
+                }
+        except Exception:
+            return {}
+
+    def metrics(self) -> dict:
+        max_size = self.config.get("max_connection_pool_size") or 0
+        with self._stats_lock:
+            out = {
+                "uri": self.uri,
+                "database": self.database,
+                "connected": self._driver is not None,
+                "max_pool_size": max_size,
+                "acquisition_timeout": self.config.get("connection_acquisition_timeout"),
+                "max_connection_lifetime": self.config.get("max_connection_lifetime"),
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": round(self.in_use / max_size, 4) if max_size else None,
+                "peak_utilization": round(self.peak_in_use / max_size, 4) if max_size else None,
+                "transactions": dict(self.transactions),
+                "retries": self.retries,
+                "failures": self.failures,
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
+        if self._driver is not None:
+            out["connections"] = self._pool_connections()
+        return out
+
+
+def _fetch(tx, query: str, params: dict) -> list[dict]:
+    # Timed per attempt: a retried transaction shows up as several runs
+    return query_profiler.run(tx.run, query, params)
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph() -> GraphConnection:
+    """Connexion partagée par tout le processus (le driver s'ouvre au premier appel)."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = GraphConnection(
+                    os.getenv("NEO4J_URI"),
+                    os.getenv("NEO4J_USER"),
+                    os.getenv("NEO4J_PASSWORD"),
+                    database=os.getenv("NEO4J_DATABASE"),
+                    **POOL_CONFIG,
+                )
+    return _graph
+
+
+# Un driver async par boucle d'événements : un driver ne peut pas être
+# partagé entre boucles (sous ASGI il n'y a qu'une boucle, donc un driver)
+_async_drivers = weakref.WeakKeyDictionary()
+
+
+def get_async_driver():
+    from neo4j import AsyncGraphDatabase
+
+    loop = asyncio.get_running_loop()
+    driver = _async_drivers.get(loop)
+    if driver is None:
+        driver = AsyncGraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")),
+            **POOL_CONFIG,
+        )
+        _async_drivers[loop] = driver
+    return driver
+
+
+async def close_async_driver():
+    """
+    Ferme le driver de la boucle courante. Sous WSGI, async_to_sync crée une
+    boucle par requête : sans cela chaque requête laisserait un pool ouvert.
+    """
+    driver = _async_drivers.pop(asyncio.get_running_loop(), None)
+    if driver is not None:
+        await driver.close()
@@ -0,0 +1,210 @@
+import heapq
+import threading
+import time
+
+from django.conf import settings
+
+from graphapi.services.cache import read_cache
+from graphapi.services.graph_read import symptom_disease_weights
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pure Python scoring
+    np = None
+
+
+# ======================================================
+#       WEIGHTED DIFFERENTIAL DIAGNOSIS (TOP-K RANKING)
+# ======================================================
+#
+# Sparse symptom x disease matrix of the INDICATES weights, kept in memory:
+# one row per symptom (disease columns + weights). For the question's
+# symptoms Q and a disease d:
+#
+#   evidence(d)    = sum of the weights of Q -> d
+#   support(d)     = evidence(d) / |Q|          (missing symptoms count 0)
+#   specificity(d) = evidence(d) / total weight of every symptom -> d
+#   score(d)       = (1 - β) * support(d) + β * specificity(d)
+#
+# so a disease missing some of the symptoms still ranks (partial evidence)
+# and a disease explained by few, well-matched symptoms beats a catch-all.
+
+class DiagnosisRanker:
+    def __init__(self, ttl: float = 300.0, default_weight: float = 0.5, profile_weight: float = 0.3):
+        self.ttl = ttl
+        self.default_weight = default_weight
+        self.profile_weight = profile_weight
+        self._built_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._symptoms = {}   # symptom key -> row
+        self._rows = []       # row -> {column: weight}
+        self._arrays = []     # row -> (columns, weights) numpy arrays, None when outdated
+        self._columns = {}    # disease key -> column
+        self._diseases = []   # column -> disease name
+        self._totals = []     # column -> total INDICATES weight
+        self._totals_array = None
+
+    def mark_stale(self, label=None, name=None):
+        # Entity writes update the matrix themselves (update); only bulk or
+        # unknown changes force a full reload
+        if name is None and label in (None, "Symptom", "Disease"):
+            self._stale = True
+
+    def _ensure_built(self):
+        expired = time.monotonic() - self._built_at > self.ttl
+        if self._stale or expired:
+            with self._lock:
+                if self._stale or time.monotonic() - self._built_at > self.ttl:
+                    self._stale = False
+                    self._build()
+                    self._built_at = time.monotonic()
+
+    def warm_up(self):
+        """Charge la matrice tout de suite plutôt qu'à la première question."""
+        self._ensure_built()
+
+    def _weight(self, value) -> float:
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            return self.default_weight
+
+    def _build(self):
+        self._reset()
+        for row in symptom_disease_weights():
+            self._set(row["symptom"], row["disease_key"], row["disease"], row["weight"])
+
+    def _set(self, symptom_key, disease_key, disease, weight):
+        weight = self._weight(weight)
+
+        column = self._columns.get(disease_key)
+        if column is None:
+            column = self._columns[disease_key] = len(self._diseases)
+            self._diseases.append(disease or disease_key)
+            self._totals.append(0.0)
+            self._totals_array = None
+
+        row = self._symptoms.get(symptom_key)
+        if row is None:
+            row = self._symptoms[symptom_key] = len(self._rows)
+            self._rows.append({})
+            self._arrays.append(None)
+
+        delta = weight - self._rows[row].get(column, 0.0)
+        self._rows[row][column] = weight
+        self._arrays[row] = None
+        self._totals[column] += delta
+        if self._totals_array is not None:
+            self._totals_array[column] += delta
+
+    def update(self, symptom: str, disease: str, weight=None):
+        """Répercute un INDICATES écrit par graph_write sans recharger la matrice."""
+        if self._stale:
+            return  # the next build reads it from the graph
+        with self._lock:
+            self._set(symptom.strip().lower(), disease.strip().lower(), disease.strip(), weight)
+
+    # ---------------------------
+    # RANKING
+    # ---------------------------
+
+    def rank(self, symptoms: list, k: int = 10) -> dict:
+        """
+        Classe les maladies pour les symptômes donnés.
+
+        Retourne {"ranked": [{"disease", "score", "match_count", "matched"}],
+        "unmatched": [...]} : les k meilleures maladies, score décroissant.
+        """
+        self._ensure_built()
+        with self._lock:
+            rows, keys, unmatched = [], [], []
+            for s in symptoms:
+                key = s.strip().lower()
+                row = self._symptoms.get(key)
+                if row is None or not self._rows[row]:
+                    unmatched.append(s)
+                elif key not in keys:
+                    rows.append(row)
+                    keys.append(key)
+
+            if not rows or k <= 0:
+                return {"ranked": [], "unmatched": unmatched}
+
+            scored = self._top_numpy(rows, k) if np is not None else self._top_python(rows, k)
+            ranked = []
+            for column, score in scored:
+                matched = [key for key, row in zip(keys, rows) if column in self._rows[row]]
+                ranked.append({
+                    "disease": self._diseases[column],
+                    "score": round(score, 4),
+                    "match_count": len(matched),
+                    "matched": matched,
+                })
+            return {"ranked": ranked, "unmatched": unmatched}
+
+    def _array(self, row):
+        arrays = self._arrays[row]
+        if arrays is None:
+            entries = self._rows[row]
+            arrays = self._arrays[row] = (
+                np.fromiter(entries.keys(), dtype=np.int64, count=len(entries)),
+                np.fromiter(entries.values(), dtype=np.float64, count=len(entries)),
+            )
+        return arrays
+
+    def _top_numpy(self, rows, k):
+        if self._totals_array is None:
+            self._totals_array = np.array(self._totals, dtype=np.float64)
+
+        parts = [self._array(row) for row in rows]
+        columns = np.concatenate([c for c, _ in parts])
+        weights = np.concatenate([w for _, w in parts])
+
+        candidates = np.unique(columns)
+        evidence = np.bincount(columns, weights=weights, minlength=len(self._diseases))[candidates]
+        totals = self._totals_array[candidates]
+        specificity = np.divide(evidence, totals, out=np.zeros_like(evidence), where=totals > 0)
+        scores = (1 - self.profile_weight) * evidence / len(rows) + self.profile_weight * specificity
+
+        if len(candidates) > k:
+            # Everything tied with the k-th score stays in: ties break on the name
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            best = scores >= kth
+            candidates, scores = candidates[best], scores[best]
+        order = sorted(range(len(candidates)), key=lambda i: (-scores[i], self._diseases[candidates[i]]))[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def _top_python(self, rows, k):
+        evidence = {}
+        for row in rows:
+            for column, weight in self._rows[row].items():
+                evidence[column] = evidence.get(column, 0.0) + weight
+
+        beta = self.profile_weight
+        scores = {}
+        for column, value in evidence.items():
+            total = self._totals[column]
+            scores[column] = (1 - beta) * value / len(rows) + beta * (value / total if total > 0 else 0.0)
+
+        best = heapq.nsmallest(k, scores, key=lambda c: (-scores[c], self._diseases[c]))
+        return [(column, scores[column]) for column in best]
+
+    def stats(self) -> dict:
+        return {
+            "symptoms": len(self._rows),
+            "diseases": len(self._diseases),
+            "weights": sum(len(r) for r in self._rows),
+            "numpy": np is not None,
+        }
+
+
+diagnosis_ranker = DiagnosisRanker(
+    ttl=getattr(settings, "DIAGNOSIS_REFRESH_SECONDS", 300),
+    default_weight=getattr(settings, "DIAGNOSIS_DEFAULT_WEIGHT", 0.5),
+    profile_weight=getattr(settings, "DIAGNOSIS_PROFILE_WEIGHT", 0.3),
+)
+read_cache.add_listener(diagnosis_ranker.mark_stale)
@@ -0,0 +1,281 @@
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from graphapi.services.cache import read_cache
+from graphapi.services.graph_read import (
+    all_symptoms,
+    all_diseases,
+    all_patients,
+    all_tests,
+    all_observations,
+)
+
+
+# ======================================================
+#        DICTIONARY ENTITY EXTRACTION (AHO-CORASICK)
+# ======================================================
+#
+# The automaton works on tokens rather than characters, so every match is
+# aligned on word boundaries ("flu" never matches inside "influenza").
+
+VOCABULARIES = {
+    "symptoms": ("Symptom", all_symptoms),
+    "diseases": ("Disease", all_diseases),
+    "patients": ("Patient", all_patients),
+    "tests": ("Test", all_tests),
+    "observations": ("Observation", all_observations),
+}
+
+VISIT_ID = re.compile(r"^v\d+$")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# Question words and intent keywords: they never need to be covered by an entity
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "to", "by", "and", "or", "with", "in", "on",
+    "at", "from", "during", "about", "s", "is", "are", "was", "were", "be",
+    "been", "do", "does", "did", "can", "could", "may", "might", "should",
+    "have", "has", "had", "what", "which", "who", "whom", "whose", "how",
+    "when", "where", "why", "me", "my", "show", "list", "give", "tell", "find",
+    "get", "all", "any", "some", "there", "their", "his", "her", "they",
+    "patient", "patients", "disease", "diseases", "symptom", "symptoms",
+    "treatment", "treatments", "test", "tests", "observation", "observations",
+    "visit", "visits", "risk", "factor", "factors", "indicate", "indicates",
+    "indicated", "cause", "causes", "caused", "possible", "recommended",
+    "associated", "performed", "done", "made", "used", "diagnose", "diagnosed",
+    "diagnosis", "support", "supports", "supported", "related", "linked",
+    "common", "typical", "signs", "sign", "treat", "treated", "recorded",
+    "detect", "detects", "detected", "confirm", "confirms", "confirmed",
+    "suggest", "suggests", "suggested",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN.findall(text.lower())
+
+
+class Automaton:
+    def __init__(self, patterns: dict):
+        """
+        patterns : {tuple(tokens): [(category, canonical_name), ...]}
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for tokens, entries in patterns.items():
+            state = 0
+            for tok in tokens:
+                nxt = self.goto[state].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][tok] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((len(tokens), entries))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(tok, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, tokens: list[str]) -> list[tuple]:
+        """Renvoie (start, end, entries) pour chaque occurrence."""
+        matches = []
+        state = 0
+        for i, tok in enumerate(tokens):
+            while state and tok not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(tok, 0)
+            for length, entries in self.out[state]:
+                matches.append((i - length + 1, i + 1, entries))
+        return matches
+
+
+class EntityMatcher:
+    def __init__(self, ttl: float = 300.0, background: bool = True):
+        self.ttl = ttl
+        # False: rebuilds run on the calling thread (tests, management commands)
+        self.background = background
+        self._automaton = None
+        self._patterns = None
+        self._added = []        # names written since the current rebuild started
+        self._built_at = 0.0
+        self._stale = True
+        self._pending = False
+        self._refreshing = False
+        self._lock = threading.Lock()           # patterns and flags, held briefly
+        self._rebuild_lock = threading.Lock()   # one rebuild at a time
+
+    def mark_stale(self, label=None, name=None):
+        # A new name joins the patterns in memory; only label-wide changes
+        # (and the TTL) reload the vocabularies from the graph
+        category = next((c for c, (lbl, _) in VOCABULARIES.items() if lbl == label), None)
+        if label is not None and category is None:
+            return
+        if name is None or category is None or self._patterns is None:
+            self._stale = True
+            return
+        tokens = tuple(tokenize(str(name)))
+        if not tokens:
+            return
+        with self._lock:
+            if self._add(self._patterns, tokens, category, name):
+                self._added.append((tokens, category, name))
+                self._pending = True
+
+    @staticmethod
+    def _add(patterns: dict, tokens: tuple, category: str, name) -> bool:
+        entries = patterns.get(tokens, [])
+        if any(c == category and n.lower() == str(name).lower() for c, n in entries):
+            return False
+        # A new list: the live automaton keeps sharing the old one
+        patterns[tokens] = entries + [(category, name)]
+        return True
+
+    def _outdated(self) -> bool:
+        return self._stale or self._pending or time.monotonic() - self._built_at > self.ttl
+
+    def _get_automaton(self) -> Automaton:
+        automaton = self._automaton
+        if automaton is not None and self.background:
+            # Questions never wait for a rebuild: they run on the current
+            # automaton while a background thread builds the next one
+            if self._outdated():
+                self._start_refresh()
+            return automaton
+        if automaton is None or self._outdated():
+            self._refresh()
+        return self._automaton
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="graphapi-matcher-refresh", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        except Exception as exc:
+            print("\n⚠️ ENTITY MATCHER REFRESH FAILED:", exc)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh(self):
+        """Reconstruit l'automate (rechargé du graphe si périmé) puis le remplace d'un coup."""
+        with self._rebuild_lock:
+            if self._automaton is not None and not self._outdated():
+                return  # rebuilt by another thread meanwhile
+            while True:
+                with self._lock:
+                    reload = self._stale or self._patterns is None or time.monotonic() - self._built_at > self.ttl
+                    self._stale = self._pending = False
+                    self._added = []
+                    patterns = None if reload else dict(self._patterns)
+                if reload:
+                    try:
+                        patterns = self._load()
+                    except Exception:
+                        self._stale = True
+                        raise
+                automaton = Automaton(patterns)
+                with self._lock:
+                    if reload:
+                        # Names written during the load may be missing from it
+                        self._pending = any([self._add(patterns, *added) for added in self._added])
+                        self._patterns = patterns
+                        self._built_at = time.monotonic()
+                    self._automaton = automaton
+                    if not (self._stale or self._pending):
+                        return
+
+    def warm_up(self):
+        """Charge les vocabulaires tout de suite plutôt qu'à la première question."""
+        self._get_automaton()
+
+    def _load(self) -> dict:
+        patterns = {}
+        for category, (_, loader) in VOCABULARIES.items():
+            for name in loader():
+                tokens = tuple(tokenize(name or ""))
+                if tokens:
+                    patterns.setdefault(tokens, []).append((category, name))
+        return patterns
+
+    def extract(self, question: str) -> dict:
+        """
+        Extrait les entités connues du graphe.
+
+        Retourne {"analysis": {...}, "coverage": float, "confidence": float}
+        où coverage est la part des mots « utiles » de la question couverte par
+        une entité, et confidence pénalise les noms ambigus (ex: symptôme et maladie).
+        """
+        tokens = tokenize(question)
+        analysis = {
+            "intent": "",
+            "symptoms": [],
+            "diseases": [],
+            "patients": [],
+            "tests": [],
+            "observations": [],
+            "visits": [],
+        }
+
+        covered = [False] * len(tokens)
+        for i, tok in enumerate(tokens):
+            if VISIT_ID.match(tok):
+                analysis["visits"].append(tok.upper())
+                covered[i] = True
+
+        # Longest leftmost non-overlapping matches
+        matches = self._get_automaton().find(tokens)
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        ambiguous = 0
+        selected = 0
+        end = 0
+        for start, stop, entries in matches:
+            if start < end or any(covered[start:stop]):
+                continue
+            end = stop
+            selected += 1
+            if len({category for category, _ in entries}) > 1:
+                ambiguous += 1
+            for category, name in entries:
+                if name not in analysis[category]:
+                    analysis[category].append(name)
+            for i in range(start, stop):
+                covered[i] = True
+
+        content = [i for i, tok in enumerate(tokens) if tok not in STOPWORDS or covered[i]]
+        if content:
+            coverage = sum(1 for i in content if covered[i]) / len(content)
+        else:
+            coverage = 0.0
+        if selected:
+            confidence = coverage * (1 - 0.5 * ambiguous / selected)
+        else:
+            confidence = coverage
+
+        return {
+            "analysis": analysis,
+            "coverage": round(coverage, 4),
+            "confidence": round(confidence, 4),
+        }
+
+
+entity_matcher = EntityMatcher(ttl=getattr(settings, "ENTITY_MATCHER_TTL", 300))
+read_cache.add_listener(entity_matcher.mark_stale)
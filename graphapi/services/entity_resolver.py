@@ -0,0 +1,226 @@
+import threading
+import time
+
+from django.conf import settings
+
+from graphapi.services.cache import read_cache
+from graphapi.services.entity_matcher import VOCABULARIES
+
+
+# ======================================================
+#     TYPO-TOLERANT ENTITY RESOLUTION (DELETION INDEX)
+# ======================================================
+#
+# Maps each extracted name to the graph name it most likely means ("feaver"
+# -> "fever") before the queries run. The index keys every name and every
+# copy of it with one letter removed: a name within one edit of the query
+# (wrong, missing, extra or swapped letter) shares a key with the query or
+# one of its one-letter deletions. A lookup is a few dozen dict probes
+# whatever the vocabulary size, then an edit-distance check of the
+# candidates. Long names allow two edits, searched only when nothing is one
+# edit away and from the query side (its two-letter deletions): found when
+# at least one of the two edits is an extra letter in the query. Two wrong
+# or two missing letters are not found (that would take every two-letter
+# deletion of every name in the index).
+#
+# Only an unambiguous match within `auto` edits (1 by default) rewrites the
+# analysis. Farther or tied matches ("hypertension" -> "hypotension" is two
+# edits) are returned as suggestions and the extracted name is kept.
+
+def normalize(text) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def max_distance(length: int, limit: int) -> int:
+    # Short names get no slack: "flu" -> "flue" is fine, "flu" -> "fly" is not
+    if length <= 3:
+        return 0
+    if length <= 7:
+        return min(1, limit)
+    return limit
+
+
+def deletions(text: str) -> set:
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def within_one(a: str, b: str) -> bool:
+    """Au plus une édition (lettre fausse, manquante, en trop ou deux lettres inversées)."""
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return False
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return a[i + 1:] == b[i:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i] == b[i + 1:i + 2] and a[i + 1:i + 2] == b[i])
+
+
+def distance(a: str, b: str, limit: int) -> int:
+    """Distance de Damerau-Levenshtein (transpositions adjacentes) ; limit + 1 au-delà de limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class NameIndex:
+    """Noms d'un vocabulaire (forme normalisée) + clé (nom ou nom moins une lettre) -> identifiants."""
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.keys = {}
+
+    def add(self, name: str):
+        name = normalize(name)
+        if not name or name in self.ids:
+            return
+        ident = self.ids[name] = len(self.names)
+        self.names.append(name)
+        for key in deletions(name) | {name}:
+            # Most keys belong to one name: a bare int, a tuple when shared
+            found = self.keys.get(key)
+            if found is None:
+                self.keys[key] = ident
+            else:
+                self.keys[key] = (found, ident) if isinstance(found, int) else found + (ident,)
+
+    def lookup(self, text: str, limit: int):
+        """
+        (nom, distance, ambigu) le plus proche à au plus max_distance éditions,
+        sinon None ; ambigu : un autre nom est à la même distance.
+        """
+        text = normalize(text)
+        if text in self.ids:
+            return text, 0, False
+        k = max_distance(len(text), limit)
+        if not k:
+            return None
+
+        probes = deletions(text)
+        names = sorted(n for n in self._candidates(probes | {text}) if within_one(text, n))
+        if names:
+            return names[0], 1, len(names) > 1
+        if k < 2:
+            return None
+
+        found = sorted(
+            (d, name)
+            for name in self._candidates(set().union(*(deletions(p) for p in probes)))
+            if (d := distance(text, name, k)) <= k
+        )
+        if not found:
+            return None
+        d, name = found[0]
+        return name, d, len(found) > 1 and found[1][0] == d
+
+    def _candidates(self, probes):
+        idents = set()
+        for probe in probes:
+            found = self.keys.get(probe)
+            if found is not None:
+                idents.update((found,) if isinstance(found, int) else found)
+        return [self.names[i] for i in idents]
+
+
+class EntityResolver:
+    def __init__(self, ttl: float = 300.0, limit: int = 2, auto: int = 1):
+        self.ttl = ttl
+        self.limit = limit
+        self.auto = auto
+        self._indexes = None
+        self._built_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def mark_stale(self, label=None, name=None):
+        # A new name is added in place; only label-wide changes rebuild
+        category = next((c for c, (lbl, _) in VOCABULARIES.items() if lbl == label), None)
+        if label is not None and category is None:
+            return
+        if name is None or category is None or self._indexes is None:
+            self._stale = True
+            return
+        with self._lock:
+            self._indexes[category].add(name)
+
+    def _get_indexes(self) -> dict:
+        expired = time.monotonic() - self._built_at > self.ttl
+        if self._indexes is None or self._stale or expired:
+            with self._lock:
+                if self._indexes is None or self._stale or time.monotonic() - self._built_at > self.ttl:
+                    self._stale = False
+                    self._indexes = self._build()
+                    self._built_at = time.monotonic()
+        return self._indexes
+
+    def warm_up(self):
+        """Construit les index tout de suite plutôt qu'à la première question."""
+        self._get_indexes()
+
+    def _build(self) -> dict:
+        indexes = {}
+        for category, (_, loader) in VOCABULARIES.items():
+            index = indexes[category] = NameIndex()
+            for name in loader():
+                if name:
+                    index.add(name)
+        return indexes
+
+    def resolve(self, analysis: dict) -> list:
+        """
+        Remplace dans analysis chaque entité par son nom canonique du graphe
+        quand la correction est sûre (au plus `auto` éditions, sans ex aequo).
+
+        Retourne les corrections [{"category", "input", "resolved", "distance",
+        "applied"}] ; applied=False : simple suggestion, le nom extrait est gardé.
+        """
+        indexes = self._get_indexes()
+        corrections = []
+        for category, index in indexes.items():
+            values = analysis.get(category)
+            if not isinstance(values, list):
+                continue
+            resolved = []
+            for value in values:
+                match = index.lookup(value, self.limit)
+                name = value
+                if match and not match[1]:
+                    name = match[0]
+                elif match:
+                    applied = match[1] <= self.auto and not match[2]
+                    if applied:
+                        name = match[0]
+                    corrections.append({
+                        "category": category,
+                        "input": value,
+                        "resolved": match[0],
+                        "distance": match[1],
+                        "applied": applied,
+                    })
+                if name not in resolved:
+                    resolved.append(name)
+            analysis[category] = resolved
+        return corrections
+
+
+entity_resolver = EntityResolver(
+    ttl=getattr(settings, "ENTITY_MATCHER_TTL", 300),
+    limit=getattr(settings, "ENTITY_RESOLVER_MAX_DISTANCE", 2),
+    auto=getattr(settings, "ENTITY_RESOLVER_AUTO_DISTANCE", 1),
+)
+read_cache.add_listener(entity_resolver.mark_stale)
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+
+# ======================================================
+#         PERSISTENT CACHE FOR LLM EXTRACTION RESULTS
+# ======================================================
+#
+# One SQLite file per host, opened in WAL mode so every worker process can
+# read and write it concurrently. Entries are keyed by the normalized
+# question + prompt version + model name, so changing the prompt or the
+# model never serves stale extractions.
+#
+# Hits do not write: their access times are kept in memory and flushed in one
+# executemany every TOUCH_BATCH hits (or TOUCH_INTERVAL seconds, or on the
+# next store). The size limits are checked every few stores and the least
+# recently used rows are deleted with one ORDER BY accessed_at LIMIT n.
+
+TOUCH_BATCH = 64
+TOUCH_INTERVAL = 5.0
+EVICT_EVERY = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    key TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS extractions_accessed_at ON extractions (accessed_at);
+"""
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    q = _PUNCTUATION.sub(" ", question.lower())
+    return _SPACES.sub(" ", q).strip()
+
+
+class ExtractionCache:
+    def __init__(self, path, max_entries: int = 50000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched = {}              # key -> (accessed_at, hits) not yet written
+        self._flushed_at = time.monotonic()
+        self._stores = 0                # stores since the last size check
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_entries > 0 and self.max_bytes > 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(question: str, model: str, prompt_version: str) -> str:
+        raw = f"{prompt_version}\0{model}\0{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # ---------------------------
+    # LOOKUP / STORE
+    # ---------------------------
+
+    def get(self, question: str, model: str, prompt_version: str) -> dict | None:
+        if not self.enabled:
+            return None
+        key = self.make_key(question, model, prompt_version)
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT payload FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            self._touch(conn, key)
+        except sqlite3.Error as exc:
+            print("\n⚠️ EXTRACTION CACHE READ FAILED:", exc)
+            self._count("errors")
+            return None
+
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, question: str, model: str, prompt_version: str, data: dict):
+        if not self.enabled:
+            return
+        key = self.make_key(question, model, prompt_version)
+        payload = json.dumps(data)
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO extractions
+                    (key, question, model, prompt_version, payload, size, created_at, accessed_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, normalize_question(question), model, prompt_version, payload,
+                 len(payload) + len(question), now, now),
+            )
+            self._count("writes")
+            with self._lock:
+                self._stores += 1
+                check = self._stores >= min(EVICT_EVERY, max(1, self.max_entries // 10))
+                if check:
+                    self._stores = 0
+            if check:
+                # Eviction goes by accessed_at: write the pending hits first
+                self.flush(conn)
+                self._evict(conn)
+        except sqlite3.Error as exc:
+            print("\n⚠️ EXTRACTION CACHE WRITE FAILED:", exc)
+            self._count("errors")
+
+    # ---------------------------
+    # ACCESS TIMES / EVICTION
+    # ---------------------------
+
+    def _touch(self, conn: sqlite3.Connection, key: str):
+        with self._lock:
+            _, hits = self._touched.get(key, (0.0, 0))
+            self._touched[key] = (time.time(), hits + 1)
+            due = (
+                len(self._touched) >= TOUCH_BATCH
+                or time.monotonic() - self._flushed_at > TOUCH_INTERVAL
+            )
+        if due:
+            self.flush(conn)
+
+    def flush(self, conn: sqlite3.Connection | None = None):
+        """Écrit en une fois les dates d'accès et compteurs de hits en attente."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+        if not touched:
+            return
+        (conn or self._conn()).executemany(
+            "UPDATE extractions SET accessed_at = MAX(accessed_at, ?), hits = hits + ? WHERE key = ?",
+            [(accessed_at, hits, key) for key, (accessed_at, hits) in touched.items()],
+        )
+
+    def _evict(self, conn: sqlite3.Connection):
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+
+        # Drop the least recently used rows until both limits hold again,
+        # plus 10% headroom so we do not evict on every check; the byte
+        # excess is turned into a row count with the mean row size
+        excess = max(entries - int(self.max_entries * 0.9), 0)
+        if size > self.max_bytes * 0.9:
+            excess = max(excess, math.ceil((size - self.max_bytes * 0.9) / (size / entries)))
+        removed = conn.execute(
+            """
+            DELETE FROM extractions WHERE key IN (
+                SELECT key FROM extractions ORDER BY accessed_at LIMIT ?
+            )
+            """,
+            (excess,),
+        ).rowcount
+        self._count("evictions", removed)
+
+    def clear(self):
+        try:
+            with self._lock:
+                self._touched.clear()
+            self._conn().execute("DELETE FROM extractions")
+        except sqlite3.Error as exc:
+            print("\n⚠️ EXTRACTION CACHE CLEAR FAILED:", exc)
+
+    # ---------------------------
+    # STATS
+    # ---------------------------
+
+    def stats(self) -> dict:
+        out = {
+            "enabled": self.enabled,
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / (self.hits + self.misses), 4) if self.hits + self.misses else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "pending_touches": len(self._touched),
+        }
+        if self.enabled:
+            try:
+                entries, size, total_hits = self._conn().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM extractions"
+                ).fetchone()
+                # entries/bytes/total_hits are shared by every worker on the host
+                out.update({"entries": entries, "bytes": size, "total_hits": total_hits})
+            except sqlite3.Error as exc:
+                out["error"] = str(exc)
+        return out
+
+
+extraction_cache = ExtractionCache(
+    path=getattr(settings, "EXTRACTION_CACHE_PATH", ""),
+    max_entries=getattr(settings, "EXTRACTION_CACHE_MAX_ENTRIES", 50000),
+    max_bytes=getattr(settings, "EXTRACTION_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+)
@@ -1,186 +1,264 @@
-from graphapi.services.db import get_graph
+from graphapi.services.backends import get_backend
+from graphapi.services.cache import cached_read
+from graphapi.services.metrics import timed
+from graphapi.services.schema import NODE_KEYS
+from graphapi.services.pagination import keyset_params, keyset_result, strip_keyset_fields
 
-graph = get_graph()
+# The queries themselves live in the backend (backends/neo4j.py for Cypher,
+# backends/memory.py for the embedded graph); this module keeps the public
+# functions, the read cache and the pagination.
 
 # ======================================================
 #                GLOBAL RETRIEVAL FUNCTIONS
 # ======================================================
 
+@timed("graph_read")
+@cached_read("Symptom")
 def all_symptoms():
-    q = "MATCH (s:Symptom) RETURN toLower(s.name) AS name"
-    return [r["name"] for r in graph.run(q).data()]
+    return get_backend().names("Symptom")
 
 
+@timed("graph_read")
+@cached_read("Disease")
 def all_diseases():
-    q = "MATCH (d:Disease) RETURN toLower(d.name) AS name"
-    return [r["name"] for r in graph.run(q).data()]
+    return get_backend().names("Disease")
 
 
+@timed("graph_read")
+@cached_read("Patient")
 def all_patients():
-    q = "MATCH (p:Patient) RETURN toLower(p.name) AS name"
-    return [r["name"] for r in graph.run(q).data()]
+    return get_backend().names("Patient")
 
 
+@timed("graph_read")
+@cached_read("Test")
 def all_tests():
-    q = "MATCH (t:Test) RETURN toLower(t.name) AS name"
-    return [r["name"] for r in graph.run(q).data()]
+    return get_backend().names("Test")
 
 
+@timed("graph_read")
+@cached_read("Observation")
 def all_observations():
-    q = "MATCH (o:Observation) RETURN toLower(o.name) AS name"
-    return [r["name"] for r in graph.run(q).data()]
+    return get_backend().names("Observation")
+
+
+# ======================================================
+#          KEYSET PAGINATION / STREAMING HELPERS
+# ======================================================
+
+def _keyset_page(rows, limit: int, cursor: dict | None, *args) -> dict:
+    """rows : méthode paginée du backend, appelée avec limit + 1 lignes."""
+    return keyset_result(list(rows(*args, **keyset_params(cursor), limit=limit + 1)), limit)
+
+
+def _stream(rows, *args):
+    """Itère sur les lignes directement depuis le curseur du backend."""
+    for record in rows(*args, **keyset_params(None)):
+        yield strip_keyset_fields(record)
 
 
 # ======================================================
 #                    PATIENT QUERIES
 # ======================================================
 
-def list_patients():
-    q = "MATCH (p:Patient) RETURN p"
-    return graph.run(q).data()
+@timed("graph_read")
+@cached_read("Patient", entity=None)
+def list_patients(limit: int = 50, cursor: dict | None = None):
+    return _keyset_page(get_backend().patients, limit, cursor)
+
+
+def stream_patients():
+    return _stream(get_backend().patients)
 
 
+@timed("graph_read")
+@cached_read("Patient")
 def get_patient(name: str):
-    q = """
-    MATCH (p:Patient)
-    WHERE toLower(p.name) = toLower($name)
-    RETURN p
-    """
-    return graph.run(q, name=name).data()
+    return get_backend().patient(name)
 
 
+@timed("graph_read")
+@cached_read("Patient")
 def patient_symptoms(name: str):
-    q = """
-    MATCH (p:Patient)
-    WHERE toLower(p.name) = toLower($name)
-    MATCH (p)-[r:HAS_SYMPTOM]->(s:Symptom)
-    RETURN s.name AS symptom, r
-    """
-    return graph.run(q, name=name).data()
+    return get_backend().patient_symptoms(name)
 
 
+@timed("graph_read")
+@cached_read("Patient")
 def patient_risk_factors(name: str):
-    q = """
-    MATCH (p:Patient)
-    WHERE toLower(p.name) = toLower($name)
-    MATCH (p)-[:HAS_RISK_FACTOR]->(r:RiskFactor)
-    RETURN r.name AS risk_factor
-    """
-    return graph.run(q, name=name).data()
+    return get_backend().patient_risk_factors(name)
 
 
-def patient_visits(name: str):
-    q = """
-    MATCH (p:Patient)
-    WHERE toLower(p.name) = toLower($name)
-    MATCH (p)-[:HAS_VISIT]->(v:Visit)
-    RETURN v.id AS visit_id, v
-    """
-    return graph.run(q, name=name).data()
+@timed("graph_read")
+@cached_read("Patient")
+def patient_visits(name: str, limit: int = 50, cursor: dict | None = None):
+    return _keyset_page(get_backend().patient_visits, limit, cursor, name)
+
+
+def stream_patient_visits(name: str):
+    return _stream(get_backend().patient_visits, name)
 
 
 # ======================================================
 #                   VISIT QUERIES
 # ======================================================
 
-def visit_observations(visit_id: str):
-    q = """
-    MATCH (v:Visit)
-    WHERE toLower(v.id) = toLower($id)
-    MATCH (v)-[:HAS_OBSERVATION]->(o:Observation)
-    RETURN o.name AS observation, o
-    """
-    return graph.run(q, id=visit_id).data()
+@timed("graph_read")
+@cached_read("Visit")
+def visit_observations(visit_id: str, limit: int = 50, cursor: dict | None = None):
+    return _keyset_page(get_backend().visit_observations, limit, cursor, visit_id)
 
 
+def stream_visit_observations(visit_id: str):
+    return _stream(get_backend().visit_observations, visit_id)
+
+
+@timed("graph_read")
+@cached_read("Visit")
 def visit_tests(visit_id: str):
-    q = """
-    MATCH (v:Visit)
-    WHERE toLower(v.id) = toLower($id)
-    MATCH (v)-[:HAS_TEST]->(t:Test)
-    RETURN t.name AS test, t
-    """
-    return graph.run(q, id=visit_id).data()
+    return get_backend().visit_tests(visit_id)
 
 
 # ======================================================
 #        SYMPTOM / DISEASE / TREATMENT QUERIES
 # ======================================================
 
+@timed("graph_read")
+@cached_read("Symptom")
 def diseases_for_symptom(symptom: str):
-    q = """
-    MATCH (s:Symptom)
-    WHERE toLower(s.name) = toLower($symptom)
-    MATCH (s)-[:INDICATES]->(d:Disease)
-    RETURN d.name AS disease
-    """
-    records = graph.run(q, symptom=symptom).data()
-    return [r["disease"] for r in records]
+    return get_backend().diseases_for_symptom(symptom)
 
 
+@timed("graph_read")
+@cached_read("Disease")
 def symptoms_for_disease(disease: str):
-    q = """
-    MATCH (d:Disease)
-    WHERE toLower(d.name) = toLower($disease)
-    MATCH (s:Symptom)-[:INDICATES]->(d)
-    RETURN s.name AS symptom
-    """
-    records = graph.run(q, disease=disease).data()
-    return [r["symptom"] for r in records]
+    return get_backend().symptoms_for_disease(disease)
 
 
+@timed("graph_read")
+@cached_read("Disease")
 def treatments_for_disease(disease: str):
-    q = """
-    MATCH (d:Disease)
-    WHERE toLower(d.name) = toLower($disease)
-    MATCH (d)-[:TREATED_BY]->(t:Treatment)
-    RETURN t.name AS treatment
-    """
-    records = graph.run(q, disease=disease).data()
-    return [r["treatment"] for r in records]
+    return get_backend().treatments_for_disease(disease)
 
 
+@timed("graph_read")
+@cached_read("Test")
 def diseases_for_test(test_name: str):
-    q = """
-    MATCH (t:Test)
-    WHERE toLower(t.name) = toLower($name)
-    MATCH (t)-[:USED_FOR_DIAGNOSIS_OF]->(d:Disease)
-    RETURN d.name AS disease
-    """
-    records = graph.run(q, name=test_name).data()
-    return [r["disease"] for r in records]
+    return get_backend().diseases_for_test(test_name)
 
 
+@timed("graph_read")
+@cached_read("Observation")
 def diseases_for_observation(obs_name: str):
-    q = """
-    MATCH (o:Observation)
-    WHERE toLower(o.name) = toLower($name)
-    MATCH (o)-[:SUPPORTS]->(d:Disease)
-    RETURN d.name AS disease
-    """
-    records = graph.run(q, name=obs_name).data()
-    return [r["disease"] for r in records]
+    return get_backend().diseases_for_observation(obs_name)
 
 
+@timed("graph_read")
+@cached_read("Disease")
 def tests_for_disease(disease: str):
-    q = """
-    MATCH (d:Disease)
-    WHERE toLower(d.name) = toLower($disease)
-    MATCH (t:Test)-[:USED_FOR_DIAGNOSIS_OF]->(d)
-    RETURN t.name AS test
+    return get_backend().tests_for_disease(disease)
+
+
+# ======================================================
+#     BATCHED LOOKUPS (ONE ROUND TRIP FOR N ENTITIES)
+# ======================================================
+
+@timed("graph_read")
+@cached_read("Symptom")
+def diseases_for_symptoms(symptoms: list[str]):
+    """
+    Pour chaque maladie indiquée par au moins un des symptômes :
+    {"disease", "match_count", "matched"} (matched = clés des symptômes trouvés).
     """
-    records = graph.run(q, disease=disease).data()
-    return [r["test"] for r in records]
+    return get_backend().diseases_for_symptoms(list(symptoms))
+
+
+@timed("graph_read")
+@cached_read("Disease")
+def symptoms_for_diseases(diseases: list[str]):
+    return get_backend().symptoms_for_diseases(list(diseases))
+
+
+@timed("graph_read")
+@cached_read("Disease")
+def treatments_for_diseases(diseases: list[str]):
+    return get_backend().treatments_for_diseases(list(diseases))
+
+
+@timed("graph_read")
+@cached_read("Disease")
+def tests_for_diseases(diseases: list[str]):
+    return get_backend().tests_for_diseases(list(diseases))
+
+
+@timed("graph_read")
+@cached_read("Disease")
+def observations_for_diseases(diseases: list[str]):
+    return get_backend().observations_for_diseases(list(diseases))
+
+
+def symptom_disease_weights():
+    """Toutes les arêtes INDICATES pondérées, en flux (matrice de diagnosis.py, qui a son propre cache)."""
+    return iter(get_backend().indicates_weights())
 
 
 # ======================================================
 #                SEARCH (GENERIC QUERY)
 # ======================================================
 
-def search_graph(term: str):
-    q = """
-    MATCH (n)
-    WHERE n.name IS NOT NULL AND toLower(n.name) CONTAINS toLower($term)
-    RETURN labels(n) AS labels, n AS node
+@timed("graph_read")
+@cached_read()
+def search_graph(
+    term: str,
+    labels: tuple | None = None,
+    limit: int = 20,
+    cursor: dict | None = None,
+    mode: str = "fulltext",
+):
+    """
+    Recherche par nom, classée par pertinence.
+
+    mode="fulltext" : index full-text Lucene, score de pertinence
+    mode="prefix"   : autocomplétion, n.key STARTS WITH sur les index de clé
+    labels          : restreint la recherche à ces labels
+    Retourne {"results": [{"name", "labels", "score"}], "next": position | None}
     """
-    return graph.run(q, term=term).data()
+    labels = [l for l in (labels or NODE_KEYS) if l in NODE_KEYS]
+    if not term.strip() or not labels:
+        return {"results": [], "next": None}
+    if mode == "prefix":
+        return _search_prefix(term, labels, limit, cursor)
+
+    offset = int((cursor or {}).get("offset", 0))
+    records = list(get_backend().search(term, labels, offset=offset, limit=limit + 1))
+    has_more = len(records) > limit
+    return {
+        "results": records[:limit],
+        "next": {"offset": offset + limit} if has_more else None,
+    }
+
+
+def stream_search(term: str, labels: tuple | None = None):
+    """Tous les résultats full-text, par pertinence, sans pagination."""
+    labels = [l for l in (labels or NODE_KEYS) if l in NODE_KEYS]
+    if not term.strip() or not labels:
+        return iter(())
+    return iter(get_backend().search(term, labels))
+
+
+def _search_prefix(term: str, labels: list, limit: int, cursor: dict | None):
+    cursor = cursor or {}
+    records = get_backend().search_prefix(
+        term.strip().lower(),
+        labels,
+        after_key=cursor.get("key", ""),
+        after_label=cursor.get("label", ""),
+        limit=limit + 1,
+    )
+    has_more = len(records) > limit
+    records = records[:limit]
+    last = records[-1] if records else None
+    return {
+        "results": [{"name": r["name"], "labels": r["labels"], "score": r["score"]} for r in records],
+        "next": {"key": last["key"], "label": last["label"]} if has_more else None,
+    }
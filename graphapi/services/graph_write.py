@@ -1,21 +1,56 @@
-from graphapi.services.db import get_graph
+import time
+from functools import partial
 
-graph = get_graph()
+from graphapi.services.backends import get_backend
+from graphapi.services.cache import read_cache
+from graphapi.services.diagnosis import diagnosis_ranker
+from graphapi.services.metrics import timed
+from graphapi.services.versions import bump, write_scopes
+from graphapi.services.schema import NODE_KEYS, RELATIONSHIPS, is_property_value
 
 
+def _invalidate(*entities):
+    """
+    Invalide le cache de lecture pour chaque (label, name) touché par l'écriture
+    et incrémente leurs compteurs de version (ETag des GET).
+    name=None : tout le label.
+    """
+    scopes = []
+    for label, name in dict.fromkeys(entities):
+        read_cache.invalidate(label, name)
+        scopes.extend(write_scopes(label, name))
+    # One version transaction per write, whatever the number of entities
+    bump(scopes)
+
+
+@timed("graph_write")
 def merge_node(label: str, props: dict):
     """
     Crée ou récupère un nœud (MERGE) avec les propriétés données.
+
+    Pour les labels à clé unique, le MERGE se fait sur la clé normalisée et
+    les autres propriétés sont mises à jour ; sinon sur toutes les propriétés.
+    """
+    result = get_backend().merge_node(label, props)
+    _invalidate((label, props.get(NODE_KEYS[label])))
+    return result
+
+
+def _merge_endpoints(*nodes):
+    """
+    MERGE des deux extrémités d'une relation, sans invalidation : la fonction
+    appelante invalide une seule fois la relation et ses deux nœuds.
     """
-    fields = ", ".join([f"{k}: ${k}" for k in props.keys()])
-    query = f"MERGE (n:{label} {{ {fields} }}) RETURN n"
-    return graph.run(query, **props).data()
+    backend = get_backend()
+    for label, props in nodes:
+        backend.merge_node(label, props)
 
 
 # ---------------------------
 # PATIENT + RELATIONS
 # ---------------------------
 
+@timed("graph_write")
 def create_patient(name: str, age: int | None = None, gender: str | None = None):
     props = {"name": name}
     if age is not None:
@@ -25,48 +60,38 @@ def create_patient(name: str, age: int | None = None, gender: str | None = None)
     return merge_node("Patient", props)
 
 
+@timed("graph_write")
 def patient_add_symptom(
     patient: str,
     symptom: str,
     severity: str | None = None,
     onset_days: int | None = None,
 ):
-    merge_node("Patient", {"name": patient})
-    merge_node("Symptom", {"name": symptom})
-
-    query = """
-    MATCH (p:Patient {name: $patient})
-    MATCH (s:Symptom {name: $symptom})
-    MERGE (p)-[r:HAS_SYMPTOM]->(s)
-    SET r.severity = $severity,
-        r.onset_days = $onset_days
-    RETURN p, r, s
-    """
-    return graph.run(
-        query,
-        patient=patient,
-        symptom=symptom,
+    _merge_endpoints(("Patient", {"name": patient}), ("Symptom", {"name": symptom}))
+
+    result = get_backend().patient_add_symptom(
+        patient,
+        symptom,
         severity=severity,
         onset_days=onset_days,
-    ).data()
+    )
+    _invalidate(("Patient", patient), ("Symptom", symptom))
+    return result
 
 
+@timed("graph_write")
 def patient_add_risk_factor(patient: str, risk_name: str, category: str | None = None):
     props = {"name": risk_name}
     if category is not None:
         props["category"] = category
-    merge_node("Patient", {"name": patient})
-    merge_node("RiskFactor", props)
-
-    query = """
-    MATCH (p:Patient {name: $patient})
-    MATCH (r:RiskFactor {name: $risk_name})
-    MERGE (p)-[:HAS_RISK_FACTOR]->(r)
-    RETURN p, r
-    """
-    return graph.run(query, patient=patient, risk_name=risk_name).data()
+    _merge_endpoints(("Patient", {"name": patient}), ("RiskFactor", props))
+
+    result = get_backend().patient_add_risk_factor(patient, risk_name)
+    _invalidate(("Patient", patient), ("RiskFactor", risk_name))
+    return result
 
 
+@timed("graph_write")
 def patient_add_visit(patient: str, visit_id: str, date: str | None = None, reason: str | None = None):
     props = {"id": visit_id}
     if date is not None:
@@ -74,22 +99,18 @@ def patient_add_visit(patient: str, visit_id: str, date: str | None = None, reas
     if reason is not None:
         props["reason"] = reason
 
-    merge_node("Patient", {"name": patient})
-    merge_node("Visit", props)
+    _merge_endpoints(("Patient", {"name": patient}), ("Visit", props))
 
-    query = """
-    MATCH (p:Patient {name: $patient})
-    MATCH (v:Visit {id: $visit_id})
-    MERGE (p)-[:HAS_VISIT]->(v)
-    RETURN p, v
-    """
-    return graph.run(query, patient=patient, visit_id=visit_id).data()
+    result = get_backend().patient_add_visit(patient, visit_id)
+    _invalidate(("Patient", patient), ("Visit", visit_id))
+    return result
 
 
 # ---------------------------
 # VISIT RELATIONS
 # ---------------------------
 
+@timed("graph_write")
 def visit_add_observation(
     visit_id: str,
     name: str,
@@ -103,108 +124,239 @@ def visit_add_observation(
     if time is not None:
         props["time"] = time
 
-    merge_node("Visit", {"id": visit_id})
-    merge_node("Observation", props)
+    _merge_endpoints(("Visit", {"id": visit_id}), ("Observation", props))
 
-    query = """
-    MATCH (v:Visit {id: $visit_id})
-    MATCH (o:Observation {name: $name})
-    MERGE (v)-[:HAS_OBSERVATION]->(o)
-    RETURN v, o
-    """
-    return graph.run(query, visit_id=visit_id, name=name).data()
+    result = get_backend().visit_add_observation(visit_id, name)
+    _invalidate(("Visit", visit_id), ("Observation", name))
+    return result
 
 
+@timed("graph_write")
 def visit_add_test(visit_id: str, test_name: str, test_type: str | None = None):
     props = {"name": test_name}
     if test_type is not None:
         props["type"] = test_type
 
-    merge_node("Visit", {"id": visit_id})
-    merge_node("Test", props)
+    _merge_endpoints(("Visit", {"id": visit_id}), ("Test", props))
 
-    query = """
-    MATCH (v:Visit {id: $visit_id})
-    MATCH (t:Test {name: $test_name})
-    MERGE (v)-[:HAS_TEST]->(t)
-    RETURN v, t
-    """
-    return graph.run(query, visit_id=visit_id, test_name=test_name).data()
+    result = get_backend().visit_add_test(visit_id, test_name)
+    _invalidate(("Visit", visit_id), ("Test", test_name))
+    return result
 
 
 # ---------------------------
 # SYMPTOM → DISEASE
 # ---------------------------
 
+@timed("graph_write")
 def symptom_indicates_disease(symptom: str, disease: str, weight: float | None = None):
-    merge_node("Symptom", {"name": symptom})
-    merge_node("Disease", {"name": disease})
-
-    query = """
-    MATCH (s:Symptom {name: $symptom})
-    MATCH (d:Disease {name: $disease})
-    MERGE (s)-[r:INDICATES]->(d)
-    SET r.weight = $weight
-    RETURN s, r, d
-    """
-    return graph.run(query, symptom=symptom, disease=disease, weight=weight).data()
+    _merge_endpoints(("Symptom", {"name": symptom}), ("Disease", {"name": disease}))
+
+    result = get_backend().symptom_indicates_disease(symptom, disease, weight=weight)
+    _invalidate(("Symptom", symptom), ("Disease", disease))
+    diagnosis_ranker.update(symptom, disease, weight)
+    return result
 
 
 # ---------------------------
 # DISEASE → TREATMENT
 # ---------------------------
 
+@timed("graph_write")
 def disease_add_treatment(
     disease: str,
     treatment: str,
     line: str | None = None,
     recommended: bool | None = None,
 ):
-    merge_node("Disease", {"name": disease})
-    merge_node("Treatment", {"name": treatment})
-
-    query = """
-    MATCH (d:Disease {name: $disease})
-    MATCH (t:Treatment {name: $treatment})
-    MERGE (d)-[r:TREATED_BY]->(t)
-    SET r.line = $line,
-        r.recommended = $recommended
-    RETURN d, r, t
-    """
-    return graph.run(
-        query,
-        disease=disease,
-        treatment=treatment,
+    _merge_endpoints(("Disease", {"name": disease}), ("Treatment", {"name": treatment}))
+
+    result = get_backend().disease_add_treatment(
+        disease,
+        treatment,
         line=line,
         recommended=recommended,
-    ).data()
+    )
+    _invalidate(("Disease", disease), ("Treatment", treatment))
+    return result
 
 
 # ---------------------------
 # TEST / OBSERVATION → DISEASE
 # ---------------------------
 
+@timed("graph_write")
 def test_used_for_diagnosis(test_name: str, disease: str):
-    merge_node("Test", {"name": test_name})
-    merge_node("Disease", {"name": disease})
-
-    query = """
-    MATCH (t:Test {name: $test_name})
-    MATCH (d:Disease {name: $disease})
-    MERGE (t)-[:USED_FOR_DIAGNOSIS_OF]->(d)
-    RETURN t, d
-    """
-    return graph.run(query, test_name=test_name, disease=disease).data()
+    _merge_endpoints(("Test", {"name": test_name}), ("Disease", {"name": disease}))
+
+    result = get_backend().test_used_for_diagnosis(test_name, disease)
+    _invalidate(("Test", test_name), ("Disease", disease))
+    return result
 
 
+@timed("graph_write")
 def observation_supports_disease(observation_name: str, disease: str):
-    merge_node("Observation", {"name": observation_name})
-    merge_node("Disease", {"name": disease})
-
-    query = """
-    MATCH (o:Observation {name: $obs})
-    MATCH (d:Disease {name: $disease})
-    MERGE (o)-[:SUPPORTS]->(d)
-    RETURN o, d
+    _merge_endpoints(("Observation", {"name": observation_name}), ("Disease", {"name": disease}))
+
+    result = get_backend().observation_supports_disease(observation_name, disease)
+    _invalidate(("Observation", observation_name), ("Disease", disease))
+    return result
+
+
+# ---------------------------
+# BULK (UNWIND / MERGE)
+# ---------------------------
+
+def _check_props(props) -> str | None:
+    if props is None:
+        return None
+    if not isinstance(props, dict):
+        return "'props' must be an object"
+    for k, v in props.items():
+        if not is_property_value(v):
+            return f"property '{k}' must be a scalar or a list of scalars"
+    return None
+
+
+def _prepare_node(row) -> tuple[str, dict]:
+    if not isinstance(row, dict):
+        raise ValueError("node must be an object")
+    label = row.get("label")
+    if label not in NODE_KEYS:
+        raise ValueError(f"unknown label {label!r}")
+    props = dict(row.get("props") or {})
+    error = _check_props(props)
+    if error:
+        raise ValueError(error)
+    key = props.pop(NODE_KEYS[label], None)
+    if key in (None, ""):
+        raise ValueError(f"missing '{NODE_KEYS[label]}' in props")
+    return label, {"key": key, "props": props}
+
+
+def _prepare_relationship(row) -> tuple[str, dict]:
+    if not isinstance(row, dict):
+        raise ValueError("relationship must be an object")
+    rel_type = row.get("type")
+    if rel_type not in RELATIONSHIPS:
+        raise ValueError(f"unknown relationship type {rel_type!r}")
+    start, end = row.get("from"), row.get("to")
+    if start in (None, "") or end in (None, ""):
+        raise ValueError("'from' and 'to' are required")
+    error = _check_props(row.get("props"))
+    if error:
+        raise ValueError(error)
+    return rel_type, {"start": start, "end": end, "props": dict(row.get("props") or {})}
+
+
+def _write_chunk(write, rows: list) -> list:
+    """
+    Écrit un chunk en une fois (avec Neo4j : une transaction gérée, rejouée sur
+    erreur transitoire).
+    En cas d'échec le chunk est coupé en deux jusqu'à isoler les lignes fautives,
+    qui sont renvoyées avec leur erreur ; les autres lignes sont écrites.
+    """
+    try:
+        write([r for _, r in rows])
+        return []
+    except Exception as exc:
+        if len(rows) == 1:
+            return [(rows[0][0], str(exc))]
+        mid = len(rows) // 2
+        return _write_chunk(write, rows[:mid]) + _write_chunk(write, rows[mid:])
+
+
+def _write_group(kind: str, name: str, write, rows: list, chunk_size: int) -> tuple[dict, list]:
+    started = time.perf_counter()
+    failed = []
+    for i in range(0, len(rows), chunk_size):
+        failed.extend(_write_chunk(write, rows[i:i + chunk_size]))
+    seconds = time.perf_counter() - started
+    written = len(rows) - len(failed)
+    batch = {
+        "kind": kind,
+        "name": name,
+        "rows": len(rows),
+        "written": written,
+        "failed": len(failed),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(written / seconds, 1) if seconds > 0 else None,
+    }
+    return batch, failed
+
+
+@timed("graph_write")
+def bulk_write(
+    nodes: list | None = None,
+    relationships: list | None = None,
+    chunk_size: int = 500,
+    dry_run: bool = False,
+):
+    """
+    Écrit un lot mixte de nœuds et de relations.
+
+    nodes         : [{"label": "Patient", "props": {"name": "Omar", "age": 40}}, ...]
+    relationships : [{"type": "HAS_SYMPTOM", "from": "Omar", "to": "fever", "props": {...}}, ...]
+
+    Les lignes sont groupées par label / type de relation puis écrites en
+    chunks UNWIND, chacun dans sa propre transaction. Une ligne invalide ou
+    rejetée par le backend est reportée dans "errors" sans bloquer le reste du lot.
     """
-    return graph.run(query, obs=observation_name, disease=disease).data()
+    nodes = nodes or []
+    relationships = relationships or []
+    chunk_size = max(1, int(chunk_size))
+    errors = []
+
+    node_groups = {}
+    for index, row in enumerate(nodes):
+        try:
+            label, prepared = _prepare_node(row)
+        except ValueError as exc:
+            errors.append({"kind": "node", "index": index, "error": str(exc)})
+            continue
+        node_groups.setdefault(label, []).append((index, prepared))
+
+    rel_groups = {}
+    for index, row in enumerate(relationships):
+        try:
+            rel_type, prepared = _prepare_relationship(row)
+        except ValueError as exc:
+            errors.append({"kind": "relationship", "index": index, "error": str(exc)})
+            continue
+        rel_groups.setdefault(rel_type, []).append((index, prepared))
+
+    backend = get_backend()
+    started = time.perf_counter()
+    batches = []
+
+    if dry_run:
+        node_groups, rel_groups = {}, {}
+    touched = []  # labels written, invalidated (and bumped) once at the end
+
+    # Nodes first so relationship MERGEs find them
+    for label, rows in node_groups.items():
+        batch, failed = _write_group("node", label, partial(backend.write_nodes, label), rows, chunk_size)
+        batches.append(batch)
+        errors.extend({"kind": "node", "index": i, "error": e} for i, e in failed)
+        touched.append((label, None))
+
+    for rel_type, rows in rel_groups.items():
+        batch, failed = _write_group(
+            "relationship", rel_type, partial(backend.write_relationships, rel_type), rows, chunk_size
+        )
+        batches.append(batch)
+        errors.extend({"kind": "relationship", "index": i, "error": e} for i, e in failed)
+        touched.extend((label, None) for label in RELATIONSHIPS[rel_type])
+    if touched:
+        _invalidate(*touched)
+
+    seconds = time.perf_counter() - started
+    written = sum(b["written"] for b in batches)
+    return {
+        "written": written,
+        "failed": len(errors),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(written / seconds, 1) if seconds > 0 else None,
+        "batches": batches,
+        "errors": errors,
+    }
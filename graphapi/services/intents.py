@@ -0,0 +1,141 @@
+import re
+
+
+# ======================================================
+#             INTENT REGISTRY (DECLARATIVE RULES)
+# ======================================================
+#
+# Each intent declares, in one place:
+#   keywords  words the question must contain (a tuple = any one of them);
+#             matched as substrings of the lower-cased question ("symptom"
+#             also matches "symptoms")
+#   slots     entity lists of the analysis that must not be empty
+#   read      graph_read / backend function answering it (None: ranked in
+#             memory by query_engine.possible_diseases)
+#   result    key of the answer in graph_results
+#   template  sentence of the final answer ({} = the results)
+# Declaration order is priority: the first intent whose rule holds wins, then
+# the fallback intents (slots alone), then "".
+#
+# Every keyword of every intent is compiled into ONE regex: a question is
+# scanned once, whatever the number of intents, into a bit mask of keywords
+# found. The decision for a (keywords found, slots filled) pair is computed
+# once and then served from a dict.
+
+ENTITY_SLOTS = ("symptoms", "diseases", "patients", "tests", "observations", "visits")
+
+
+class Intent:
+    __slots__ = ("name", "keywords", "slots", "read", "result", "template", "fallback")
+
+    def __init__(self, name: str, keywords: tuple, slots: tuple, read: str | None, result: str,
+                 template: str, fallback: bool = False):
+        self.name = name
+        self.keywords = tuple((k,) if isinstance(k, str) else tuple(k) for k in keywords)
+        self.slots = slots
+        self.read = read
+        self.result = result
+        self.template = template
+        self.fallback = fallback
+
+    def answer(self, graph_results: dict) -> str:
+        return self.template.format(graph_results.get(self.result, []))
+
+
+class IntentRegistry:
+    def __init__(self, intents):
+        self.intents = {intent.name: intent for intent in intents}
+
+        # One bit per distinct keyword; longest first so that the
+        # alternation prefers "risk factor" over a shorter keyword inside it
+        words = sorted({w for i in intents for group in i.keywords for w in group}, key=lambda w: (-len(w), w))
+        self.pattern = re.compile("|".join(re.escape(w) for w in words))
+        bit = {w: 1 << n for n, w in enumerate(words)}
+        # A match also stands for the keywords it contains ("tests" -> "test")
+        self.bits = {w: sum(bit[v] for v in words if v in w) for w in words}
+
+        slot_bit = {slot: 1 << n for n, slot in enumerate(ENTITY_SLOTS)}
+        self.rules = []
+        for fallback in (False, True):
+            for intent in intents:
+                if intent.fallback or not fallback:
+                    groups = () if fallback else tuple(sum(bit[w] for w in group) for group in intent.keywords)
+                    slots = sum(slot_bit[s] for s in intent.slots)
+                    self.rules.append((groups, slots, intent.name))
+        self._decisions = {}
+
+    def __getitem__(self, name: str) -> Intent:
+        return self.intents[name]
+
+    def get(self, name: str) -> Intent | None:
+        return self.intents.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.intents
+
+    def keywords_found(self, question: str) -> int:
+        found = 0
+        bits = self.bits
+        for word in self.pattern.findall(question.lower()):
+            found |= bits[word]
+        return found
+
+    def classify(self, question: str, analysis: dict) -> str:
+        """Intention de la question (ou "") d'après ses mots-clés et les entités extraites."""
+        found = self.keywords_found(question)
+        filled = ((analysis["symptoms"] and 1 or 0) | (analysis["diseases"] and 2 or 0)
+                  | (analysis["patients"] and 4 or 0) | (analysis["tests"] and 8 or 0)
+                  | (analysis["observations"] and 16 or 0) | (analysis["visits"] and 32 or 0))
+        key = found << 6 | filled
+        decision = self._decisions.get(key)
+        if decision is None:
+            decision = self._decisions[key] = self._decide(found, filled)
+        return decision
+
+    def _decide(self, found: int, filled: int) -> str:
+        for groups, slots, name in self.rules:
+            if filled & slots == slots and all(found & group for group in groups):
+                return name
+        return ""
+
+
+# ---------------------------
+# THE INTENTS (priority order)
+# ---------------------------
+
+intent_registry = IntentRegistry([
+    # Visit-level (most specific)
+    Intent("observations_of_visit", ("visit", "observation"), ("visits",),
+           "visit_observations", "observations", "The visit observations are: {}"),
+    Intent("tests_of_visit", ("visit", "test"), ("visits",),
+           "visit_tests", "tests", "The visit tests are: {}"),
+    Intent("visits_of_patient", ("visit",), ("patients",),
+           "patient_visits", "visits", "The patient's visits are: {}"),
+
+    # Disease <-> symptoms
+    Intent("symptoms_of_disease", ("symptom",), ("diseases",),
+           "symptoms_for_diseases", "symptoms", "The symptoms of the disease are: {}"),
+    Intent("possible_diseases", (("indicate", "cause", "possible"),), ("symptoms",),
+           None, "possible_diseases", "The possible diseases are: {}", fallback=True),
+
+    # Treatments, tests and observations of a disease
+    Intent("treatments_for_disease", ("treatment",), ("diseases",),
+           "treatments_for_diseases", "treatments", "The recommended treatments are: {}"),
+    Intent("tests_for_disease", ("test",), ("diseases",),
+           "tests_for_diseases", "tests", "The diagnostic tests are: {}"),
+    Intent("observations_for_disease", ("observation",), ("diseases",),
+           "observations_for_diseases", "observations", "The observations supporting the disease are: {}"),
+
+    # Patient-level
+    Intent("symptoms_of_patient", ("symptom",), ("patients",),
+           "patient_symptoms", "symptoms", "The patient's symptoms are: {}"),
+    Intent("risk_factors_of_patient", ("risk factor",), ("patients",),
+           "patient_risk_factors", "risk_factors", "The patient's risk factors are: {}"),
+
+    # Test / observation -> diseases
+    Intent("diseases_diagnosed_by_test", (("diagnos", "detect", "confirm", "disease", "indicate"),), ("tests",),
+           "diseases_for_test", "diseases", "The diseases diagnosed by the test are: {}"),
+    Intent("diseases_supported_by_observation", (("support", "suggest", "disease", "indicate", "diagnos"),),
+           ("observations",),
+           "diseases_for_observation", "diseases", "The diseases supported by the observation are: {}"),
+])
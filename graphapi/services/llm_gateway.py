@@ -0,0 +1,513 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from kgbackend.llm_config import get_async_client, get_client
+from graphapi.services.metrics import record
+
+
+# ======================================================
+#     LLM GATEWAY (RATE LIMIT, CONCURRENCY, BREAKER)
+# ======================================================
+#
+# Every Groq call of the sync and async pipelines goes through here:
+#   1. circuit breaker: after LLM_BREAKER_FAILURES provider errors in a row
+#      (5xx, connection, timeout; a 429 neither counts nor resets the run)
+#      calls fail fast for LLM_BREAKER_RESET_SECONDS, then a single probe call
+#      decides whether it closes again
+#   2. token buckets: requests and tokens per minute, reserved before the call
+#      (tokens estimated from the prompt, corrected from the usage after); a
+#      caller that would wait more than LLM_QUEUE_TIMEOUT is refused at once
+#   3. adaptive concurrency (AIMD): +1/limit per fast answer, x0.7 on a 429,
+#      a provider error or an answer slower than LLM_LATENCY_TARGET, between
+#      MIN and MAX
+#   4. retries with full jitter on 429 / 5xx / connection errors, Retry-After
+#      honoured (the SDK's own retries are off, see llm_config)
+# An open circuit, a full queue or exhausted retries raise LLMUnavailable.
+
+class LLMUnavailable(Exception):
+    def __init__(self, reason: str, retry_after: float | None = None):
+        self.reason = reason
+        self.retry_after = retry_after
+        message = f"LLM unavailable ({reason})"
+        if retry_after:
+            message += f", retry in {retry_after:.0f}s"
+        super().__init__(message)
+
+
+def classify(exc) -> str | None:
+    """"rate_limited" (429), "provider" (5xx, réseau) ou None (erreur du client, pas de rejeu)."""
+    status = getattr(exc, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None:
+        return "provider" if status >= 500 else None
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return "provider"
+    try:
+        from groq import APIConnectionError  # APITimeoutError included
+    except ImportError:
+        return None
+    return "provider" if isinstance(exc, APIConnectionError) else None
+
+
+def retry_after(exc) -> float | None:
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# ---------------------------
+# TOKEN BUCKET
+# ---------------------------
+
+class TokenBucket:
+    """Seau de per_minute jetons, rempli en continu ; per_minute = 0 le désactive."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, max_wait: float) -> float | None:
+        """
+        Réserve amount jetons et retourne l'attente (secondes) avant de les
+        utiliser ; None (rien réservé) si elle dépasserait max_wait.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            # Later callers queue behind the reservations already made
+            amount = min(amount, self.capacity)
+            wait = max(amount - self._tokens, 0.0) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def adjust(self, amount: float):
+        """Rend (amount > 0) ou reprend (amount < 0) des jetons après coup."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def level(self) -> float | None:
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            self._refill()
+            return round(self._tokens, 1)
+
+
+# ---------------------------
+# ADAPTIVE CONCURRENCY
+# ---------------------------
+
+class _Waiter:
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    Appels simultanés bornés par une limite AIMD ; les appelants en trop
+    attendent dans une file FIFO commune aux threads et aux boucles asyncio.
+    """
+
+    def __init__(self, minimum: int, maximum: int, latency_target: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        self.limit = float(self.minimum + (self.maximum - self.minimum) // 2)
+        self.in_flight = 0
+        self.decreases = 0
+        self._decreased_at = 0.0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _enter(self, waiter) -> bool:
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _withdraw(self, waiter) -> bool:
+        # True when the slot was handed over meanwhile: the caller owns it
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+            return waiter.granted
+
+    def _dispatch(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            try:
+                waiter.wake()
+            except RuntimeError:  # its event loop is gone
+                continue
+            waiter.granted = True
+            self.in_flight += 1
+
+    def acquire(self, timeout: float) -> bool:
+        event = threading.Event()
+        waiter = _Waiter(event.set)
+        if self._enter(waiter):
+            return True
+        event.wait(max(timeout, 0.0))
+        return self._withdraw(waiter)
+
+    async def aacquire(self, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(_resolve, future))
+        if self._enter(waiter):
+            return True
+        try:
+            await asyncio.wait_for(future, max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if self._withdraw(waiter):
+                self.release()
+            raise
+        return self._withdraw(waiter)
+
+    def release(self, latency: float | None = None, overloaded: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.latency_target):
+                # Concurrent failures of one burst count once
+                now = time.monotonic()
+                if now - self._decreased_at >= self.latency_target:
+                    self.limit = max(float(self.minimum), self.limit * 0.7)
+                    self._decreased_at = now
+                    self.decreases += 1
+            elif latency is not None:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._dispatch()
+
+
+# ---------------------------
+# CIRCUIT BREAKER
+# ---------------------------
+
+class CircuitBreaker:
+    def __init__(self, failures: int, reset_seconds: float):
+        self.threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def check(self) -> bool:
+        """
+        Lève LLMUnavailable tant que le circuit est ouvert (un seul appel test
+        ensuite). Renvoie True pour cet appel test.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+        raise LLMUnavailable("circuit_open", max(remaining, 1.0))
+
+    # Only the probe's outcome moves the circuit out of half_open. Calls let
+    # through before it opened and finishing late only count while closed.
+
+    def success(self, probe: bool = False):
+        with self._lock:
+            if probe:
+                self.state = "closed"
+                self._probing = False
+            elif self.state != "closed":
+                return
+            self._failures = 0
+
+    def failure(self, probe: bool = False):
+        with self._lock:
+            if probe:
+                self._probing = False
+                self._open()
+                return
+            if self.state != "closed":
+                return
+            self._failures += 1
+            if self.threshold and self._failures >= self.threshold:
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def abandon(self):
+        # Only for the probe itself, when it ends without a verdict (queue
+        # full, cancelled, only 429s): the next caller may probe again
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+
+
+# ---------------------------
+# GATEWAY
+# ---------------------------
+
+class LLMGateway:
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        latency_target: float = 5.0,
+        max_retries: int = 3,
+        retry_base: float = 0.5,
+        retry_max: float = 8.0,
+        queue_timeout: float = 30.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        completion_tokens: int = 200,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.limiter = AdaptiveLimiter(min_concurrency, max_concurrency, latency_target)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.queue_timeout = queue_timeout
+        self.completion_tokens = completion_tokens
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._queued_now = 0  # callers waiting on the buckets or for a slot
+        self._counts = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "provider_errors": 0,
+            "rejected": 0,
+            "tokens_used": 0,
+        }
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._max_queue_depth = 0
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def _queued(self, delta):
+        with self._lock:
+            self._queued_now += delta
+            self._max_queue_depth = max(self._max_queue_depth, self._queued_now)
+
+    def _waited(self, seconds):
+        record("llm_wait", seconds)
+        with self._lock:
+            self._waits += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+
+    def _estimate(self, request) -> int:
+        chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        return chars // 4 + int(request.get("max_tokens") or self.completion_tokens)
+
+    def _reserve(self, estimate) -> float:
+        wait = self.requests.reserve(1, self.queue_timeout)
+        if wait is not None:
+            token_wait = self.tokens.reserve(estimate, self.queue_timeout)
+            if token_wait is not None:
+                return max(wait, token_wait)
+            self.requests.adjust(1)
+        self._count("rejected")
+        raise LLMUnavailable("rate_limited", self.queue_timeout)
+
+    def _rejected(self, estimate):
+        self.tokens.adjust(estimate)
+        self._count("rejected")
+        return LLMUnavailable("queue_full", self.queue_timeout)
+
+    def _succeeded(self, response, latency, estimate, probe=False):
+        self.limiter.release(latency)
+        self.breaker.success(probe)
+        usage = getattr(response, "usage", None)
+        used = getattr(usage, "total_tokens", None)
+        if isinstance(used, int):
+            self.tokens.adjust(estimate - used)
+            self._count("tokens_used", used)
+
+    def _failed(self, exc, attempt, estimate, probe=False) -> float | None:
+        """Attente avant le prochain essai ; None : l'erreur est renvoyée telle quelle."""
+        kind = classify(exc)
+        # 429s and provider errors shrink the limit; client errors leave it
+        self.limiter.release(overloaded=kind is not None)
+        self.tokens.adjust(estimate)
+        if kind is None:
+            self.breaker.success(probe)  # the provider answered
+            return None
+        if kind == "rate_limited":
+            # Throttled, not healthy: neither closes the circuit nor counts as a failure
+            self._count("rate_limited")
+        else:
+            self._count("provider_errors")
+            self.breaker.failure(probe)
+        if attempt >= self.max_retries or self.breaker.state == "open":
+            raise LLMUnavailable(kind, retry_after(exc)) from exc
+        self._count("retries")
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        return max(delay, retry_after(exc) or 0.0)
+
+    def complete(self, **request):
+        """client.chat.completions.create(**request) (client Groq synchrone)."""
+        probe = self.breaker.check()
+        self._count("calls")
+        estimate = self._estimate(request)
+        try:
+            for attempt in range(self.max_retries + 1):
+                started = time.monotonic()
+                wait = self._reserve(estimate)
+                self._queued(1)
+                try:
+                    time.sleep(wait)
+                    acquired = self.limiter.acquire(self.queue_timeout - wait)
+                finally:
+                    self._queued(-1)
+                if not acquired:
+                    raise self._rejected(estimate)
+                self._waited(time.monotonic() - started)
+
+                self._count("attempts")
+                sent = time.monotonic()
+                try:
+                    response = get_client().chat.completions.create(**request)
+                except Exception as exc:
+                    delay = self._failed(exc, attempt, estimate, probe)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                self._succeeded(response, time.monotonic() - sent, estimate, probe)
+                return response
+        finally:
+            if probe:
+                self.breaker.abandon()
+
+    async def acomplete(self, **request):
+        """Même chose avec le client asynchrone : les attentes ne bloquent pas la boucle."""
+        probe = self.breaker.check()
+        self._count("calls")
+        estimate = self._estimate(request)
+        try:
+            for attempt in range(self.max_retries + 1):
+                started = time.monotonic()
+                wait = self._reserve(estimate)
+                self._queued(1)
+                try:
+                    await asyncio.sleep(wait)
+                    acquired = await self.limiter.aacquire(self.queue_timeout - wait)
+                finally:
+                    self._queued(-1)
+                if not acquired:
+                    raise self._rejected(estimate)
+                self._waited(time.monotonic() - started)
+
+                self._count("attempts")
+                sent = time.monotonic()
+                try:
+                    response = await get_async_client().chat.completions.create(**request)
+                except asyncio.CancelledError:
+                    self.limiter.release()
+                    raise
+                except Exception as exc:
+                    delay = self._failed(exc, attempt, estimate, probe)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                self._succeeded(response, time.monotonic() - sent, estimate, probe)
+                return response
+        finally:
+            if probe:
+                self.breaker.abandon()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            waits, total, longest = self._waits, self._wait_total, self._wait_max
+            queue_depth = self._queued_now
+            max_queue_depth = self._max_queue_depth
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "concurrency_decreases": self.limiter.decreases,
+            "in_flight": self.limiter.in_flight,
+            "queue_depth": queue_depth,
+            "max_queue_depth": max_queue_depth,
+            "wait_ms": {
+                "avg": round(total / waits * 1000, 2) if waits else 0.0,
+                "max": round(longest * 1000, 2),
+            },
+            **counts,
+            "buckets": {
+                "requests": self.requests.level(),
+                "tokens": self.tokens.level(),
+            },
+        }
+
+
+llm_gateway = LLMGateway(
+    requests_per_minute=getattr(settings, "LLM_REQUESTS_PER_MINUTE", 0),
+    tokens_per_minute=getattr(settings, "LLM_TOKENS_PER_MINUTE", 0),
+    min_concurrency=getattr(settings, "LLM_CONCURRENCY_MIN", 1),
+    max_concurrency=getattr(settings, "LLM_CONCURRENCY_MAX", 16),
+    latency_target=getattr(settings, "LLM_LATENCY_TARGET", 5.0),
+    max_retries=getattr(settings, "LLM_MAX_RETRIES", 3),
+    retry_base=getattr(settings, "LLM_RETRY_BASE", 0.5),
+    retry_max=getattr(settings, "LLM_RETRY_MAX", 8.0),
+    queue_timeout=getattr(settings, "LLM_QUEUE_TIMEOUT", 30.0),
+    breaker_failures=getattr(settings, "LLM_BREAKER_FAILURES", 5),
+    breaker_reset=getattr(settings, "LLM_BREAKER_RESET_SECONDS", 30.0),
+    completion_tokens=getattr(settings, "LLM_COMPLETION_TOKENS", 200),
+)
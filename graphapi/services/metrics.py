@@ -0,0 +1,243 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+
+# ======================================================
+#     LATENCY METRICS (HISTOGRAMS, SERVER-TIMING, /metrics)
+# ======================================================
+#
+# Each timed stage lands in two places:
+#   - a process-wide histogram per (family, label) with log-spaced buckets
+#     (x√2 from 50µs to ~50s): p50 / p95 / p99 within a few percent, in
+#     constant memory whatever the traffic
+#   - the timings of the current request (a contextvar set by
+#     MetricsMiddleware, shared with to_thread workers), summed per stage
+#     for the Server-Timing header
+# One observation is a perf_counter pair, a bisect and a lock: cheap enough
+# to stay on in production (METRICS_ENABLED=false makes it a no-op).
+
+ENABLED = getattr(settings, "METRICS_ENABLED", True)
+
+BOUNDS = tuple(50e-6 * 2 ** (i / 2) for i in range(41))
+QUANTILES = (0.5, 0.95, 0.99)
+
+# family -> (metric name, label name, help)
+FAMILIES = {
+    "request": ("graphapi_request_duration_seconds", "endpoint", "Request latency per endpoint (URL name)"),
+    "intent": ("graphapi_question_duration_seconds", "intent", "Question latency per intent (whole pipeline)"),
+    "stage": ("graphapi_stage_duration_seconds", "stage", "Latency per pipeline stage / graph function"),
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BOUNDS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimation interpolée dans le bucket (comme histogram_quantile de Prometheus)."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = BOUNDS[i - 1] if i else 0.0
+                high = BOUNDS[i] if i < len(BOUNDS) else BOUNDS[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return 0.0
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (family, label) -> Histogram
+        self._requests = {}    # (endpoint, method, status) -> count
+
+    def observe(self, family: str, label: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((family, label))
+            if histogram is None:
+                histogram = self._histograms[(family, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def count_request(self, endpoint: str, method: str, status: int):
+        key = (endpoint, method, status)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+
+    def _copy(self):
+        with self._lock:
+            histograms = {}
+            for key, h in self._histograms.items():
+                copy = histograms[key] = Histogram()
+                copy.counts, copy.total, copy.count = list(h.counts), h.total, h.count
+            return histograms, dict(self._requests)
+
+    def summary(self) -> dict:
+        """{famille: {label: {"count", "p50_ms", "p95_ms", "p99_ms"}}}."""
+        histograms, _ = self._copy()
+        summary = {family: {} for family in FAMILIES}
+        for (family, label), h in sorted(histograms.items()):
+            summary[family][label] = {
+                "count": h.count,
+                **{f"p{round(q * 100)}_ms": round(h.quantile(q) * 1000, 3) for q in QUANTILES},
+            }
+        return summary
+
+    def prometheus(self, gauges: dict | None = None, counters: dict | None = None) -> str:
+        """
+        Texte d'exposition Prometheus : compteurs de requêtes, histogrammes et
+        leurs quantiles estimés ; gauges / counters : {nom: (aide, valeur)}.
+        """
+        histograms, requests = self._copy()
+        lines = [
+            "# HELP graphapi_requests_total Requests served per endpoint, method and status",
+            "# TYPE graphapi_requests_total counter",
+        ]
+        for (endpoint, method, status), n in sorted(requests.items()):
+            lines.append(f'graphapi_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {n}')
+
+        for family, (name, label_name, help_text) in FAMILIES.items():
+            series = sorted((label, h) for (f, label), h in histograms.items() if f == family)
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for label, h in series:
+                label = f'{label_name}="{_escape(label)}"'
+                cumulative = 0
+                for bound, n in zip(BOUNDS, h.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label},le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {h.count}')
+                lines.append(f"{name}_sum{{{label}}} {h.total:.9g}")
+                lines.append(f"{name}_count{{{label}}} {h.count}")
+
+            quantile_name = name.replace("_duration_seconds", "_latency_seconds")
+            lines += [
+                f"# HELP {quantile_name} p50 / p95 / p99 of {name}",
+                f"# TYPE {quantile_name} gauge",
+            ]
+            for label, h in series:
+                for q in QUANTILES:
+                    lines.append(f'{quantile_name}{{{label_name}="{_escape(label)}",quantile="{q}"}} {h.quantile(q):.9g}')
+
+        for kind, values in (("gauge", gauges or {}), ("counter", counters or {})):
+            for name, (help_text, value) in values.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+# ---------------------------
+# STAGES
+# ---------------------------
+
+_request_timings = ContextVar("graphapi_request_timings", default=None)
+
+
+def record(stage: str, seconds: float):
+    if not ENABLED:
+        return
+    metrics.observe("stage", stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class timed:
+    """
+    Chronomètre une étape : `with timed("llm"):` l'enregistre sous ce nom ;
+    en décorateur, `@timed("graph_read")` l'enregistre sous
+    "graph_read.<nom de la fonction>".
+    """
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.started)
+
+    def __call__(self, func):
+        if not ENABLED:
+            return func
+        stage = f"{self.stage}.{func.__name__}"
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record(stage, time.perf_counter() - started)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - started)
+        return wrapper
+
+
+def observe_question(intents: list, seconds: float):
+    if ENABLED:
+        metrics.observe("intent", "+".join(intents) or "none", seconds)
+
+
+# ---------------------------
+# REQUESTS
+# ---------------------------
+
+def begin_request():
+    """Ouvre les timings de la requête ; le jeton est rendu à end_request."""
+    return _request_timings.set({}), time.perf_counter()
+
+
+def end_request(request, response, state):
+    token, started = state
+    elapsed = time.perf_counter() - started
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+
+    match = getattr(request, "resolver_match", None)
+    endpoint = (match.url_name or match.view_name) if match else "unmatched"
+    metrics.observe("request", endpoint, elapsed)
+    metrics.count_request(endpoint, request.method, response.status_code)
+
+    if getattr(settings, "SERVER_TIMING", True):
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+        parts.append(f"total;dur={elapsed * 1000:.2f}")
+        response["Server-Timing"] = ", ".join(parts)
+    return response
@@ -0,0 +1,67 @@
+import base64
+import json
+
+
+# ======================================================
+#                 OPAQUE PAGINATION CURSORS
+# ======================================================
+
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    """Lève ValueError si le curseur n'a pas été produit par encode_cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def page_size(value, default: int = 50, maximum: int = 500) -> int:
+    """Lève ValueError si value n'est pas un entier positif."""
+    if value in (None, ""):
+        return default
+    size = int(value)
+    if size < 1:
+        raise ValueError("limit must be positive")
+    return min(size, maximum)
+
+
+# ======================================================
+#                  KEYSET PAGINATION
+# ======================================================
+#
+# Paginated queries return their sort key as _key (and _id when the key is
+# not unique); the last row of a page becomes the cursor of the next one.
+
+def keyset_params(cursor: dict | None) -> dict:
+    cursor = cursor or {}
+    return {"after_key": str(cursor.get("key", "")), "after_id": str(cursor.get("id", ""))}
+
+
+def strip_keyset_fields(row: dict) -> dict:
+    """Copie de la ligne sans _key / _id (la ligne reçue n'est pas modifiée)."""
+    return {k: v for k, v in row.items() if k != "_key" and k != "_id"}
+
+
+def keyset_result(records: list, limit: int) -> dict:
+    """records : limit + 1 lignes au plus, la dernière signale une page suivante."""
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    next_position = None
+    if has_more:
+        last = records[-1]
+        next_position = {"key": last["_key"]}
+        if "_id" in last:
+            next_position["id"] = last["_id"]
+
+    return {"results": [strip_keyset_fields(r) for r in records], "next": next_position}
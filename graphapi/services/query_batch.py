@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+from django.conf import settings
+
+from graphapi.services import async_graph_read as reads
+from graphapi.services.async_query_engine import aextract_entities
+from graphapi.services.query_engine import (
+    PER_DISEASE_READS,
+    assemble_plan,
+    build_reasoning,
+    plan_intents,
+    plan_reads,
+    resolve_entities,
+)
+
+
+# ======================================================
+#              BATCH QUESTIONS (/query/batch/)
+# ======================================================
+#
+# Thousands of questions in one request:
+#   1. duplicates (same question once lower-cased / re-spaced) run once
+#   2. extraction (matcher, then Groq) runs concurrently, at most
+#      QUERY_BATCH_CONCURRENCY questions or graph plans at a time
+#   3. the graph reads of every question are pooled by entity: a patient or
+#      a visit is read once, each per-disease read once with the union of
+#      the diseases asked; the pool runs as query plans of BATCH_PLAN_SIZE
+#      reads (one round trip each)
+# Answers and errors come back in input order.
+
+BATCH_PLAN_SIZE = 50
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def _pool_reads(items: list) -> tuple[dict, list]:
+    """(lectures communes {clé: appel}, [{intent: clé}] par question)."""
+    pool, diseases, uses = {}, {}, []
+    for item in items:
+        if isinstance(item, BaseException):
+            uses.append(None)
+            continue
+        analysis = item["analysis"]
+        mapping = {}
+        for intent, (method, args, kwargs) in plan_reads(analysis["intents"], analysis).items():
+            if method in PER_DISEASE_READS:
+                key = method
+                union = diseases.setdefault(method, {})
+                for disease in args[0]:
+                    union.setdefault(disease.strip().lower(), disease)
+            else:
+                key = (method, normalize_question(str(args[0])), tuple(sorted(kwargs.items())))
+                pool.setdefault(key, (method, args, kwargs))
+            mapping[intent] = key
+        uses.append(mapping)
+    for method, union in diseases.items():
+        pool[method] = (method, (list(union.values()),), {})
+    return pool, uses
+
+
+async def aprocess_batch(questions: list) -> dict:
+    started = time.perf_counter()
+    limit = asyncio.Semaphore(getattr(settings, "QUERY_BATCH_CONCURRENCY", 16))
+
+    unique, positions, order = [], {}, []
+    for question in questions:
+        key = normalize_question(question)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(question)
+        order.append(positions[key])
+
+    # Entities of every distinct question, concurrently
+    async def extract(question):
+        async with limit:
+            return await aextract_entities(question)
+
+    extracted = await asyncio.gather(*(extract(q) for q in unique), return_exceptions=True)
+
+    def prepare():
+        items = []
+        for question, outcome in zip(unique, extracted):
+            if isinstance(outcome, BaseException):
+                items.append(outcome)
+                continue
+            analysis, extraction = outcome
+            try:
+                corrections = resolve_entities(analysis)
+                analysis["intents"] = plan_intents(question, analysis)
+            except Exception as e:
+                items.append(e)
+                continue
+            analysis["intent"] = analysis["intents"][0] if analysis["intents"] else ""
+            items.append({
+                "question": question,
+                "analysis": analysis,
+                "extraction": extraction,
+                "corrections": corrections,
+            })
+        return items
+
+    # Resolver and ranker may (re)load from the graph: off the loop
+    items = await asyncio.to_thread(prepare)
+    pool, uses = _pool_reads(items)
+
+    # Pooled reads, BATCH_PLAN_SIZE per round trip
+    keys = list(pool)
+    chunks = [keys[i:i + BATCH_PLAN_SIZE] for i in range(0, len(keys), BATCH_PLAN_SIZE)]
+
+    async def fetch(chunk):
+        async with limit:
+            return await reads.run_plan({key: pool[key] for key in chunk})
+
+    fetched, failed = {}, {}
+    for chunk, outcome in zip(chunks, await asyncio.gather(*(fetch(c) for c in chunks), return_exceptions=True)):
+        if isinstance(outcome, BaseException):
+            failed.update(dict.fromkeys(chunk, outcome))
+        else:
+            fetched.update(outcome)
+
+    def answer(item, mapping):
+        if isinstance(item, BaseException):
+            return item
+        error = next((failed[key] for key in mapping.values() if key in failed), None)
+        if error is not None:
+            return error
+        analysis = item["analysis"]
+        plan = analysis["intents"]
+        results = assemble_plan(plan, analysis, {intent: fetched[key] for intent, key in mapping.items()})
+        # One intent: the flat results, as /query/ returns them
+        graph_results = results[plan[0]] if len(plan) == 1 else results
+        return {
+            **item,
+            "graph_results": graph_results,
+            "reasoning": build_reasoning(item["question"], analysis, graph_results),
+        }
+
+    answers = await asyncio.to_thread(lambda: [answer(item, mapping) for item, mapping in zip(items, uses)])
+
+    results, errors = [], 0
+    for question, position in zip(questions, order):
+        outcome = answers[position]
+        if isinstance(outcome, BaseException):
+            errors += 1
+            results.append({"question": question, "error": f"{type(outcome).__name__}: {outcome}"})
+        else:
+            results.append({**outcome, "question": question})
+
+    return {
+        "results": results,
+        "stats": {
+            "questions": len(questions),
+            "unique": len(unique),
+            "graph_reads": len(pool),
+            "round_trips": len(chunks),
+            "errors": errors,
+            "seconds": round(time.perf_counter() - started, 4),
+        },
+    }
@@ -1,31 +1,30 @@
 import json
-from kgbackend.llm_config import client
-
-from graphapi.services.graph_read import (
-    all_symptoms,
-    all_diseases,
-    all_patients,
-    all_tests,
-    all_observations,
-    diseases_for_symptom,
-    symptoms_for_disease,
-    treatments_for_disease,
-    diseases_for_test,
-    diseases_for_observation,
-    patient_symptoms,
-    patient_risk_factors,
-    patient_visits,
-    visit_observations,
-    visit_tests
-)
+import re
+import time
+from django.conf import settings
+from graphapi.services.backends import get_backend
+from graphapi.services.entity_matcher import entity_matcher
+from graphapi.services.entity_resolver import entity_resolver
+from graphapi.services.diagnosis import diagnosis_ranker
+from graphapi.services.extraction_cache import extraction_cache
+from graphapi.services.llm_gateway import llm_gateway
+from graphapi.services.metrics import observe_question, timed
+from graphapi.services.pagination import strip_keyset_fields
+
+from graphapi.services import graph_read
+from graphapi.services.intents import ENTITY_SLOTS, intent_registry
 
 
 # ======================================================
 #                 LLM EXTRACTION (ENTITIES ONLY)
 # ======================================================
 
-def analyze_with_llm(question: str) -> dict:
-    prompt = """
+# Bump PROMPT_VERSION whenever EXTRACTION_PROMPT changes: it is part of the
+# extraction cache key
+PROMPT_VERSION = "1"
+LLM_MODEL = getattr(settings, "GROQ_MODEL", "llama-3.1-8b-instant")
+
+EXTRACTION_PROMPT = """
 You are an advanced medical NLP parser used inside a Knowledge-Graph reasoning system.
 Your ONLY task is to extract entities EXACTLY as they appear in the user's question.
 You MUST NOT answer the question. You MUST NOT guess. You MUST NOT add any extra text.
@@ -74,214 +73,311 @@ The system will infer the intent automatically.
 ============================
 
 QUESTION:
-""" + question
+"""
+
+
+def cached_extraction(question: str) -> dict | None:
+    cached = extraction_cache.get(question, LLM_MODEL, PROMPT_VERSION)
+    if cached is None:
+        return None
+    try:
+        # Entries written before validation may lack entity lists
+        return validate_extraction(cached)
+    except ValueError:
+        return None
 
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[{"role": "user", "content": prompt}]
-    )
 
-    raw = response.choices[0].message.content
+def analyze_with_llm(question: str, extraction: dict | None = None) -> dict:
+    cached = cached_extraction(question)
+    if cached is not None:
+        if extraction is not None:
+            extraction["source"] = "llm_cache"
+        return cached
 
+    prompt = EXTRACTION_PROMPT + question
+
+    with timed("llm"):
+        response = llm_gateway.complete(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+    return parse_llm_extraction(question, response.choices[0].message.content)
+
+
+def parse_llm_extraction(question: str, raw: str) -> dict:
     try:
-        data = json.loads(raw)
-        data["intent"] = ""  # Always empty → auto inference later
-        return data
-    except:
+        data = validate_extraction(json.loads(raw))
+    except (ValueError, TypeError):
         print("\n⚠️ INVALID JSON FROM LLM:\n", raw)
-        return {
-            "intent": "",
-            "symptoms": [],
-            "diseases": [],
-            "patients": [],
-            "tests": [],
-            "observations": [],
-            "visits": []
-        }
+        return {"intent": "", **{slot: [] for slot in ENTITY_SLOTS}}
+    # Only a complete, well-typed extraction is worth caching
+    extraction_cache.set(question, LLM_MODEL, PROMPT_VERSION, data)
+    return data
+
+
+def validate_extraction(data) -> dict:
+    """
+    Ramène la réponse du LLM au format attendu : un dict avec toutes les
+    listes d'entités (absentes -> []), intent vide. Lève ValueError si une
+    liste n'en est pas une ou contient autre chose que des noms.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("extraction is not an object")
+    out = {"intent": ""}  # Always empty → auto inference later
+    for slot in ENTITY_SLOTS:
+        values = data.get(slot) or []
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"invalid {slot}: {values!r}")
+        out[slot] = [v.strip() for v in values if v.strip()]
+    return out
+
+
+# ======================================================
+#        ENTITY EXTRACTION (DICTIONARY FIRST, LLM FALLBACK)
+# ======================================================
+
+def extract_entities(question: str) -> tuple[dict, dict]:
+    """
+    Essaie d'abord le matcher du vocabulaire du graphe ; le LLM n'est appelé
+    que si la couverture/confiance du matcher est insuffisante.
+
+    Retourne (analysis, extraction) où extraction décrit le chemin utilisé.
+    """
+    analysis, extraction = match_entities(question)
+    if analysis is not None:
+        return analysis, extraction
+    return analyze_with_llm(question, extraction), extraction
+
+
+def match_entities(question: str) -> tuple[dict | None, dict]:
+    """
+    Passe du matcher seul : analysis vaut None si le LLM doit prendre le relais.
+    """
+    extraction = {"source": "llm"}
+
+    if getattr(settings, "ENTITY_MATCHER_ENABLED", True):
+        try:
+            with timed("matcher"):
+                match = entity_matcher.extract(question)
+        except Exception as exc:
+            print("\n⚠️ ENTITY MATCHER UNAVAILABLE:", exc)
+            match = None
+
+        if match is not None:
+            extraction["coverage"] = match["coverage"]
+            extraction["confidence"] = match["confidence"]
+            if match["confidence"] >= getattr(settings, "ENTITY_MATCHER_MIN_CONFIDENCE", 0.75):
+                extraction["source"] = "matcher"
+                return match["analysis"], extraction
+
+    return None, extraction
+
+
+def resolve_entities(analysis: dict) -> list:
+    """
+    Ramène chaque entité extraite à son nom dans le graphe ("feaver" -> "fever")
+    et renvoie les corrections faites.
+    """
+    if not getattr(settings, "ENTITY_RESOLVER_ENABLED", True):
+        return []
+    try:
+        return entity_resolver.resolve(analysis)
+    except Exception as exc:
+        print("\n⚠️ ENTITY RESOLVER UNAVAILABLE:", exc)
+        return []
 
 
 # ======================================================
 #                INTENT INFERENCE ENGINE (RULES)
 # ======================================================
+# The rules are declared in intents.py (keywords, entity slots, read,
+# answer template), in priority order.
 
 def infer_intent(question: str, analysis: dict) -> str:
-    q = question.lower()
-    symptoms = analysis["symptoms"]
-    diseases = analysis["diseases"]
-    patients = analysis["patients"]
-    tests = analysis["tests"]
-    observations = analysis["observations"]
-    visits = analysis["visits"]
-
-    # -----------------------------
-    # VISIT-LEVEL (PLUS SPÉCIFIQUE)
-    # -----------------------------
-    # 1) Observations d'une visite précise
-    if "visit" in q and "observation" in q and visits:
-        return "observations_of_visit"
-
-    # 2) Tests d'une visite précise
-    if "visit" in q and "test" in q and visits:
-        return "tests_of_visit"
-
-    # 3) Liste des visites d'un patient
-    if "visit" in q and patients:
-        return "visits_of_patient"
-
-    # -----------------------------
-    # DISEASE <-> SYMPTOMS
-    # -----------------------------
-    if "symptom" in q and diseases:
-        return "symptoms_of_disease"
-
-    if ("indicate" in q or "cause" in q or "possible" in q) and symptoms:
-        return "possible_diseases"
-
-    # -----------------------------
-    # TRAITEMENTS
-    # -----------------------------
-    if ("treatment" in q or "treatments" in q) and diseases:
-        return "treatments_for_disease"
-
-    # -----------------------------
-    # TESTS / OBSERVATIONS D'UNE MALADIE
-    # -----------------------------
-    if "test" in q and diseases:
-        return "tests_for_disease"
-
-    if "observation" in q and diseases:
-        return "observations_for_disease"
-
-    # -----------------------------
-    # PATIENT-LEVEL
-    # -----------------------------
-    if patients:
-        if "symptom" in q:
-            return "symptoms_of_patient"
-        if "risk factor" in q:
-            return "risk_factors_of_patient"
-
-    # -----------------------------
-    # FALLBACKS
-    # -----------------------------
-    if symptoms:
-        return "possible_diseases"
-
-    return ""
-
+    return intent_registry.classify(question, analysis)
 
 
 # ======================================================
 #                GRAPH EXECUTION (Neo4j)
 # ======================================================
 
+# Upper bound on rows per list in a /query/ answer
+QUERY_PAGE_SIZE = 200
+
+
+def flatten_per_disease(per_disease: dict, diseases: list) -> list:
+    # Keeps the order in which the diseases were asked for
+    out = []
+    for d in diseases:
+        out.extend(per_disease.get(d.strip().lower(), []))
+    return out
+
+
+DIAGNOSIS_TOP_K = getattr(settings, "DIAGNOSIS_TOP_K", 10)
+
+
+def possible_diseases(symptoms: list) -> dict:
+    # Weighted ranking over the in-memory INDICATES matrix (diagnosis.py):
+    # symptoms that indicate nothing are left out of the scores
+    ranking = diagnosis_ranker.rank(symptoms, k=DIAGNOSIS_TOP_K) if symptoms else {"ranked": [], "unmatched": []}
+    return {
+        "possible_diseases": [m["disease"] for m in ranking["ranked"]],
+        "disease_matches": ranking["ranked"],
+        "unmatched_symptoms": ranking["unmatched"],
+    }
+
+
 def execute_graph_queries(analysis: dict) -> dict:
-    intent = analysis.get("intent")
-    symptoms = analysis["symptoms"]
-    diseases = analysis["diseases"]
-    patients = analysis["patients"]
-    tests = analysis["tests"]
-    observations = analysis["observations"]
-    visits = analysis["visits"]
+    intent = intent_registry.get(analysis.get("intent"))
+    if intent is None:
+        return {}
 
-    results = {}
+    # Symptoms -> Diseases (top-k by weighted evidence, no round trip)
+    if intent.read is None:
+        return possible_diseases(analysis["symptoms"])
 
-    # Symptoms -> Diseases
-    if intent == "possible_diseases":
-        disease_sets = []
-        for s in symptoms:
-            items = diseases_for_symptom(s)
-            if items:
-                disease_sets.append(set(items))
-        results["possible_diseases"] = list(set.intersection(*disease_sets)) if disease_sets else []
-
-    # Disease -> Symptoms
-    if intent == "symptoms_of_disease":
-        out = []
-        for d in diseases:
-            out.extend(symptoms_for_disease(d))
-        results["symptoms"] = out
-
-    # Disease -> Treatments
-    if intent == "treatments_for_disease":
-        out = []
-        for d in diseases:
-            out.extend(treatments_for_disease(d))
-        results["treatments"] = out
-
-    # Disease -> Tests
-    if intent == "tests_for_disease":
-        out = []
-        for d in diseases:
-            out.extend(diseases_for_test(d))
-        results["tests"] = out
-
-    # Observation -> Disease
-    if intent == "diseases_supported_by_observation" and observations:
-        results["diseases"] = diseases_for_observation(observations[0])
-
-    # Test -> Disease
-    if intent == "diseases_diagnosed_by_test" and tests:
-        results["diseases"] = diseases_for_test(tests[0])
-
-    # Patient → Symptoms
-    if intent == "symptoms_of_patient" and patients:
-        results["symptoms"] = patient_symptoms(patients[0])
-
-    # Patient → Risk factors
-    if intent == "risk_factors_of_patient" and patients:
-        results["risk_factors"] = patient_risk_factors(patients[0])
-
-    # Patient → Visits
-    if intent == "visits_of_patient" and patients:
-        results["visits"] = patient_visits(patients[0])
-
-    # Visit → Observations
-    if intent == "observations_of_visit" and visits:
-        results["observations"] = visit_observations(visits[0])
-
-    # Visit → Tests
-    if intent == "tests_of_visit" and visits:
-        results["tests"] = visit_tests(visits[0])
-
-    return results
+    entities = analysis[intent.slots[0]]
+    read = getattr(graph_read, intent.read)
+    if intent.read in PER_DISEASE_READS:
+        return {intent.result: flatten_per_disease(read(entities), entities) if entities else []}
+    if not entities:
+        return {}
+    if intent.read in PAGINATED_READS:
+        return {intent.result: read(entities[0], limit=QUERY_PAGE_SIZE)["results"]}
+    return {intent.result: read(entities[0])}
 
 
 # ======================================================
-#                     REASONING LAYER
+#            QUERY PLANNER (MULTI-INTENT QUESTIONS)
 # ======================================================
+#
+# "What are Omar's symptoms and what diseases could they indicate?" asks two
+# things: each clause gets its own intent and every graph read of the plan
+# runs in one backend round trip (one Cypher statement with CALL subqueries
+# on Neo4j). possible_diseases is ranked in memory; asked without symptoms
+# after a patient's symptoms ("they"), it ranks that patient's symptoms.
+
+ENTITY_KEYS = ENTITY_SLOTS
+
+# Clause boundaries: "?", ";" and "and" / "also" / "then" before a question word
+CLAUSE_SPLIT = re.compile(
+    r"[?;]|\b(?:and|also|then)\s+(?=(?:what|which|who|how|when|where|does|do|is|are|can|could|"
+    r"should|show|list|give|tell)\b)",
+    re.IGNORECASE,
+)
+DISEASE_WORDS = re.compile(r"\b(?:diseases?|illness(?:es)?|indicate[sd]?|cause[sd]?|possible|diagnos\w*)\b")
 
-def build_reasoning(question, analysis, graph_results):
-    intent = analysis["intent"]
-
-    final = "No matching information found."
-
-    if intent == "possible_diseases":
-        final = f"The possible diseases are: {graph_results.get('possible_diseases', [])}"
+# Shape of the reads named by the intents (intents.py)
+PER_DISEASE_READS = {"symptoms_for_diseases", "treatments_for_diseases", "tests_for_diseases", "observations_for_diseases"}
+PAGINATED_READS = {"patient_visits", "visit_observations"}
 
-    elif intent == "symptoms_of_disease":
-        final = f"The symptoms of the disease are: {graph_results.get('symptoms', [])}"
 
-    elif intent == "treatments_for_disease":
-        final = f"The recommended treatments are: {graph_results.get('treatments', [])}"
+def split_clauses(question: str) -> list[str]:
+    return [c.strip() for c in CLAUSE_SPLIT.split(question) if c and c.strip()]
 
-    elif intent == "tests_for_disease":
-        final = f"The diagnostic tests are: {graph_results.get('tests', [])}"
 
-    elif intent == "symptoms_of_patient":
-        final = f"The patient's symptoms are: {graph_results.get('symptoms', [])}"
+def plan_intents(question: str, analysis: dict) -> list[str]:
+    """
+    Une intention par proposition de la question, dans l'ordre, sans doublon.
+    Chaque proposition est interprétée avec les entités qu'elle cite (et
+    celles que la question ne cite pas telles quelles, ex: fautes corrigées).
+    """
+    clauses = split_clauses(question)
+    if len(clauses) < 2:
+        intent = infer_intent(question, analysis)
+        return [intent] if intent else []
 
-    elif intent == "risk_factors_of_patient":
-        final = f"The patient's risk factors are: {graph_results.get('risk_factors', [])}"
+    lowered = [c.lower() for c in clauses]
+    unplaced = {
+        key: [e for e in analysis[key] if not any(e.lower() in c for c in lowered)]
+        for key in ENTITY_KEYS
+    }
+    plan = []
+    for clause, low in zip(clauses, lowered):
+        scoped = {key: [e for e in analysis[key] if e.lower() in low] + unplaced[key] for key in ENTITY_KEYS}
+        intent = infer_intent(clause, scoped)
+        if not intent and "symptoms_of_patient" in plan and DISEASE_WORDS.search(low):
+            intent = "possible_diseases"
+        if intent and intent not in plan:
+            plan.append(intent)
+    return plan
+
+
+def plan_reads(plan: list, analysis: dict) -> dict:
+    """Lectures du graphe du plan : {intent: (méthode du backend, args, kwargs)}."""
+    calls = {}
+    for name in plan:
+        intent = intent_registry.get(name)
+        if intent is None or intent.read is None:
+            continue
+        method = intent.read
+        entities = analysis[intent.slots[0]]
+        if not entities:
+            continue
+        if method in PER_DISEASE_READS:
+            calls[name] = (method, (list(entities),), {})
+        elif method in PAGINATED_READS:
+            calls[name] = (method, (entities[0],), {"limit": QUERY_PAGE_SIZE})
+        else:
+            calls[name] = (method, (entities[0],), {})
+    return calls
+
+
+def assemble_plan(plan: list, analysis: dict, fetched: dict) -> dict:
+    """Résultats par intention {intent: {...}} à partir des lectures faites (fetched[intent])."""
+    results = {}
+    for name in plan:
+        if name == "possible_diseases":
+            continue
+        intent = intent_registry.get(name)
+        if intent is None or intent.read is None:
+            results[name] = {}
+            continue
+        method = intent.read
+        if method in PER_DISEASE_READS:
+            value = flatten_per_disease(fetched.get(name, {}), analysis["diseases"])
+        elif method in PAGINATED_READS:
+            value = [strip_keyset_fields(r) for r in fetched.get(name, [])]
+        else:
+            value = list(fetched.get(name, []))
+        results[name] = {intent.result: value}
+
+    if "possible_diseases" in plan:
+        symptoms = analysis["symptoms"]
+        if not symptoms and "symptoms_of_patient" in results:
+            symptoms = [r["symptom"] for r in results["symptoms_of_patient"]["symptoms"]]
+        results["possible_diseases"] = possible_diseases(symptoms)
+
+    return {intent: results[intent] for intent in plan}
+
+
+def execute_plan(plan: list, analysis: dict) -> dict:
+    """Toutes les lectures du graphe du plan en un aller-retour."""
+    calls = plan_reads(plan, analysis)
+    fetched = get_backend().run_plan(calls) if calls else {}
+    return assemble_plan(plan, analysis, fetched)
+
+
+def run_graph_queries(analysis: dict) -> dict:
+    # One intent: the flat results of execute_graph_queries, as before
+    if len(analysis["intents"]) > 1:
+        return execute_plan(analysis["intents"], analysis)
+    return execute_graph_queries(analysis)
 
-    elif intent == "visits_of_patient":
-        final = f"The patient's visits are: {graph_results.get('visits', [])}"
 
-    elif intent == "observations_of_visit":
-        final = f"The visit observations are: {graph_results.get('observations', [])}"
+# ======================================================
+#                     REASONING LAYER
+# ======================================================
 
-    elif intent == "tests_of_visit":
-        final = f"The visit tests are: {graph_results.get('tests', [])}"
+def build_reasoning(question, analysis, graph_results):
+    intents = analysis.get("intents") or [analysis["intent"]]
+    if len(intents) > 1:
+        final = "\n".join(final_answer(i, graph_results.get(i, {})) for i in intents)
+    else:
+        final = final_answer(analysis["intent"], graph_results)
 
     reasoning = f"""
 Reasoning Summary:
@@ -297,20 +393,85 @@ FINAL ANSWER:
     return reasoning.strip()
 
 
+def final_answer(intent, graph_results):
+    declared = intent_registry.get(intent)
+    if declared is None:
+        return "No matching information found."
+    return declared.answer(graph_results)
+
+
 # ======================================================
 #                     MAIN PIPELINE
 # ======================================================
 
 def process_query(question: str) -> dict:
-    analysis = analyze_with_llm(question)
-    analysis["intent"] = infer_intent(question, analysis)
-
-    graph_results = execute_graph_queries(analysis)
-    reasoning = build_reasoning(question, analysis, graph_results)
+    started = time.perf_counter()
+    with timed("extract"):
+        analysis, extraction = extract_entities(question)
+    with timed("resolve"):
+        corrections = resolve_entities(analysis)
+    with timed("intent"):
+        analysis["intents"] = plan_intents(question, analysis)
+    analysis["intent"] = analysis["intents"][0] if analysis["intents"] else ""
+
+    with timed("graph"):
+        graph_results = run_graph_queries(analysis)
+    with timed("reasoning"):
+        reasoning = build_reasoning(question, analysis, graph_results)
+    observe_question(analysis["intents"], time.perf_counter() - started)
 
     return {
         "question": question,
         "analysis": analysis,
+        "extraction": extraction,
+        "corrections": corrections,
         "graph_results": graph_results,
         "reasoning": reasoning
     }
+
+
+def graph_blocks(analysis: dict, graph_results: dict) -> list:
+    """[(intent, résultats)] : un bloc par intention du plan."""
+    if len(analysis["intents"]) > 1:
+        return list(graph_results.items())
+    return [(analysis["intent"], graph_results)]
+
+
+def stream_query(question: str):
+    """
+    process_query étape par étape : génère (événement, données) dès que
+    chaque étape est prête — extraction, intent, graph_results (un bloc par
+    intention), reasoning, done. elapsed_ms compte depuis le début.
+    """
+    started = time.perf_counter()
+
+    def elapsed():
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    with timed("extract"):
+        analysis, extraction = extract_entities(question)
+    with timed("resolve"):
+        corrections = resolve_entities(analysis)
+    # A copy: the intents added below belong to the next event
+    yield "extraction", {
+        "analysis": dict(analysis),
+        "extraction": extraction,
+        "corrections": corrections,
+        "elapsed_ms": elapsed(),
+    }
+
+    with timed("intent"):
+        analysis["intents"] = plan_intents(question, analysis)
+    analysis["intent"] = analysis["intents"][0] if analysis["intents"] else ""
+    yield "intent", {"intent": analysis["intent"], "intents": analysis["intents"], "elapsed_ms": elapsed()}
+
+    with timed("graph"):
+        graph_results = run_graph_queries(analysis)
+    for intent, results in graph_blocks(analysis, graph_results):
+        yield "graph_results", {"intent": intent, "results": results, "elapsed_ms": elapsed()}
+
+    with timed("reasoning"):
+        reasoning = build_reasoning(question, analysis, graph_results)
+    yield "reasoning", {"reasoning": reasoning, "elapsed_ms": elapsed()}
+    observe_question(analysis["intents"], time.perf_counter() - started)
+    yield "done", {"elapsed_ms": elapsed()}
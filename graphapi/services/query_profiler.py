@@ -0,0 +1,293 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # optional dependency: stdlib json for the byte counts
+    orjson = None
+
+load_dotenv()
+
+
+# ======================================================
+#        CYPHER PROFILER (per statement + slow-query log)
+# ======================================================
+#
+# Every statement run through db.GraphConnection (and the async reads) is
+# measured: wall time, server time (result available + consumed, from the
+# result summary) and rows returned. The bytes returned (size of the rows as
+# JSON) cost a second serialization of every result: only counted with
+# QUERY_PROFILE_BYTES=true. Totals are kept per statement in memory
+# (GET /api/db/queries/, per worker); runs over QUERY_SLOW_MS go to the
+# QUERY_SLOW_LOG file, one JSON line each, with the parameters redacted
+# (strings hidden, numbers kept): patient names never reach the log.
+# Statements matching QUERY_PROFILE_STATEMENTS (fingerprints or text
+# fragments, comma-separated) run under PROFILE and their plan is logged
+# whatever their time. `manage.py query_report` aggregates the log: slow and
+# profiled runs only, not every call.
+# Read from the environment like db.POOL_CONFIG: no Django needed.
+#
+# Every worker appends to the same file, so none of them rotates it: an
+# in-process rotation would rename the file under the others. Rotate it
+# externally (logrotate without copytruncate); each worker reopens the path
+# once the file has been moved.
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+MAX_STATEMENTS = 1000
+MAX_LOGGED_QUERY = 4000
+
+
+def fingerprint(query: str) -> str:
+    """Identifiant court et stable d'une requête (espaces normalisés)."""
+    return hashlib.sha1(" ".join(query.split()).encode()).hexdigest()[:12]
+
+
+def redact(value):
+    if isinstance(value, str):
+        return "<redacted>"
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(v) for v in value[:10]]
+        if len(value) > 10:
+            items.append(f"<+{len(value) - 10} more>")
+        return items
+    return value
+
+
+def payload_size(rows) -> int:
+    if orjson is not None:
+        return len(orjson.dumps(rows, default=str))
+    return len(json.dumps(rows, default=str))
+
+
+def compact_plan(plan) -> dict | None:
+    """Plan PROFILE réduit à l'essentiel : opérateur, lignes, accès base, enfants."""
+    if not plan:
+        return None
+    return {
+        "operator": plan.get("operatorType"),
+        "rows": plan.get("rows"),
+        "db_hits": plan.get("dbHits"),
+        "children": [compact_plan(c) for c in plan.get("children", [])],
+    }
+
+
+class SlowQueryLogHandler(WatchedFileHandler):
+    """
+    Journal en ajout, rouvert quand une rotation externe l'a déplacé ; une
+    écriture ratée est signalée au profiler, pas tracée sur stderr.
+    """
+
+    def __init__(self, path: str, on_error):
+        super().__init__(path, encoding="utf-8", delay=True)
+        self.setFormatter(logging.Formatter("%(message)s"))
+        self.on_error = on_error
+
+    def emit(self, record):
+        # The delayed open and the reopen after a rotation happen outside
+        # logging's own error handling
+        try:
+            super().emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def handleError(self, record):
+        self.on_error(sys.exc_info()[1])
+
+
+class QueryProfiler:
+    def __init__(self, enabled: bool = True, slow_ms: float = 200.0, log_path: str = "", profile=(),
+                 count_bytes: bool = False):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.profile = tuple(p.strip() for p in profile if p.strip())
+        self.count_bytes = count_bytes
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._handler = None
+        self._statements = {}
+        self.log_failures = 0
+
+    # ---------------------------
+    # RUNNING
+    # ---------------------------
+
+    def statement(self, query: str) -> str:
+        """La requête à envoyer : préfixée par PROFILE si elle fait partie des requêtes suivies."""
+        if not (self.enabled and self.profile) or query.lstrip().upper().startswith(("PROFILE", "EXPLAIN")):
+            return query
+        fp = fingerprint(query)
+        if any(p == fp or p in query for p in self.profile):
+            return "PROFILE " + query
+        return query
+
+    def run(self, runner, query: str, params: dict) -> list[dict]:
+        """runner(statement, params) -> résultat neo4j (tx.run / session.run)."""
+        if not self.enabled:
+            return runner(query, params).data()
+        started = time.perf_counter()
+        try:
+            result = runner(self.statement(query), params)
+            rows = result.data()
+            summary = result.consume()
+        except Exception:
+            self.record(query, params, time.perf_counter() - started, error=True)
+            raise
+        self.record(query, params, time.perf_counter() - started, rows, summary=summary)
+        return rows
+
+    def stream(self, runner, query: str, params: dict):
+        if not self.enabled:
+            for record in runner(query, params):
+                yield record.data()
+            return
+        started = time.perf_counter()
+        count = size = 0
+        result = None
+        try:
+            result = runner(self.statement(query), params)
+            for record in result:
+                row = record.data()
+                count += 1
+                if self.count_bytes:
+                    size += payload_size(row)
+                yield row
+            summary = result.consume()
+        except BaseException as exc:  # GeneratorExit too: a stream closed early
+            self.record(query, params, time.perf_counter() - started, rows=count, size=size,
+                        error=isinstance(exc, Exception))
+            raise
+        self.record(query, params, time.perf_counter() - started, rows=count, size=size, summary=summary)
+
+    # ---------------------------
+    # RECORDING
+    # ---------------------------
+
+    def record(self, query: str, params: dict, seconds: float, rows=None, summary=None,
+               size: int | None = None, error: bool = False):
+        if not self.enabled:
+            return
+        if isinstance(rows, list):
+            if size is None and self.count_bytes:
+                size = payload_size(rows)
+            rows = len(rows)
+        rows = rows or 0
+        size = size or 0
+        db_ms = None
+        plan = None
+        if summary is not None:
+            available = getattr(summary, "result_available_after", None)
+            consumed = getattr(summary, "result_consumed_after", None)
+            if available is not None or consumed is not None:
+                db_ms = (available or 0) + (consumed or 0)
+            plan = compact_plan(getattr(summary, "profile", None))
+
+        fp = fingerprint(query)
+        ms = seconds * 1000
+        slow = ms >= self.slow_ms
+        text = " ".join(query.split())[:MAX_LOGGED_QUERY]
+        with self._lock:
+            stats = self._statements.get(fp)
+            if stats is None:
+                key, label = fp, text
+                if len(self._statements) >= MAX_STATEMENTS:
+                    key, label = "other", "(statements beyond MAX_STATEMENTS)"
+                    stats = self._statements.get(key)
+                if stats is None:
+                    stats = self._statements[key] = {
+                        "statement": key,
+                        "query": label,
+                        "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "db_ms": 0.0,
+                        "rows": 0, "bytes": 0, "slow": 0, "errors": 0, "plan": None,
+                    }
+            stats["calls"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["db_ms"] += db_ms or 0
+            stats["rows"] += rows
+            stats["bytes"] += size
+            stats["slow"] += slow
+            stats["errors"] += error
+            if plan is not None:
+                stats["plan"] = plan
+
+        if (slow or plan is not None) and self.log_path:
+            self._log({
+                "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "statement": fp,
+                "query": text,
+                "params": redact(params or {}),
+                "ms": round(ms, 3),
+                "db_ms": db_ms,
+                "rows": rows,
+                "bytes": size,
+                "error": error,
+                "plan": plan,
+            })
+
+    def _log(self, entry: dict):
+        record = logging.makeLogRecord({"msg": json.dumps(entry, default=str, ensure_ascii=False)})
+        with self._log_lock:
+            if self._handler is None or self._handler.baseFilename != os.path.abspath(self.log_path):
+                if self._handler is not None:
+                    self._handler.close()
+                self._handler = SlowQueryLogHandler(self.log_path, self._log_failed)
+            self._handler.handle(record)
+
+    def _log_failed(self, exc):
+        self.log_failures += 1
+        if self.log_failures == 1:
+            print("\n⚠️ SLOW QUERY LOG UNAVAILABLE:", exc)
+
+    # ---------------------------
+    # REPORTING
+    # ---------------------------
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> list[dict]:
+        with self._lock:
+            statements = [dict(s) for s in self._statements.values()]
+        for s in statements:
+            s["mean_ms"] = round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0
+            s["total_ms"] = round(s["total_ms"], 3)
+            s["max_ms"] = round(s["max_ms"], 3)
+        return sorted(statements, key=lambda s: -s[sort])[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "slow_ms": self.slow_ms,
+                "log_path": self.log_path or None,
+                "count_bytes": self.count_bytes,
+                "profiled": list(self.profile),
+                "statements": len(self._statements),
+                "calls": sum(s["calls"] for s in self._statements.values()),
+                "slow": sum(s["slow"] for s in self._statements.values()),
+                "log_failures": self.log_failures,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+
+query_profiler = QueryProfiler(
+    enabled=os.getenv("QUERY_PROFILER", "true").lower() == "true",
+    slow_ms=float(os.getenv("QUERY_SLOW_MS") or 200),
+    log_path=os.getenv("QUERY_SLOW_LOG", str(BASE_DIR / "slow_queries.jsonl")),
+    profile=os.getenv("QUERY_PROFILE_STATEMENTS", "").split(","),
+    count_bytes=os.getenv("QUERY_PROFILE_BYTES", "false").lower() == "true",
+)
@@ -0,0 +1,126 @@
+# ======================================================
+#                 GRAPH SCHEMA (LABELS / RELATIONS)
+# ======================================================
+
+# Property that identifies a node of each label (MERGE key)
+NODE_KEYS = {
+    "Patient": "name",
+    "Visit": "id",
+    "Symptom": "name",
+    "Disease": "name",
+    "Treatment": "name",
+    "Test": "name",
+    "Observation": "name",
+    "RiskFactor": "name",
+}
+
+# Every node also stores key = toLower(trim(<NODE_KEYS property>)) so that
+# case-insensitive lookups are plain index-backed equality on n.key
+KEY_PROPERTY = "key"
+
+# Labels whose key is unique. Observation nodes are merged on all their
+# properties (name + value + unit ...), so several may share a key.
+UNIQUE_LABELS = [label for label in NODE_KEYS if label != "Observation"]
+
+
+def key_expr(value: str) -> str:
+    """Expression Cypher qui calcule la clé normalisée d'une valeur."""
+    return f"toLower(trim(toString({value})))"
+
+
+# Full-text index over the display property of every label (search_graph)
+FULLTEXT_INDEX = "entity_names"
+
+
+# Relationship type -> (start label, end label)
+RELATIONSHIPS = {
+    "HAS_SYMPTOM": ("Patient", "Symptom"),
+    "HAS_RISK_FACTOR": ("Patient", "RiskFactor"),
+    "HAS_VISIT": ("Patient", "Visit"),
+    "HAS_OBSERVATION": ("Visit", "Observation"),
+    "HAS_TEST": ("Visit", "Test"),
+    "INDICATES": ("Symptom", "Disease"),
+    "TREATED_BY": ("Disease", "Treatment"),
+    "USED_FOR_DIAGNOSIS_OF": ("Test", "Disease"),
+    "SUPPORTS": ("Observation", "Disease"),
+}
+
+SCALAR_TYPES = (str, int, float, bool)
+
+
+def is_property_value(value) -> bool:
+    """Valeurs acceptées par Neo4j comme propriété : scalaires ou listes de scalaires."""
+    if value is None or isinstance(value, SCALAR_TYPES):
+        return True
+    if isinstance(value, list):
+        return all(isinstance(v, SCALAR_TYPES) for v in value)
+    return False
+
+
+# ======================================================
+#        CONSTRAINTS / INDEXES / BACKFILL (ensure_schema)
+# ======================================================
+
+def schema_statements() -> list[str]:
+    statements = []
+    for label, prop in NODE_KEYS.items():
+        name = label.lower()
+        if label in UNIQUE_LABELS:
+            statements.append(
+                f"CREATE CONSTRAINT {name}_key_unique IF NOT EXISTS "
+                f"FOR (n:{label}) REQUIRE n.{KEY_PROPERTY} IS UNIQUE"
+            )
+        else:
+            statements.append(
+                f"CREATE INDEX {name}_key IF NOT EXISTS FOR (n:{label}) ON (n.{KEY_PROPERTY})"
+            )
+        # Display property (Patient.name, Visit.id, ...), used by writes that match on it
+        statements.append(
+            f"CREATE INDEX {name}_{prop} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+        )
+    labels = "|".join(NODE_KEYS)
+    props = ", ".join(f"n.{p}" for p in sorted(set(NODE_KEYS.values())))
+    statements.append(
+        f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (n:{labels}) ON EACH [{props}]"
+    )
+    return statements
+
+
+def backfill_keys(graph, batch_size: int = 10000, log=print) -> dict:
+    """
+    Calcule n.key pour les nœuds créés avant l'introduction de la clé.
+    Travaille par lots pour ne pas construire une énorme transaction.
+    """
+    updated = {}
+    for label, prop in NODE_KEYS.items():
+        query = f"""
+        MATCH (n:{label})
+        WHERE n.{KEY_PROPERTY} IS NULL AND n.{prop} IS NOT NULL
+        WITH n LIMIT $batch_size
+        SET n.{KEY_PROPERTY} = {key_expr(f"n.{prop}")}
+        RETURN count(n) AS updated
+        """
+        total = 0
+        while True:
+            count = graph.write(query, batch_size=batch_size)[0]["updated"]
+            total += count
+            if count < batch_size:
+                break
+        updated[label] = total
+        if total:
+            log(f"{label}: {total} keys backfilled")
+    return updated
+
+
+def duplicate_keys(graph, label: str, limit: int = 20) -> list[dict]:
+    """Clés portées par plusieurs nœuds : elles empêchent la contrainte d'unicité."""
+    query = f"""
+    MATCH (n:{label})
+    WHERE n.{KEY_PROPERTY} IS NOT NULL
+    WITH n.{KEY_PROPERTY} AS key, count(*) AS nodes
+    WHERE nodes > 1
+    RETURN key, nodes
+    ORDER BY nodes DESC
+    LIMIT $limit
+    """
+    return graph.read(query, limit=limit)
@@ -0,0 +1,191 @@
+import importlib
+import sys
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+# ======================================================
+#          STARTUP TIMING (imports, warm-up, 1st request)
+# ======================================================
+#
+# Imported from GraphapiConfig, i.e. while Django loads its apps: every
+# time below is measured from that point, not from the process fork.
+
+STARTED = time.perf_counter()
+
+# Import order matters: each module is timed with the dependencies that
+# were not already imported by the ones before it
+PRELOAD_MODULES = [
+    "graphapi.services.db",
+    "graphapi.services.metrics",
+    "graphapi.services.cache",
+    "graphapi.services.backends.neo4j",
+    "graphapi.services.backends.memory",
+    "graphapi.services.graph_read",
+    "graphapi.services.graph_write",
+    "graphapi.services.entity_matcher",
+    "graphapi.services.entity_resolver",
+    "graphapi.services.diagnosis",
+    "graphapi.services.extraction_cache",
+    "graphapi.services.llm_gateway",
+    "graphapi.services.query_engine",
+    "graphapi.services.async_query_engine",
+    "graphapi.services.query_batch",
+    "graphapi.views",
+    "kgbackend.urls",
+]
+
+
+class StartupReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.imports = {}
+        self.ready_seconds = None
+        self.warmup = {}
+        self.warmup_seconds = None
+        self.first_request = None
+
+    def elapsed(self) -> float:
+        return round(time.perf_counter() - STARTED, 4)
+
+    def timed_import(self, name: str):
+        if name in sys.modules:
+            self.imports.setdefault(name, 0.0)
+            return sys.modules[name]
+        t = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports[name] = round(time.perf_counter() - t, 4)
+        return module
+
+    def record_step(self, name: str, func):
+        t = time.perf_counter()
+        try:
+            func()
+            outcome = {"seconds": round(time.perf_counter() - t, 4)}
+        except Exception as exc:
+            print(f"\n⚠️ WARM-UP STEP '{name}' FAILED:", exc)
+            outcome = {"seconds": round(time.perf_counter() - t, 4), "error": str(exc)}
+        with self._lock:
+            self.warmup[name] = outcome
+
+    def record_first_request(self, path: str, seconds: float):
+        with self._lock:
+            if self.first_request is None:
+                self.first_request = {
+                    "path": path,
+                    "latency": round(seconds, 4),
+                    "since_start": self.elapsed(),
+                }
+
+    def as_dict(self) -> dict:
+        budget = getattr(settings, "STARTUP_BUDGET_SECONDS", 0)
+        with self._lock:
+            return {
+                "uptime": self.elapsed(),
+                "ready_seconds": self.ready_seconds,
+                "budget_seconds": budget or None,
+                "over_budget": bool(budget and self.ready_seconds and self.ready_seconds > budget),
+                "imports": dict(self.imports),
+                "warmup": dict(self.warmup),
+                "warmup_seconds": self.warmup_seconds,
+                "first_request": self.first_request,
+            }
+
+
+startup_report = StartupReport()
+
+
+# ---------------------------
+# BOOT / WARM-UP
+# ---------------------------
+
+def boot():
+    """
+    Appelé par kgbackend/wsgi.py et asgi.py (runserver, gunicorn, uvicorn...) :
+    les commandes manage.py ne paient ni le préchargement ni le warm-up.
+    """
+    if getattr(settings, "STARTUP_PRELOAD", True):
+        preload()
+    if getattr(settings, "GRAPH_WARMUP", False):
+        start_warm_up()
+
+
+def preload():
+    """Importe les modules du service (sans réseau) pour sortir ce coût de la 1re requête."""
+    for name in PRELOAD_MODULES:
+        startup_report.timed_import(name)
+    startup_report.ready_seconds = startup_report.elapsed()
+
+    budget = getattr(settings, "STARTUP_BUDGET_SECONDS", 0)
+    if budget and startup_report.ready_seconds > budget:
+        slowest = sorted(startup_report.imports.items(), key=lambda kv: -kv[1])[:3]
+        print(
+            f"\n⚠️ STARTUP OVER BUDGET: {startup_report.ready_seconds:.2f}s > {budget}s "
+            f"(slowest imports: {slowest})"
+        )
+
+
+def warm_up():
+    """Ouvre les connexions et charge les vocabulaires ; chaque étape peut échouer seule."""
+    from kgbackend.llm_config import get_client
+    from graphapi.services.backends import get_backend
+    from graphapi.services.entity_matcher import entity_matcher
+    from graphapi.services.diagnosis import diagnosis_ranker
+    from graphapi.services.entity_resolver import entity_resolver
+    from graphapi.services.extraction_cache import extraction_cache
+
+    t = time.perf_counter()
+    if getattr(settings, "GRAPH_BACKEND", "neo4j") == "neo4j":
+        startup_report.record_step("neo4j", lambda: get_backend().graph.driver.verify_connectivity())
+    else:
+        # Embedded graph: loading the snapshot is the expensive part
+        startup_report.record_step("graph_snapshot", get_backend)
+    startup_report.record_step("vocabularies", entity_matcher.warm_up)
+    startup_report.record_step("name_index", entity_resolver.warm_up)
+    startup_report.record_step("diagnosis_matrix", diagnosis_ranker.warm_up)
+    startup_report.record_step("extraction_cache", extraction_cache.stats)
+    startup_report.record_step("groq", get_client)
+    startup_report.warmup_seconds = round(time.perf_counter() - t, 4)
+
+
+def start_warm_up() -> threading.Thread:
+    # Background thread: the worker accepts requests while it runs
+    thread = threading.Thread(target=warm_up, name="graphapi-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+class FirstRequestTimingMiddleware:
+    """Mesure la latence de la première requête servie par le processus."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.seen = False
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.seen:
+            return self.get_response(request)
+        self.seen = True
+        t = time.perf_counter()
+        response = self.get_response(request)
+        startup_report.record_first_request(request.path, time.perf_counter() - t)
+        return response
+
+    async def __acall__(self, request):
+        if self.seen:
+            return await self.get_response(request)
+        self.seen = True
+        t = time.perf_counter()
+        response = await self.get_response(request)
+        startup_report.record_first_request(request.path, time.perf_counter() - t)
+        return response
@@ -0,0 +1,118 @@
+import hashlib
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from graphapi.services.cache import GLOBAL_TAG, entity_tag, label_tag
+
+
+# ======================================================
+#        GRAPH VERSION COUNTERS (ETag / If-None-Match)
+# ======================================================
+#
+# Counters live in the Django database (GraphVersion), so every worker and
+# host sees the same values. The scopes reuse the read cache tags:
+#   "Patient:omar"  -> bumped when that patient is written
+#   "Patient:*"     -> bumped by any Patient write (list endpoints)
+#   "Patient:#"     -> bumped by label-wide writes (bulk), which do not say
+#                      which entities changed
+#   "*"             -> bumped by every write (search)
+#
+# A GET on one entity depends on its own counter and on the label epoch only,
+# so writing another patient does not change Omar's ETag.
+
+MAX_SCOPE_LENGTH = 255
+
+
+def epoch_tag(label: str) -> str:
+    return f"{label}:#"
+
+
+def _scope_id(scope: str) -> str:
+    if len(scope) <= MAX_SCOPE_LENGTH:
+        return scope
+    digest = hashlib.sha1(scope.encode("utf-8")).hexdigest()
+    return scope[:MAX_SCOPE_LENGTH - 41] + "~" + digest
+
+
+def write_scopes(label: str, name=None) -> list[str]:
+    """Portées à incrémenter après une écriture sur (label, name) ; sans name : tout le label."""
+    if name is None:
+        return [label_tag(label), epoch_tag(label), GLOBAL_TAG]
+    return [entity_tag(label, name), label_tag(label), GLOBAL_TAG]
+
+
+def entity_scopes(label: str, name) -> list[str]:
+    """Portées dont dépend une lecture centrée sur une entité."""
+    return [entity_tag(label, name), epoch_tag(label)]
+
+
+def _table_missing() -> bool:
+    # Migrations not applied yet (fresh checkout, manage.py commands): the
+    # counters are simply not there, which is not worth a warning
+    from graphapi.models import GraphVersion
+
+    try:
+        return GraphVersion._meta.db_table not in connection.introspection.table_names()
+    except DatabaseError:
+        return False
+
+
+def bump(scopes):
+    """Incrémente les compteurs (créés à 0 au besoin) dans une seule transaction."""
+    scopes = sorted({_scope_id(s) for s in scopes})
+    if not scopes:
+        return
+    from graphapi.models import GraphVersion
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            GraphVersion.objects.bulk_create(
+                [GraphVersion(scope=s, version=0, updated_at=now) for s in scopes],
+                ignore_conflicts=True,
+            )
+            GraphVersion.objects.filter(scope__in=scopes).update(version=F("version") + 1, updated_at=now)
+    except DatabaseError as exc:
+        # The graph write already happened: report, do not fail the request
+        if not _table_missing():
+            print("\n⚠️ GRAPH VERSION BUMP FAILED:", exc)
+
+
+def current(scopes) -> tuple[dict, object]:
+    """({scope: version}, dernière modification) ; une portée jamais écrite vaut 0."""
+    from graphapi.models import GraphVersion
+
+    ids = {_scope_id(s): s for s in scopes}
+    versions = {s: 0 for s in scopes}
+    last_modified = None
+    for scope, version, updated_at in GraphVersion.objects.filter(scope__in=list(ids)).values_list(
+        "scope", "version", "updated_at"
+    ):
+        versions[ids[scope]] = version
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def conditional_state(scopes, *parts) -> tuple[str | None, object, tuple | None]:
+    """
+    (ETag, Last-Modified, stamp) d'une réponse qui dépend de ces portées.
+    parts : ce qui distingue les réponses d'une même URL (chemin complet, Accept...).
+    stamp : les versions lues, pour épingler le cache de lecture (ReadCache.pinned).
+    """
+    if not getattr(settings, "GRAPH_ETAGS", True):
+        return None, None, None
+    try:
+        versions, last_modified = current(scopes)
+    except DatabaseError as exc:
+        # No ETag for this response: the GET is served normally
+        if not _table_missing():
+            print("\n⚠️ GRAPH VERSION READ FAILED:", exc)
+        return None, None, None
+    stamp = tuple(sorted(versions.items()))
+    raw = "\0".join([*map(str, parts), *(f"{s}={v}" for s, v in stamp)])
+    etag = '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+    return etag, last_modified, stamp
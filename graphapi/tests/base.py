@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from graphapi.services.backends import set_backend
+from graphapi.services.backends.memory import MemoryGraph
+from graphapi.services.cache import read_cache
+from graphapi.services.diagnosis import diagnosis_ranker
+from graphapi.services.entity_matcher import entity_matcher
+from graphapi.services.entity_resolver import entity_resolver
+from graphapi.services.extraction_cache import extraction_cache
+from graphapi.services.query_profiler import query_profiler
+
+
+# ======================================================
+#        TESTS AGAINST THE EMBEDDED GRAPH (memory)
+# ======================================================
+#
+# Every test gets an empty MemoryGraph, an empty read cache and stale
+# in-process indexes (rebuilt on the test's thread); nothing touches Neo4j,
+# Groq or the files written by the extraction cache and the slow-query log.
+
+@override_settings(GRAPH_BACKEND="memory", GRAPH_SNAPSHOT_PATH="", GRAPH_ETAGS=True)
+class GraphTestCase(TestCase):
+    def setUp(self):
+        self.graph = MemoryGraph()
+        self.graph.snapshot_path = ""
+        previous = set_backend(self.graph)
+        self.addCleanup(set_backend, previous)
+
+        read_cache.clear()
+        for index in (entity_matcher, entity_resolver, diagnosis_ranker):
+            index.mark_stale()
+
+        for target, attribute, value in (
+            (entity_matcher, "background", False),
+            (extraction_cache, "path", ""),
+            (query_profiler, "log_path", ""),
+        ):
+            patcher = mock.patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def no_llm(self):
+        """Échoue si le pipeline appelle le LLM (le matcher doit suffire)."""
+        from graphapi.services.llm_gateway import llm_gateway
+
+        patcher = mock.patch.object(llm_gateway, "complete", side_effect=AssertionError("LLM called"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from graphapi.services import graph_read, graph_write
+from graphapi.services.cache import read_cache
+from graphapi.services.extraction_cache import ExtractionCache
+from graphapi.services.llm_gateway import llm_gateway
+from graphapi.services.query_engine import parse_llm_extraction, process_query, validate_extraction
+from graphapi.tests.base import GraphTestCase
+
+
+# ======================================================
+#                  READ-THROUGH CACHE
+# ======================================================
+
+class ReadCacheTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu")
+
+    def count_reads(self, method):
+        return mock.patch.object(self.graph, method, wraps=getattr(self.graph, method))
+
+    def test_second_read_is_served_from_the_cache(self):
+        with self.count_reads("diseases_for_symptom") as read:
+            self.assertEqual(graph_read.diseases_for_symptom("fever"), ["flu"])
+            self.assertEqual(graph_read.diseases_for_symptom(" Fever "), ["flu"])
+        self.assertEqual(read.call_count, 1)
+
+    def test_write_invalidates_the_entity(self):
+        graph_read.diseases_for_symptom("fever")
+        graph_write.symptom_indicates_disease("fever", "measles")
+        self.assertEqual(sorted(graph_read.diseases_for_symptom("fever")), ["flu", "measles"])
+
+    def test_write_to_another_entity_keeps_the_entry(self):
+        graph_read.diseases_for_symptom("fever")
+        with self.count_reads("diseases_for_symptom") as read:
+            graph_write.create_patient("Omar", age=40)
+            graph_read.diseases_for_symptom("fever")
+        read.assert_not_called()
+
+    def test_label_wide_read_is_invalidated_by_any_write_to_the_label(self):
+        self.assertEqual(graph_read.all_symptoms(), ["fever"])
+        graph_write.symptom_indicates_disease("cough", "flu")
+        self.assertEqual(sorted(graph_read.all_symptoms()), ["cough", "fever"])
+
+    def test_pinned_reads_only_use_entries_of_the_same_versions(self):
+        with read_cache.pinned((("Symptom:fever", 1),)):
+            graph_read.diseases_for_symptom("fever")
+        with self.count_reads("diseases_for_symptom") as read:
+            with read_cache.pinned((("Symptom:fever", 1),)):
+                graph_read.diseases_for_symptom("fever")
+            read.assert_not_called()
+            with read_cache.pinned((("Symptom:fever", 2),)):
+                graph_read.diseases_for_symptom("fever")
+            read.assert_called_once()
+        self.assertEqual(read_cache.stats()["outdated"], 1)
+
+    def test_callers_get_their_own_copy(self):
+        graph_read.diseases_for_symptom("fever").append("mutated")
+        self.assertEqual(graph_read.diseases_for_symptom("fever"), ["flu"])
+
+    def test_positional_and_keyword_calls_share_an_entry(self):
+        for i in range(3):
+            graph_write.create_patient(f"p{i}")
+        graph_read.list_patients(2)
+        with self.count_reads("patients") as read:
+            graph_read.list_patients(limit=2, cursor=None)
+        read.assert_not_called()
+
+    def test_cursor_values_keep_their_case(self):
+        graph_write.create_patient("Alice")
+        graph_write.create_patient("bob")
+        graph_read.list_patients(10, {"key": "A", "id": ""})
+        with self.count_reads("patients") as read:
+            graph_read.list_patients(10, {"key": "a", "id": ""})
+        read.assert_called_once()
+
+    def test_stats_count_hits_and_misses(self):
+        graph_read.diseases_for_symptom("fever")
+        graph_read.diseases_for_symptom("fever")
+        stats = read_cache.stats()
+        self.assertGreaterEqual(stats["hits"], 1)
+        self.assertGreaterEqual(stats["misses"], 1)
+
+
+# ======================================================
+#            LLM EXTRACTION CACHE (SQLITE)
+# ======================================================
+
+class ExtractionCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "extractions.sqlite3")
+
+    def cache(self, **kwargs):
+        return ExtractionCache(self.path, **kwargs)
+
+    def test_lookup_is_normalized(self):
+        cache = self.cache()
+        cache.set("What causes Fever?", "m", "1", {"symptoms": ["fever"]})
+        self.assertEqual(cache.get("what causes fever", "m", "1"), {"symptoms": ["fever"]})
+        self.assertIsNone(cache.get("what causes fever", "m", "2"))
+
+    def test_access_times_are_written_in_batches(self):
+        cache = self.cache()
+        cache.set("q", "m", "1", {})
+        for _ in range(3):
+            cache.get("q", "m", "1")
+        self.assertEqual(cache.stats()["pending_touches"], 1)
+        self.assertEqual(cache.stats()["total_hits"], 0)
+        cache.flush()
+        self.assertEqual(cache.stats()["pending_touches"], 0)
+        self.assertEqual(cache.stats()["total_hits"], 3)
+
+    def test_eviction_keeps_the_recently_used_entries(self):
+        cache = self.cache(max_entries=10)
+        cache.set("hot", "m", "1", {})
+        for i in range(9):
+            cache.set(f"cold {i}", "m", "1", {})
+        time.sleep(0.01)
+        cache.get("hot", "m", "1")
+        for i in range(9, 14):
+            cache.set(f"cold {i}", "m", "1", {})
+
+        self.assertLessEqual(cache.stats()["entries"], 10)
+        self.assertGreater(cache.evictions, 0)
+        self.assertIsNotNone(cache.get("hot", "m", "1"))
+        self.assertIsNone(cache.get("cold 0", "m", "1"))
+
+    def test_disabled_without_a_path(self):
+        cache = ExtractionCache("")
+        cache.set("q", "m", "1", {})
+        self.assertIsNone(cache.get("q", "m", "1"))
+
+
+class ValidateExtractionTests(SimpleTestCase):
+    def test_missing_slots_become_empty_lists(self):
+        data = validate_extraction({"intent": "x", "symptoms": [" fever ", ""], "diseases": "flu"})
+        self.assertEqual(data["intent"], "")
+        self.assertEqual(data["symptoms"], ["fever"])
+        self.assertEqual(data["diseases"], ["flu"])
+        self.assertEqual(data["visits"], [])
+
+    def test_malformed_values_are_rejected(self):
+        for data in ([], {"symptoms": [1]}, {"tests": {"a": 1}}):
+            with self.assertRaises(ValueError):
+                validate_extraction(data)
+
+    def test_only_valid_answers_are_cached(self):
+        with mock.patch("graphapi.services.query_engine.extraction_cache") as cache:
+            empty = parse_llm_extraction("q", '{"symptoms": [42]}')
+            cache.set.assert_not_called()
+            parse_llm_extraction("q", '{"symptoms": ["fever"]}')
+            cache.set.assert_called_once()
+        self.assertEqual(empty["symptoms"], [])
+
+
+class InvalidLLMAnswerTests(GraphTestCase):
+    def test_question_gets_an_empty_analysis(self):
+        message = SimpleNamespace(content='{"symptoms": 3}')
+        answer = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        with mock.patch.object(llm_gateway, "complete", return_value=answer):
+            result = process_query("Something unrelated entirely?")
+        self.assertEqual(result["analysis"]["intents"], [])
+        self.assertEqual(result["graph_results"], {})
@@ -0,0 +1,269 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from graphapi.management.commands import ensure_schema, import_graph
+from graphapi.services import graph_read
+from graphapi.services.query_profiler import QueryProfiler, fingerprint, redact
+from graphapi.services.schema import schema_statements
+from graphapi.tests.base import GraphTestCase
+
+
+class CommandTestCase(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def write(self, name: str, lines) -> str:
+        path = self.path(name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def call(self, *args, **options):
+        out = StringIO()
+        call_command(*args, stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+
+# ======================================================
+#                   import_graph
+# ======================================================
+
+class ImportGraphTests(CommandTestCase):
+    def ndjson(self, patients: int):
+        rows = [json.dumps({"label": "Patient", "props": {"name": f"p{i:02d}"}}) for i in range(patients)]
+        return self.write("export.ndjson", rows)
+
+    def test_rows_are_written_and_rejects_reported(self):
+        path = self.write("export.ndjson", [
+            json.dumps({"label": "Patient", "props": {"name": "Omar"}}),
+            "not json",
+            json.dumps({"type": "HAS_SYMPTOM", "from": "Omar", "to": "fever"}),
+            json.dumps({"label": "Alien", "props": {"name": "x"}}),
+        ])
+        self.call("import_graph", path, errors=self.path("rejected.ndjson"), workers=1)
+
+        self.assertEqual(graph_read.patient_symptoms("Omar")[0]["symptom"], "fever")
+        with open(self.path("rejected.ndjson"), encoding="utf-8") as f:
+            rejected = [json.loads(line) for line in f]
+        self.assertEqual([r["row"] for r in rejected], [1, 3])
+        with open(path + ".checkpoint", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        self.assertEqual((checkpoint["rows_done"], checkpoint["written"], checkpoint["failed"]), (4, 2, 2))
+
+    def test_import_resumes_after_a_crash(self):
+        path = self.ndjson(10)
+        write_batch = import_graph.write_batch
+        calls = []
+
+        def crash_on_third_batch(rows, dry_run=False):
+            calls.append(len(calls))
+            if len(calls) == 3:
+                raise RuntimeError("connection lost")
+            return write_batch(rows, dry_run)
+
+        with mock.patch.object(import_graph, "write_batch", crash_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                self.call("import_graph", path, batch_size=3, workers=1)
+        with open(path + ".checkpoint", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["rows_done"], 6)
+
+        with mock.patch.object(import_graph, "write_batch", wraps=write_batch) as resumed:
+            out = self.call("import_graph", path, batch_size=3, workers=1)
+        self.assertIn("Resuming after 6 rows", out)
+        self.assertEqual([len(c.args[0]) for c in resumed.call_args_list], [3, 1])
+        self.assertEqual(len(graph_read.all_patients()), 10)
+
+    def test_checkpoint_of_another_file_is_refused(self):
+        path = self.ndjson(2)
+        with open(path + ".checkpoint", "w", encoding="utf-8") as f:
+            json.dump({"source": "/elsewhere.ndjson", "rows_done": 1}, f)
+        with self.assertRaises(CommandError):
+            self.call("import_graph", path)
+        self.call("import_graph", path, restart=True)
+        self.assertEqual(len(graph_read.all_patients()), 2)
+
+    def test_csv_rows_keep_identifiers_as_strings(self):
+        path = self.write("patients.csv", ["name,age", "007,40", "Omar,"])
+        self.call("import_graph", path, label="Patient")
+        self.assertEqual(graph_read.get_patient("007")[0]["age"], 40)
+        self.assertIsNone(graph_read.get_patient("omar")[0]["age"])
+
+    def test_csv_needs_a_label_or_a_type(self):
+        path = self.write("rows.csv", ["name", "Omar"])
+        with self.assertRaises(CommandError):
+            self.call("import_graph", path)
+
+
+# ======================================================
+#                   ensure_schema
+# ======================================================
+
+class StubGraph:
+    """Enregistre les requêtes ; répond aux backfills et aux doublons."""
+
+    def __init__(self, backfilled=None, duplicates=None, failing=""):
+        self.backfilled = {label: list(counts) for label, counts in (backfilled or {}).items()}
+        self.duplicates = duplicates or {}
+        self.failing = failing
+        self.statements = []
+        self.writes = []
+
+    def auto_commit(self, statement):
+        if self.failing and self.failing in statement:
+            raise RuntimeError("unsupported")
+        self.statements.append(statement)
+
+    def write(self, query, **params):
+        label = query.split("MATCH (n:", 1)[1].split(")", 1)[0]
+        self.writes.append(label)
+        counts = self.backfilled.get(label)
+        return [{"updated": counts.pop(0) if counts else 0}]
+
+    def read(self, query, **params):
+        label = query.split("MATCH (n:", 1)[1].split(")", 1)[0]
+        return self.duplicates.get(label, [])
+
+
+@override_settings(GRAPH_BACKEND="neo4j")
+class EnsureSchemaTests(CommandTestCase):
+    def run_with(self, graph, **options):
+        out, err = StringIO(), StringIO()
+        with mock.patch.object(ensure_schema, "get_graph", return_value=graph):
+            call_command("ensure_schema", stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_every_statement_is_applied(self):
+        graph = StubGraph()
+        out, err = self.run_with(graph)
+        self.assertEqual(graph.statements, schema_statements())
+        self.assertIn("Schema is up to date", out)
+        self.assertEqual(err, "")
+
+    def test_backfill_runs_in_batches_until_a_short_one(self):
+        graph = StubGraph(backfilled={"Patient": [2, 2, 1]})
+        out, _ = self.run_with(graph, backfill=True, batch_size=2)
+        self.assertEqual(graph.writes.count("Patient"), 3)
+        self.assertEqual(graph.writes.count("Disease"), 1)
+        self.assertIn("Patient: 5 keys backfilled", out)
+
+    def test_failed_statements_and_duplicates_are_reported(self):
+        graph = StubGraph(
+            duplicates={"Symptom": [{"key": "fever", "nodes": 2}]},
+            failing="FULLTEXT",
+        )
+        _, err = self.run_with(graph)
+        self.assertIn("ERR CREATE FULLTEXT INDEX", err)
+        self.assertIn("Symptom: duplicate keys must be merged first: 'fever' x2", err)
+        self.assertIn("Schema partially applied (2 problems)", err)
+
+    def test_dry_run_only_prints(self):
+        graph = StubGraph()
+        out, _ = self.run_with(graph, dry_run=True)
+        self.assertEqual(graph.statements, [])
+        self.assertEqual(out.splitlines(), [s + ";" for s in schema_statements()])
+
+    @override_settings(GRAPH_BACKEND="memory")
+    def test_embedded_backend_is_refused(self):
+        with self.assertRaises(CommandError):
+            self.run_with(StubGraph())
+
+
+# ======================================================
+#          SLOW-QUERY LOG / query_report
+# ======================================================
+
+SLOW_QUERY = "MATCH (p:Patient {key: $name}) RETURN p"
+FAST_QUERY = "MATCH (s:Symptom) RETURN s.name AS name"
+
+
+class QueryProfilerTests(CommandTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = self.path("slow.jsonl")
+        self.profiler = QueryProfiler(slow_ms=100, log_path=self.log)
+
+    def entries(self, path=None):
+        with open(path or self.log, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_parameters_are_redacted(self):
+        self.assertEqual(
+            redact({"name": "Omar", "limit": 10, "names": ["a"] * 12}),
+            {"name": "<redacted>", "limit": 10, "names": ["<redacted>"] * 10 + ["<+2 more>"]},
+        )
+
+    def test_only_slow_runs_are_logged(self):
+        self.profiler.record(SLOW_QUERY, {"name": "Omar"}, 0.25, rows=[{"p": 1}])
+        self.profiler.record(FAST_QUERY, {}, 0.002, rows=[])
+        [entry] = self.entries()
+        self.assertEqual(entry["statement"], fingerprint(SLOW_QUERY))
+        self.assertEqual((entry["ms"], entry["rows"]), (250.0, 1))
+        self.assertEqual(entry["params"], {"name": "<redacted>"})
+        self.assertNotIn("Omar", open(self.log, encoding="utf-8").read())
+        # Every call still counts in the in-memory totals
+        self.assertEqual(self.profiler.stats()["calls"], 2)
+
+    def test_log_is_reopened_after_an_external_rotation(self):
+        self.profiler.record(SLOW_QUERY, {}, 0.2)
+        os.rename(self.log, self.log + ".1")
+        self.profiler.record(SLOW_QUERY, {}, 0.3)
+        self.assertEqual([e["ms"] for e in self.entries(self.log + ".1")], [200.0])
+        self.assertEqual([e["ms"] for e in self.entries()], [300.0])
+
+    def test_unwritable_log_is_counted_not_raised(self):
+        self.profiler.log_path = self.path("missing/slow.jsonl")
+        with mock.patch("builtins.print"):
+            self.profiler.record(SLOW_QUERY, {}, 0.2)
+        self.assertEqual(self.profiler.stats()["log_failures"], 1)
+
+
+class QueryReportTests(CommandTestCase):
+    def entry(self, query, ms, ts="2026-10-01T10:00:00.000+00:00", **extra):
+        return json.dumps({"ts": ts, "statement": fingerprint(query), "query": query, "ms": ms, "rows": 1, **extra})
+
+    def report(self, *args, **options):
+        return json.loads(self.call("query_report", self.log, *args, json=True, **options))
+
+    def setUp(self):
+        super().setUp()
+        self.log = self.write("slow.jsonl", [self.entry(SLOW_QUERY, 300), "not json"])
+        self.write("slow.jsonl.1", [self.entry(SLOW_QUERY, 100), self.entry(FAST_QUERY, 250)])
+        with gzip.open(self.log + ".2.gz", "wt", encoding="utf-8") as f:
+            f.write(self.entry(SLOW_QUERY, 200, ts="2026-09-01T10:00:00.000+00:00") + "\n")
+
+    def test_live_and_rotated_copies_are_aggregated(self):
+        report = self.report()
+        self.assertEqual((report["runs"], report["skipped"]), (4, 1))
+        top = report["statements"][0]
+        self.assertEqual(top["statement"], fingerprint(SLOW_QUERY))
+        self.assertEqual((top["calls"], top["total_ms"], top["max_ms"]), (3, 600.0, 300.0))
+        self.assertEqual(top["first"], "2026-09-01T10:00:00.000+00:00")
+
+    def test_sort_and_since(self):
+        report = self.report(sort="mean_ms", since="2026-10-01")
+        self.assertEqual(
+            [(s["statement"], s["mean_ms"]) for s in report["statements"]],
+            [(fingerprint(FAST_QUERY), 250.0), (fingerprint(SLOW_QUERY), 200.0)],
+        )
+
+    def test_text_report_says_it_covers_logged_runs(self):
+        out = self.call("query_report", self.log, top=1)
+        self.assertIn("4 logged runs (slow or profiled only)", out)
+        self.assertIn("1 unreadable lines skipped", out)
+
+    def test_missing_log(self):
+        with self.assertRaises(CommandError):
+            self.call("query_report", self.path("nowhere.jsonl"))
@@ -0,0 +1,238 @@
+import os
+import tempfile
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+
+from graphapi.services import diagnosis, graph_read, graph_write
+from graphapi.services.backends import set_backend
+from graphapi.services.backends.memory import MemoryGraph
+from graphapi.services.cache import read_cache
+from graphapi.services.diagnosis import DiagnosisRanker, diagnosis_ranker
+from graphapi.services.pagination import decode_cursor, encode_cursor
+from graphapi.tests.base import GraphTestCase
+
+
+# ======================================================
+#              READS ON THE EMBEDDED GRAPH
+# ======================================================
+
+class GraphReadTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu")
+        graph_write.symptom_indicates_disease("cough", "flu")
+        graph_write.symptom_indicates_disease("fever", "malaria")
+        graph_write.create_patient("Omar", age=40)
+        graph_write.patient_add_symptom("Omar", "fever", severity="high")
+
+    def test_entity_reads(self):
+        self.assertEqual(sorted(graph_read.diseases_for_symptom("FEVER")), ["flu", "malaria"])
+        self.assertEqual(sorted(graph_read.symptoms_for_disease("flu")), ["cough", "fever"])
+        self.assertEqual(graph_read.get_patient("omar")[0]["age"], 40)
+        self.assertEqual(graph_read.patient_symptoms("Omar")[0]["symptom"], "fever")
+
+    def test_batched_lookup_counts_matched_symptoms(self):
+        rows = {r["disease"]: r for r in graph_read.diseases_for_symptoms(["fever", "Cough", "rash"])}
+        self.assertEqual(sorted(rows), ["flu", "malaria"])
+        self.assertEqual(rows["flu"]["match_count"], 2)
+        self.assertEqual(rows["malaria"]["matched"], ["fever"])
+
+    def test_batched_lookup_is_one_backend_call(self):
+        with mock.patch.object(self.graph, "diseases_for_symptoms", wraps=self.graph.diseases_for_symptoms) as read:
+            graph_read.diseases_for_symptoms(["fever", "cough"])
+            graph_read.diseases_for_symptoms(["cough", "fever"])
+        read.assert_called_once()
+
+    def test_fulltext_search(self):
+        page = graph_read.search_graph("flu")
+        self.assertEqual([r["name"] for r in page["results"]], ["flu"])
+        self.assertEqual(page["results"][0]["labels"], ["Disease"])
+
+    def test_prefix_search_pages_with_a_cursor(self):
+        graph_write.symptom_indicates_disease("malaise", "flu")
+        first = graph_read.search_graph("mal", limit=1, mode="prefix")
+        second = graph_read.search_graph("mal", limit=1, cursor=first["next"], mode="prefix")
+        names = [r["name"] for r in first["results"] + second["results"]]
+        self.assertEqual(sorted(names), ["malaise", "malaria"])
+        self.assertIsNone(second["next"])
+
+    def test_search_restricted_to_labels(self):
+        self.assertEqual(graph_read.search_graph("fever", labels=("Disease",))["results"], [])
+
+
+class KeysetPaginationTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("Dina", "alice", "Bob", "carl", "Eve"):
+            graph_write.create_patient(name)
+
+    def test_pages_walk_every_row_once_in_key_order(self):
+        names, cursor = [], None
+        while True:
+            page = graph_read.list_patients(limit=2, cursor=cursor)
+            names.extend(r["name"] for r in page["results"])
+            cursor = page["next"]
+            if cursor is None:
+                break
+        self.assertEqual(names, ["alice", "Bob", "carl", "Dina", "Eve"])
+
+    def test_rows_do_not_expose_the_sort_key(self):
+        page = graph_read.list_patients(limit=2)
+        self.assertNotIn("_key", page["results"][0])
+
+    def test_cursor_round_trip(self):
+        position = {"key": "bob", "id": "4:x:1"}
+        self.assertEqual(decode_cursor(encode_cursor(position)), position)
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor")
+
+
+class SnapshotTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "graph.snapshot")
+        graph_write.symptom_indicates_disease("fever", "flu")
+        graph_write.create_patient("Omar", age=40)
+        graph_write.patient_add_symptom("Omar", "Fever", severity="high")
+
+    def reload(self) -> MemoryGraph:
+        self.graph.save(self.path)
+        loaded = MemoryGraph.load(self.path)
+        set_backend(loaded)
+        read_cache.clear()
+        return loaded
+
+    def test_saved_graph_reads_the_same(self):
+        loaded = self.reload()
+        self.assertEqual(graph_read.diseases_for_symptom("fever"), ["flu"])
+        self.assertEqual(graph_read.get_patient("omar")[0]["age"], 40)
+        symptom = graph_read.patient_symptoms("Omar")[0]
+        self.assertEqual((symptom["symptom"], symptom["severity"]), ("fever", "high"))
+        self.assertEqual(graph_read.search_graph("flu")["results"][0]["name"], "flu")
+        self.assertFalse(loaded.metrics()["unsaved_changes"])
+        self.assertEqual(loaded.metrics()["snapshot_path"], self.path)
+
+    def test_loaded_graph_accepts_writes(self):
+        loaded = self.reload()
+        graph_write.symptom_indicates_disease("fever", "malaria")
+        graph_write.create_patient("Dina")
+        self.assertEqual(sorted(graph_read.diseases_for_symptom("fever")), ["flu", "malaria"])
+        self.assertEqual(len(graph_read.all_patients()), 2)
+        self.assertTrue(loaded.metrics()["unsaved_changes"])
+
+    def test_save_needs_a_path(self):
+        with self.assertRaises(ValueError):
+            self.graph.save()
+        self.assertFalse(os.path.exists(self.path))
+
+
+# ======================================================
+#                   BULK INGEST
+# ======================================================
+
+class BulkWriteTests(GraphTestCase):
+    def test_nodes_and_relationships_are_written(self):
+        result = graph_write.bulk_write(
+            nodes=[{"label": "Patient", "props": {"name": "Omar", "age": 40}}],
+            relationships=[{"type": "HAS_SYMPTOM", "from": "Omar", "to": "fever"}],
+        )
+        self.assertEqual((result["written"], result["failed"]), (2, 0))
+        self.assertEqual(graph_read.patient_symptoms("Omar")[0]["symptom"], "fever")
+
+    def test_invalid_rows_are_reported_with_their_index(self):
+        result = graph_write.bulk_write(nodes=[
+            {"label": "Patient", "props": {"name": "Omar"}},
+            {"label": "Alien", "props": {"name": "x"}},
+            {"label": "Patient", "props": {"age": 3}},
+        ])
+        self.assertEqual(result["written"], 1)
+        self.assertEqual([e["index"] for e in result["errors"]], [1, 2])
+
+    def test_failing_row_is_isolated_by_bisection(self):
+        write_nodes = self.graph.write_nodes
+        calls = []
+
+        def flaky(label, rows):
+            calls.append(len(rows))
+            if any(r["key"] == "bad" for r in rows):
+                raise RuntimeError("constraint violated")
+            return write_nodes(label, rows)
+
+        names = [f"p{i}" for i in range(7)] + ["bad"]
+        with mock.patch.object(self.graph, "write_nodes", side_effect=flaky):
+            result = graph_write.bulk_write(
+                nodes=[{"label": "Patient", "props": {"name": n}} for n in names], chunk_size=8,
+            )
+
+        self.assertEqual(result["written"], 7)
+        self.assertEqual(result["errors"], [{"kind": "node", "index": 7, "error": "constraint violated"}])
+        self.assertEqual(calls, [8, 4, 4, 2, 2, 1, 1])
+        self.assertEqual(len(graph_read.all_patients()), 7)
+
+    def test_dry_run_writes_nothing(self):
+        result = graph_write.bulk_write(nodes=[{"label": "Patient", "props": {"name": "Omar"}}], dry_run=True)
+        self.assertEqual(result["written"], 0)
+        self.assertEqual(graph_read.all_patients(), [])
+
+
+class BulkViewTests(GraphTestCase):
+    def test_partial_status_when_rows_fail(self):
+        response = self.client.post("/api/bulk/", {
+            "nodes": [{"label": "Patient", "props": {"name": "Omar"}}, {"label": "Alien", "props": {}}],
+        }, content_type="application/json")
+        self.assertEqual(response.json()["status"], "partial")
+        self.assertEqual(response.json()["written"], 1)
+
+    def test_rows_must_be_lists(self):
+        response = self.client.post("/api/bulk/", {"nodes": {}}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# ======================================================
+#                 DIAGNOSIS RANKING
+# ======================================================
+
+class DiagnosisRankerTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu", weight=0.8)
+        graph_write.symptom_indicates_disease("cough", "flu", weight=0.6)
+        graph_write.symptom_indicates_disease("fever", "malaria", weight=0.9)
+        graph_write.symptom_indicates_disease("chills", "malaria", weight=0.3)
+
+    def test_scores_blend_coverage_and_specificity(self):
+        ranking = diagnosis_ranker.rank(["fever", "cough"])
+        scores = {r["disease"]: r["score"] for r in ranking["ranked"]}
+        # (1 - β) * evidence / |symptoms| + β * evidence / total weight of the disease
+        self.assertAlmostEqual(scores["flu"], 0.7 * 1.4 / 2 + 0.3 * 1.4 / 1.4, places=4)
+        self.assertAlmostEqual(scores["malaria"], 0.7 * 0.9 / 2 + 0.3 * 0.9 / 1.2, places=4)
+        self.assertEqual(ranking["ranked"][0]["disease"], "flu")
+        self.assertEqual(ranking["ranked"][0]["matched"], ["fever", "cough"])
+
+    def test_unknown_symptoms_are_reported(self):
+        ranking = diagnosis_ranker.rank(["fever", "rash"], k=1)
+        self.assertEqual(len(ranking["ranked"]), 1)
+        self.assertEqual(ranking["unmatched"], ["rash"])
+
+    def test_writes_update_the_matrix(self):
+        diagnosis_ranker.rank(["cough"])
+        graph_write.symptom_indicates_disease("cough", "bronchitis", weight=1.0)
+        self.assertEqual(diagnosis_ranker.rank(["cough"])["ranked"][0]["disease"], "bronchitis")
+
+
+class DiagnosisRankerFallbackTests(SimpleTestCase):
+    @skipIf(diagnosis.np is None, "numpy is not installed")
+    def test_python_and_numpy_paths_agree(self):
+        ranker = DiagnosisRanker()
+        rows = [
+            {"symptom": "fever", "disease_key": "flu", "disease": "flu", "weight": 0.8},
+            {"symptom": "fever", "disease_key": "malaria", "disease": "malaria", "weight": 0.9},
+            {"symptom": "cough", "disease_key": "flu", "disease": "flu", "weight": None},
+        ]
+        with mock.patch("graphapi.services.diagnosis.symptom_disease_weights", return_value=rows):
+            expected = ranker.rank(["fever", "cough"])
+            with mock.patch("graphapi.services.diagnosis.np", None):
+                self.assertEqual(ranker.rank(["fever", "cough"]), expected)
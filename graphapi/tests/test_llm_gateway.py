@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from graphapi.services.llm_gateway import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    LLMGateway,
+    LLMUnavailable,
+    TokenBucket,
+    classify,
+)
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+# ======================================================
+#                 RATE LIMIT / CONCURRENCY
+# ======================================================
+
+class TokenBucketTests(SimpleTestCase):
+    def test_reservations_queue_behind_each_other(self):
+        bucket = TokenBucket(60)  # one token per second
+        self.assertEqual(bucket.reserve(60, max_wait=0), 0.0)
+        self.assertAlmostEqual(bucket.reserve(2, max_wait=5), 2.0, places=1)
+        self.assertIsNone(bucket.reserve(10, max_wait=5))
+
+    def test_adjust_gives_tokens_back(self):
+        bucket = TokenBucket(600)
+        bucket.reserve(500, max_wait=0)
+        bucket.adjust(400)
+        self.assertGreaterEqual(bucket.level(), 500)
+
+    def test_zero_disables_the_bucket(self):
+        bucket = TokenBucket(0)
+        self.assertEqual(bucket.reserve(10 ** 6, max_wait=0), 0.0)
+        self.assertIsNone(bucket.level())
+
+
+class AdaptiveLimiterTests(SimpleTestCase):
+    def test_callers_over_the_limit_time_out(self):
+        limiter = AdaptiveLimiter(1, 1, latency_target=5.0)
+        self.assertTrue(limiter.acquire(0))
+        self.assertFalse(limiter.acquire(0.01))
+        self.assertEqual(limiter.queue_depth, 0)
+
+    def test_overload_shrinks_the_limit_once_per_burst(self):
+        limiter = AdaptiveLimiter(1, 10, latency_target=5.0)
+        start = limiter.limit
+        for _ in range(2):
+            limiter.acquire(0)
+        limiter.release(overloaded=True)
+        limiter.release(overloaded=True)
+        self.assertAlmostEqual(limiter.limit, start * 0.7)
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_fast_answers_grow_the_limit(self):
+        limiter = AdaptiveLimiter(1, 10, latency_target=5.0)
+        start = limiter.limit
+        limiter.acquire(0)
+        limiter.release(latency=0.1)
+        self.assertAlmostEqual(limiter.limit, start + 1 / start)
+
+
+# ======================================================
+#                   CIRCUIT BREAKER
+# ======================================================
+
+class CircuitBreakerTests(SimpleTestCase):
+    def open_breaker(self):
+        breaker = CircuitBreaker(failures=2, reset_seconds=0)
+        breaker.failure()
+        breaker.failure()
+        return breaker
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failures=2, reset_seconds=60)
+        breaker.failure()
+        self.assertFalse(breaker.check())
+        breaker.failure()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(LLMUnavailable) as raised:
+            breaker.check()
+        self.assertEqual(raised.exception.reason, "circuit_open")
+
+    def test_a_single_probe_after_the_reset_delay(self):
+        breaker = self.open_breaker()
+        self.assertTrue(breaker.check())
+        with self.assertRaises(LLMUnavailable):
+            breaker.check()
+        breaker.success(probe=True)
+        self.assertFalse(breaker.check())
+
+    def test_failed_probe_reopens(self):
+        breaker = self.open_breaker()
+        breaker.check()
+        breaker.failure(probe=True)
+        self.assertEqual(breaker.opened, 2)
+
+    def test_late_calls_do_not_decide_for_the_probe(self):
+        # Calls let through before the circuit opened, finishing while half-open
+        breaker = self.open_breaker()
+        self.assertTrue(breaker.check())
+        breaker.success()
+        breaker.failure()
+        self.assertEqual((breaker.state, breaker.opened), ("half_open", 1))
+        with self.assertRaises(LLMUnavailable):
+            breaker.check()
+        breaker.success(probe=True)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_abandoned_probe_lets_the_next_caller_probe(self):
+        breaker = self.open_breaker()
+        breaker.check()
+        breaker.abandon()
+        self.assertTrue(breaker.check())
+
+
+# ======================================================
+#                     GATEWAY
+# ======================================================
+
+class GatewayTests(SimpleTestCase):
+    def gateway(self, *outcomes, **kwargs):
+        create = mock.Mock(side_effect=outcomes)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        patcher = mock.patch("graphapi.services.llm_gateway.get_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep = mock.patch("graphapi.services.llm_gateway.time.sleep")
+        sleep.start()
+        self.addCleanup(sleep.stop)
+        return LLMGateway(**{"retry_base": 0, "breaker_failures": 2, "breaker_reset": 60, **kwargs}), create
+
+    def test_classify(self):
+        self.assertEqual(classify(ProviderError(429)), "rate_limited")
+        self.assertEqual(classify(ProviderError(503)), "provider")
+        self.assertIsNone(classify(ProviderError(400)))
+        self.assertEqual(classify(ConnectionError()), "provider")
+
+    def test_retries_then_succeeds(self):
+        answer = SimpleNamespace(usage=SimpleNamespace(total_tokens=12))
+        gateway, create = self.gateway(ProviderError(503), answer)
+        self.assertIs(gateway.complete(model="m", messages=[]), answer)
+        stats = gateway.stats()
+        self.assertEqual((stats["attempts"], stats["retries"], stats["tokens_used"]), (2, 1, 12))
+        self.assertEqual(gateway.breaker.state, "closed")
+
+    def test_client_errors_are_not_retried(self):
+        gateway, create = self.gateway(ProviderError(400))
+        with self.assertRaises(ProviderError):
+            gateway.complete(model="m", messages=[])
+        self.assertEqual(create.call_count, 1)
+
+    def test_provider_errors_open_the_circuit(self):
+        gateway, create = self.gateway(ProviderError(500), ProviderError(500), max_retries=5)
+        with self.assertRaises(LLMUnavailable):
+            gateway.complete(model="m", messages=[])
+        self.assertEqual(create.call_count, 2)
+        with self.assertRaises(LLMUnavailable) as raised:
+            gateway.complete(model="m", messages=[])
+        self.assertEqual(raised.exception.reason, "circuit_open")
+
+    def test_call_finishing_while_another_probes_leaves_the_circuit_half_open(self):
+        answer = SimpleNamespace(usage=None)
+
+        def meanwhile(**request):
+            # While this call is in flight: the circuit opens, then another caller probes
+            gateway.breaker.failure()
+            gateway.breaker.failure()
+            gateway.breaker.reset_seconds = 0
+            self.assertTrue(gateway.breaker.check())
+            return answer
+
+        gateway, create = self.gateway()
+        create.side_effect = meanwhile
+        self.assertIs(gateway.complete(model="m", messages=[]), answer)
+        self.assertEqual(gateway.breaker.state, "half_open")
+        with self.assertRaises(LLMUnavailable):
+            gateway.breaker.check()
+
+    def test_rate_limits_do_not_close_the_circuit(self):
+        gateway, _ = self.gateway(ProviderError(429), max_retries=0)
+        gateway.breaker.failure()
+        with self.assertRaises(LLMUnavailable) as raised:
+            gateway.complete(model="m", messages=[])
+        self.assertEqual(raised.exception.reason, "rate_limited")
+        self.assertEqual(gateway.breaker._failures, 1)
+
+    def test_empty_bucket_refuses_at_once(self):
+        gateway, create = self.gateway(requests_per_minute=1, queue_timeout=1)
+        gateway.requests.reserve(1, max_wait=0)
+        with self.assertRaises(LLMUnavailable) as raised:
+            gateway.complete(model="m", messages=[])
+        self.assertEqual(raised.exception.reason, "rate_limited")
+        create.assert_not_called()
@@ -0,0 +1,197 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from graphapi.services import entity_matcher as matcher_module
+from graphapi.services import graph_write
+from graphapi.services.entity_matcher import Automaton, EntityMatcher, entity_matcher, tokenize
+from graphapi.services.entity_resolver import NameIndex, entity_resolver
+from graphapi.services.query_engine import process_query
+from graphapi.tests.base import GraphTestCase
+
+
+# ======================================================
+#        DICTIONARY MATCHER (AHO-CORASICK ON TOKENS)
+# ======================================================
+
+class AutomatonTests(SimpleTestCase):
+    def test_overlapping_patterns_are_all_found(self):
+        automaton = Automaton({
+            ("chest", "pain"): [("symptoms", "chest pain")],
+            ("pain",): [("symptoms", "pain")],
+        })
+        found = automaton.find(tokenize("sharp chest pain"))
+        self.assertEqual(
+            sorted((start, stop) for start, stop, _ in found),
+            [(1, 3), (2, 3)],
+        )
+
+
+class EntityMatcherTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("chest pain", "angina")
+        graph_write.symptom_indicates_disease("pain", "influenza")
+        graph_write.create_patient("Omar")
+
+    def analysis(self, question):
+        return entity_matcher.extract(question)["analysis"]
+
+    def test_longest_match_wins(self):
+        self.assertEqual(self.analysis("What does chest pain indicate?")["symptoms"], ["chest pain"])
+
+    def test_matches_stay_on_word_boundaries(self):
+        graph_write.symptom_indicates_disease("flu", "influenza")
+        analysis = self.analysis("What are the symptoms of influenza?")
+        self.assertEqual(analysis["diseases"], ["influenza"])
+        self.assertEqual(analysis["symptoms"], [])
+
+    def test_full_coverage_gives_full_confidence(self):
+        match = entity_matcher.extract("What are Omar's symptoms?")
+        self.assertEqual(match["analysis"]["patients"], ["omar"])
+        self.assertEqual(match["confidence"], 1.0)
+
+    def test_unknown_words_lower_the_coverage(self):
+        self.assertLess(entity_matcher.extract("Does Omar have a rash?")["coverage"], 1.0)
+
+    def test_visit_ids_are_recognized(self):
+        self.assertEqual(self.analysis("Tests of visit v12?")["visits"], ["V12"])
+
+    def test_new_names_are_found_without_reloading_the_graph(self):
+        self.analysis("warm up")
+        with mock.patch.object(entity_matcher, "_load", wraps=entity_matcher._load) as load:
+            graph_write.symptom_indicates_disease("night sweats", "tuberculosis")
+            analysis = self.analysis("What do night sweats indicate?")
+        load.assert_not_called()
+        self.assertEqual(analysis["symptoms"], ["night sweats"])
+
+    def test_matched_question_skips_the_llm(self):
+        self.no_llm()
+        graph_write.disease_add_treatment("angina", "rest")
+        result = process_query("What are the treatments for angina?")
+        self.assertEqual(result["extraction"]["source"], "matcher")
+        self.assertEqual(result["graph_results"]["treatments"], ["rest"])
+
+
+class BackgroundRefreshTests(SimpleTestCase):
+    """Les questions n'attendent jamais la reconstruction de l'automate."""
+
+    def setUp(self):
+        self.names = {"Symptom": ["fever"]}
+        vocabularies = {
+            category: (label, lambda label=label: list(self.names.get(label, [])))
+            for category, (label, _) in matcher_module.VOCABULARIES.items()
+        }
+        patcher = mock.patch.object(matcher_module, "VOCABULARIES", vocabularies)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.matcher = EntityMatcher()
+        self.matcher.warm_up()
+
+    def symptoms(self, question):
+        return self.matcher.extract(question)["analysis"]["symptoms"]
+
+    def test_questions_use_the_current_automaton_while_the_next_one_builds(self):
+        building, release = threading.Event(), threading.Event()
+        build = Automaton.__init__
+
+        def slow_build(automaton, patterns):
+            building.set()
+            release.wait(5)
+            build(automaton, patterns)
+
+        with mock.patch.object(Automaton, "__init__", slow_build):
+            self.matcher.mark_stale("Symptom", "cough")
+            self.assertEqual(self.symptoms("fever and cough"), ["fever"])
+            self.assertTrue(building.wait(5))
+            self.assertEqual(self.symptoms("fever and cough"), ["fever"])
+            release.set()
+            deadline = time.monotonic() + 5
+            while self.matcher._refreshing and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(self.symptoms("fever and cough"), ["fever", "cough"])
+
+    def test_names_written_during_a_reload_are_kept(self):
+        loaded = self.matcher._load
+
+        def load_then_write():
+            patterns = loaded()
+            self.matcher.mark_stale("Symptom", "chills")
+            return patterns
+
+        self.matcher.background = False
+        self.matcher.mark_stale()
+        with mock.patch.object(self.matcher, "_load", load_then_write):
+            self.assertEqual(self.symptoms("fever and chills"), ["fever", "chills"])
+
+
+# ======================================================
+#          TYPO RESOLUTION (BOUNDED EDIT DISTANCE)
+# ======================================================
+
+class NameIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = NameIndex()
+        for name in ("fever", "cough", "hypertension", "hypotension"):
+            self.index.add(name)
+
+    def test_exact_name(self):
+        self.assertEqual(self.index.lookup("Fever", 2), ("fever", 0, False))
+
+    def test_one_edit(self):
+        self.assertEqual(self.index.lookup("feverr", 2), ("fever", 1, False))
+        self.assertEqual(self.index.lookup("cuogh", 2), ("cough", 1, False))
+
+    def test_ties_are_flagged(self):
+        # hypertension minus an "r", or hypotension with an "e"
+        self.assertEqual(self.index.lookup("hypetension", 2), ("hypertension", 1, True))
+
+    def test_two_edits_when_one_is_an_extra_letter(self):
+        self.assertEqual(self.index.lookup("hyperrtensionn", 2), ("hypertension", 2, False))
+
+    def test_short_names_are_not_corrected(self):
+        self.index.add("flu")
+        self.assertIsNone(self.index.lookup("flo", 2))
+
+
+class EntityResolverTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "hypertension")
+        graph_write.symptom_indicates_disease("cough", "hypotension")
+
+    def resolve(self, **slots):
+        analysis = {"symptoms": [], "diseases": [], **slots}
+        return analysis, entity_resolver.resolve(analysis)
+
+    def test_close_typo_is_applied(self):
+        analysis, corrections = self.resolve(symptoms=["feaver"])
+        self.assertEqual(analysis["symptoms"], ["fever"])
+        self.assertEqual(corrections, [{
+            "category": "symptoms", "input": "feaver", "resolved": "fever", "distance": 1, "applied": True,
+        }])
+
+    def test_exact_names_are_silently_normalized(self):
+        analysis, corrections = self.resolve(symptoms=["Fever"])
+        self.assertEqual(analysis["symptoms"], ["fever"])
+        self.assertEqual(corrections, [])
+
+    def test_distant_typo_is_only_suggested(self):
+        analysis, corrections = self.resolve(diseases=["hyperrtensionn"])
+        self.assertEqual(analysis["diseases"], ["hyperrtensionn"])
+        self.assertEqual(corrections[0]["resolved"], "hypertension")
+        self.assertFalse(corrections[0]["applied"])
+
+    def test_ties_are_not_applied(self):
+        analysis, corrections = self.resolve(diseases=["hypetension"])
+        self.assertEqual(analysis["diseases"], ["hypetension"])
+        self.assertFalse(corrections[0]["applied"])
+
+    def test_new_names_join_the_index(self):
+        self.resolve()
+        graph_write.symptom_indicates_disease("headache", "migraine")
+        analysis, _ = self.resolve(symptoms=["headache"], diseases=["migrane"])
+        self.assertEqual(analysis["diseases"], ["migraine"])
@@ -0,0 +1,232 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from graphapi.services import async_graph_read, graph_write
+from graphapi.services.async_query_engine import aexecute_plan
+from graphapi.services.backends import set_backend
+from graphapi.services.backends.base import GraphBackend
+from graphapi.services.backends.neo4j import Neo4jBackend, compile_plan
+from graphapi.services.intents import intent_registry
+from graphapi.services.llm_gateway import llm_gateway
+from graphapi.services.query_engine import (
+    execute_plan,
+    plan_intents,
+    plan_reads,
+    process_query,
+    split_clauses,
+)
+from graphapi.tests.base import GraphTestCase
+
+
+def analysis(**slots):
+    return {
+        "intent": "",
+        **{slot: [] for slot in ("symptoms", "diseases", "patients", "tests", "observations", "visits")},
+        **slots,
+    }
+
+
+# ======================================================
+#                 INTENT REGISTRY
+# ======================================================
+
+class IntentTests(SimpleTestCase):
+    def classify(self, question, **slots):
+        return intent_registry.classify(question, analysis(**slots))
+
+    def test_keywords_and_slots_pick_the_intent(self):
+        self.assertEqual(self.classify("What are the symptoms of flu?", diseases=["flu"]), "symptoms_of_disease")
+        self.assertEqual(self.classify("What are Omar's symptoms?", patients=["omar"]), "symptoms_of_patient")
+        self.assertEqual(self.classify("How is flu treated? Any treatment?", diseases=["flu"]), "treatments_for_disease")
+        self.assertEqual(self.classify("Risk factors of Omar?", patients=["omar"]), "risk_factors_of_patient")
+        self.assertEqual(self.classify("Observations of visit V1", visits=["V1"]), "observations_of_visit")
+
+    def test_priority_follows_declaration_order(self):
+        # "visit" + "test" with a visit wins over tests_for_disease
+        self.assertEqual(self.classify("Tests of visit V1 for flu", visits=["V1"], diseases=["flu"]), "tests_of_visit")
+
+    def test_symptoms_alone_fall_back_to_possible_diseases(self):
+        self.assertEqual(self.classify("I have fever", symptoms=["fever"]), "possible_diseases")
+        self.assertEqual(self.classify("hello"), "")
+
+    def test_decisions_are_memoized(self):
+        self.classify("What are the symptoms of flu?", diseases=["flu"])
+        size = len(intent_registry._decisions)
+        self.classify("Symptoms of measles?", diseases=["measles"])
+        self.assertEqual(len(intent_registry._decisions), size)
+
+    def test_every_declared_read_exists_sync_and_async(self):
+        for intent in intent_registry.intents.values():
+            if intent.read is not None:
+                self.assertTrue(hasattr(GraphBackend, intent.read), intent.name)
+                self.assertTrue(hasattr(async_graph_read, intent.read), intent.name)
+
+
+# ======================================================
+#                 MULTI-INTENT PLANNER
+# ======================================================
+
+class PlannerTests(SimpleTestCase):
+    QUESTION = "What are Omar's symptoms and what diseases could they indicate?"
+
+    def test_clauses(self):
+        self.assertEqual(split_clauses(self.QUESTION), ["What are Omar's symptoms", "what diseases could they indicate"])
+
+    def test_one_intent_per_clause(self):
+        self.assertEqual(
+            plan_intents(self.QUESTION, analysis(patients=["omar"])),
+            ["symptoms_of_patient", "possible_diseases"],
+        )
+
+    def test_reads_of_the_plan(self):
+        calls = plan_reads(
+            ["symptoms_of_disease", "visits_of_patient", "possible_diseases"],
+            analysis(diseases=["flu"], patients=["omar"]),
+        )
+        self.assertEqual(calls["symptoms_of_disease"], ("symptoms_for_diseases", (["flu"],), {}))
+        self.assertEqual(calls["visits_of_patient"][0], "patient_visits")
+        self.assertNotIn("possible_diseases", calls)
+
+
+class PlanExecutionTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu", weight=0.9)
+        graph_write.create_patient("Omar")
+        graph_write.patient_add_symptom("Omar", "fever")
+
+    def test_possible_diseases_use_the_patient_symptoms(self):
+        results = execute_plan(["symptoms_of_patient", "possible_diseases"], analysis(patients=["Omar"]))
+        self.assertEqual(results["symptoms_of_patient"]["symptoms"][0]["symptom"], "fever")
+        self.assertEqual(results["possible_diseases"]["possible_diseases"], ["flu"])
+
+    def test_plan_reads_run_in_one_round_trip(self):
+        with mock.patch.object(self.graph, "run_plan", wraps=self.graph.run_plan) as run_plan:
+            execute_plan(["symptoms_of_patient", "symptoms_of_disease"], analysis(patients=["Omar"], diseases=["flu"]))
+        run_plan.assert_called_once()
+
+    def test_async_plan_on_the_embedded_graph(self):
+        plan = ["symptoms_of_patient", "possible_diseases"]
+        expected = execute_plan(plan, analysis(patients=["Omar"]))
+        self.assertEqual(asyncio.run(aexecute_plan(plan, analysis(patients=["Omar"]))), expected)
+
+
+# ======================================================
+#              NEO4J PLAN COMPILER (NO SERVER)
+# ======================================================
+
+PLAN_ROW = {
+    "r0": [{"symptom": "fever", "severity": "high", "onset_days": 2}],
+    "r1": [{"disease": "flu", "symptoms": ["fever"]}],
+}
+PLAN_CALLS = {
+    "symptoms_of_patient": ("patient_symptoms", ("omar",), {}),
+    "symptoms_of_disease": ("symptoms_for_diseases", (["flu"],), {}),
+}
+
+
+class CompilePlanTests(SimpleTestCase):
+    def test_statements_become_one_query(self):
+        query, params = compile_plan([
+            ("MATCH (p:Patient {key: $name}) RETURN p.name AS name", {"name": "omar"}),
+            ("MATCH (d:Disease) WHERE d.key IN $names RETURN d.name AS disease, 1 AS n", {"names": ["flu"]}),
+        ])
+        self.assertEqual(params, {"p0_name": "omar", "p1_names": ["flu"]})
+        self.assertIn("$p0_name", query)
+        self.assertIn("collect({disease: disease, n: n}) AS r1", query)
+        self.assertTrue(query.endswith("RETURN r0, r1"))
+
+    def test_run_plan_replays_each_slice(self):
+        graph = mock.Mock()
+        graph.read.return_value = [PLAN_ROW]
+        fetched = Neo4jBackend(graph).run_plan(PLAN_CALLS)
+        graph.read.assert_called_once()
+        self.assertEqual(fetched["symptoms_of_patient"][0]["symptom"], "fever")
+        self.assertEqual(fetched["symptoms_of_disease"], {"flu": ["fever"]})
+
+
+class AsyncPlanTests(GraphTestCase):
+    def test_plan_is_one_round_trip_on_the_async_driver(self):
+        graph = mock.Mock()
+        set_backend(Neo4jBackend(graph))
+        data = mock.AsyncMock(return_value=[PLAN_ROW])
+        with mock.patch.object(async_graph_read, "_data", data), \
+                mock.patch.object(asyncio, "to_thread", side_effect=AssertionError("worker thread")):
+            results = asyncio.run(aexecute_plan(
+                ["symptoms_of_patient", "symptoms_of_disease"], analysis(patients=["omar"], diseases=["flu"]),
+            ))
+
+        data.assert_awaited_once()
+        self.assertTrue(data.await_args.args[0].endswith("RETURN r0, r1"))
+        graph.read.assert_not_called()
+        self.assertEqual(results["symptoms_of_patient"]["symptoms"][0]["symptom"], "fever")
+        self.assertEqual(results["symptoms_of_disease"]["symptoms"], ["fever"])
+
+
+# ======================================================
+#                   WHOLE PIPELINE
+# ======================================================
+
+def llm_answer(payload):
+    message = SimpleNamespace(content=json.dumps(payload))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class ProcessQueryTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu", weight=0.9)
+        graph_write.symptom_indicates_disease("cough", "flu", weight=0.4)
+        graph_write.disease_add_treatment("flu", "rest")
+
+    def test_typo_is_corrected_before_the_graph(self):
+        with mock.patch.object(llm_gateway, "complete", return_value=llm_answer({"symptoms": ["feaver"]})):
+            result = process_query("Which diseases does feaver indicate?")
+        self.assertEqual(result["extraction"]["source"], "llm")
+        self.assertEqual(result["corrections"][0]["resolved"], "fever")
+        self.assertEqual(result["graph_results"]["possible_diseases"], ["flu"])
+
+
+# ======================================================
+#                 BATCH QUESTIONS
+# ======================================================
+
+class QueryBatchTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu", weight=0.9)
+        graph_write.disease_add_treatment("flu", "rest")
+        self.no_llm()
+
+    def post(self, questions):
+        return self.client.post("/api/query/batch/", {"questions": questions}, content_type="application/json")
+
+    def test_duplicates_run_once_and_answers_keep_the_input_order(self):
+        response = self.post([
+            "What are the treatments for flu?",
+            "What diseases does fever indicate?",
+            "what are the  treatments for FLU?",
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["stats"]["unique"], 2)
+        self.assertEqual(body["stats"]["round_trips"], 1)
+        results = body["results"]
+        self.assertEqual(results[2]["question"], "what are the  treatments for FLU?")
+        self.assertEqual(results[0]["graph_results"], results[2]["graph_results"])
+        self.assertEqual(results[1]["graph_results"]["possible_diseases"], ["flu"])
+
+    def test_questions_are_validated(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post(["ok", ""]).status_code, 400)
+
+    def test_a_failed_round_trip_only_fails_its_questions(self):
+        with mock.patch.object(self.graph, "run_plan", side_effect=RuntimeError("unavailable")):
+            body = self.post(["What are the treatments for flu?", "What diseases does fever indicate?"]).json()
+        self.assertEqual(body["stats"]["errors"], 1)
+        self.assertEqual(body["results"][0]["error"], "RuntimeError: unavailable")
+        self.assertEqual(body["results"][1]["graph_results"]["possible_diseases"], ["flu"])
@@ -0,0 +1,58 @@
+import json
+
+from graphapi.services import graph_write
+from graphapi.tests.base import GraphTestCase
+
+
+def sse_events(body: bytes) -> list:
+    events = []
+    for block in body.decode().strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class StreamedQueryTests(GraphTestCase):
+    QUESTION = "What diseases does fever indicate?"
+
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu", weight=0.9)
+        self.no_llm()
+
+    def post(self, path, **extra):
+        return self.client.post(path, {"question": self.QUESTION}, content_type="application/json", **extra)
+
+    def assert_stream(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = sse_events(b"".join(response.streaming_content))
+        names = [name for name, _ in events]
+        self.assertEqual(names, ["extraction", "intent", "graph_results", "reasoning", "done"])
+        self.assertEqual(events[0][1]["analysis"]["symptoms"], ["fever"])
+        self.assertEqual(events[2][1]["results"]["possible_diseases"], ["flu"])
+
+    def test_stream_parameter_sends_server_sent_events(self):
+        self.assert_stream(self.post("/api/query/?stream=sse"))
+
+    def test_accept_header_sends_server_sent_events(self):
+        self.assert_stream(self.post("/api/query/", HTTP_ACCEPT="text/event-stream"))
+
+    def test_ndjson_stream_has_one_event_per_line(self):
+        response = self.post("/api/query/?stream=ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[-1])["event"], "done")
+
+    def test_error_is_an_event_when_the_client_accepts_only_sse(self):
+        response = self.client.post("/api/query/", {}, content_type="application/json", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sse_events(response.content), [("error", {"error": "Missing field 'question'"})])
+
+    def test_plain_post_still_answers_json(self):
+        response = self.post("/api/query/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["graph_results"]["possible_diseases"], ["flu"])
+
+    def test_async_view_streams_under_wsgi(self):
+        self.assert_stream(self.post("/api/query/async/?stream=sse"))
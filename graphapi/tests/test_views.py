@@ -0,0 +1,157 @@
+import gzip
+import json
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase, override_settings
+
+from graphapi import middleware
+from graphapi.services import graph_write
+from graphapi.services.cache import read_cache
+from graphapi.services.metrics import BOUNDS, Histogram
+from graphapi.services.pagination import decode_cursor
+from graphapi.tests.base import GraphTestCase
+
+
+# ======================================================
+#            PAGINATED LISTS (LINK / X-NEXT-CURSOR)
+# ======================================================
+
+class PaginatedViewTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("alice", "bob", "carl"):
+            graph_write.create_patient(name)
+
+    def test_body_is_the_list_and_headers_announce_the_next_page(self):
+        response = self.client.get("/api/patients/", {"limit": 2})
+        self.assertEqual([p["name"] for p in response.json()], ["alice", "bob"])
+        cursor = response["X-Next-Cursor"]
+        self.assertEqual(decode_cursor(cursor), {"key": "bob"})
+        self.assertIn(f"cursor={cursor}", response["Link"])
+        self.assertTrue(response["Link"].endswith('rel="next"'))
+
+        last = self.client.get("/api/patients/", {"limit": 2, "cursor": cursor})
+        self.assertEqual([p["name"] for p in last.json()], ["carl"])
+        self.assertNotIn("Link", last)
+
+    def test_invalid_cursor_is_a_400(self):
+        self.assertEqual(self.client.get("/api/patients/", {"cursor": "!!"}).status_code, 400)
+
+    def test_ndjson_stream(self):
+        response = self.client.get("/api/patients/", {"stream": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 3)
+
+
+# ======================================================
+#                CONDITIONAL GET (ETag / 304)
+# ======================================================
+
+class ConditionalGetTests(GraphTestCase):
+    URL = "/api/symptoms/diseases/?symptom=fever"
+
+    def setUp(self):
+        super().setUp()
+        graph_write.symptom_indicates_disease("fever", "flu")
+
+    def test_unchanged_entity_is_a_304(self):
+        etag = self.client.get(self.URL)["ETag"]
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_to_the_entity_changes_the_etag(self):
+        etag = self.client.get(self.URL)["ETag"]
+        graph_write.symptom_indicates_disease("fever", "malaria")
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_write_elsewhere_keeps_the_etag(self):
+        etag = self.client.get(self.URL)["ETag"]
+        graph_write.symptom_indicates_disease("cough", "cold")
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_bulk_write_changes_the_etag(self):
+        etag = self.client.get(self.URL)["ETag"]
+        graph_write.bulk_write(relationships=[{"type": "INDICATES", "from": "fever", "to": "typhoid"}])
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_write_from_another_worker_is_not_served_from_the_local_cache(self):
+        first = self.client.get(self.URL)
+        self.assertEqual(first.json(), ["flu"])
+        # Another worker: the graph and the shared counters change, this
+        # process's read cache is never told
+        with mock.patch.object(read_cache, "invalidate"):
+            graph_write.symptom_indicates_disease("fever", "malaria")
+
+        second = self.client.get(self.URL, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(sorted(second.json()), ["flu", "malaria"])
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=second["ETag"]).status_code, 304)
+
+
+# ======================================================
+#                   OBSERVABILITY
+# ======================================================
+
+class ObservabilityViewTests(GraphTestCase):
+    def test_server_timing_and_metrics(self):
+        graph_write.symptom_indicates_disease("fever", "flu")
+        response = self.client.get("/api/symptoms/diseases/", {"symptom": "fever"})
+        self.assertIn("graph_read", response["Server-Timing"])
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('graphapi_request_duration_seconds_count{endpoint="diseases_for_symptom"}', body)
+        self.assertIn("graphapi_llm_circuit_open 0", body)
+
+    def test_db_queries_sort_is_validated(self):
+        self.assertEqual(self.client.get("/api/db/queries/").status_code, 200)
+        self.assertEqual(self.client.get("/api/db/queries/", {"sort": "nope"}).status_code, 400)
+
+    def test_questions_are_timed_per_stage_and_intent(self):
+        self.no_llm()
+        graph_write.disease_add_treatment("flu", "rest")
+        response = self.client.post("/api/query/", {"question": "What are the treatments for flu?"},
+                                    content_type="application/json")
+        self.assertIn("extract", response["Server-Timing"])
+        summary = self.client.get("/api/latency/stats/").json()
+        self.assertGreaterEqual(summary["intent"]["treatments_for_disease"]["count"], 1)
+        self.assertIn("graph_read.treatments_for_diseases", summary["stage"])
+
+
+class HistogramTests(SimpleTestCase):
+    def test_quantiles_interpolate_inside_the_bucket(self):
+        histogram = Histogram()
+        for _ in range(100):
+            histogram.observe(BOUNDS[10] * 0.99)
+        low, high = BOUNDS[9], BOUNDS[10]
+        self.assertAlmostEqual(histogram.quantile(0.5), low + (high - low) * 0.5)
+        self.assertAlmostEqual(histogram.quantile(0.99), low + (high - low) * 0.99)
+
+
+# ======================================================
+#                 RESPONSE COMPRESSION
+# ======================================================
+
+@override_settings(RESPONSE_COMPRESSION_MIN_BYTES=200)
+class CompressionTests(GraphTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(40):
+            graph_write.create_patient(f"patient {i:02d}", age=i)
+
+    def test_gzip(self):
+        response = self.client.get("/api/patients/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 40)
+
+    @skipIf(middleware.brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.client.get("/api/patients/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn(b"patient 00", middleware.brotli.decompress(response.content))
+
+    def test_small_answers_are_sent_as_is(self):
+        response = self.client.get("/api/patients/", {"limit": 1}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", response)
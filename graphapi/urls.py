@@ -38,6 +38,19 @@ urlpatterns = [
     # Search
     path("search/", views.search_view, name="search"),
     path("query/", views.query_view, name="query"),
+    path("query/async/", views.query_async_view, name="query_async"),
+    path("query/batch/", views.query_batch_view, name="query_batch"),
+
+    # Bulk ingest
+    path("bulk/", views.bulk_view, name="bulk"),
+
+    # Cache
+    path("cache/stats/", views.cache_stats_view, name="cache_stats"),
+    path("db/stats/", views.db_stats_view, name="db_stats"),
+    path("db/queries/", views.db_queries_view, name="db_queries"),
+    path("llm/stats/", views.llm_stats_view, name="llm_stats"),
+    path("latency/stats/", views.latency_stats_view, name="latency_stats"),
+    path("startup/", views.startup_view, name="startup"),
 
     
 ]
@@ -1,7 +1,31 @@
-from rest_framework.decorators import api_view
+import asyncio
+import json
+from functools import wraps
+
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.urls import reverse
-from graphapi.services.query_engine import process_query
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from graphapi.services.query_engine import process_query, stream_query
+from graphapi.services.async_query_engine import aprocess_query, astream_query
+from graphapi.services.query_batch import aprocess_batch
+from graphapi.services.cache import read_cache, GLOBAL_TAG, label_tag
+from graphapi.services.versions import conditional_state, entity_scopes
+from graphapi.services.backends import get_backend
+from graphapi.services.db import close_async_driver
+from graphapi.services.startup import startup_report
+from graphapi.services.extraction_cache import extraction_cache
+from graphapi.services.llm_gateway import LLMUnavailable, llm_gateway
+from graphapi.services.metrics import metrics, timed
+from graphapi.services.pagination import encode_cursor, decode_cursor, page_size
+from graphapi.services.query_profiler import query_profiler
+from graphapi.renderers import EventStreamRenderer, dumps, event_bytes
+from kgbackend.llm_config import close_async_client
 
 from graphapi.services.graph_write import (
     create_patient,
@@ -14,6 +38,7 @@ from graphapi.services.graph_write import (
     disease_add_treatment,
     test_used_for_diagnosis,
     observation_supports_disease,
+    bulk_write,
 )
 
 from graphapi.services.graph_read import (
@@ -30,9 +55,94 @@ from graphapi.services.graph_read import (
     diseases_for_test,
     diseases_for_observation,
     search_graph,
+    stream_patients,
+    stream_patient_visits,
+    stream_visit_observations,
+    stream_search,
 )
 
 
+# -----------------------
+# PAGINATION / STREAMING
+# -----------------------
+
+def _wants_stream(request) -> bool:
+    return request.GET.get("stream", "").lower() in ("1", "true", "ndjson")
+
+
+def _ndjson(rows) -> StreamingHttpResponse:
+    # One JSON document per line, written as the rows come out of Neo4j
+    lines = (dumps(row) + b"\n" for row in rows)
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+def _page(request, read, *args, default: int = 50, maximum: int = 500):
+    """
+    Corps : la liste des lignes, comme avant la pagination. La page suivante
+    est annoncée par les en-têtes Link (rel="next") et X-Next-Cursor.
+    """
+    try:
+        limit = page_size(request.GET.get("limit"), default=default, maximum=maximum)
+        cursor = decode_cursor(request.GET.get("cursor"))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    page = read(*args, limit=limit, cursor=cursor)
+    response = Response(page["results"])
+    if page["next"]:
+        next_cursor = encode_cursor(page["next"])
+        query = request.GET.copy()
+        query["cursor"] = next_cursor
+        query["limit"] = str(limit)
+        response["X-Next-Cursor"] = next_cursor
+        response["Link"] = f'<{request.build_absolute_uri(request.path)}?{query.urlencode()}>; rel="next"'
+    return response
+
+
+# -----------------------
+# CONDITIONAL GET (ETag / 304)
+# -----------------------
+
+def graph_conditional(scopes):
+    """
+    scopes(request) -> portées de version dont dépend la réponse.
+    Si le client renvoie l'ETag courant (If-None-Match), la réponse est un
+    304 calculé sans exécuter la requête Cypher. Sinon le cache de lecture
+    ne sert que des entrées chargées sous les versions de cet ETag.
+    """
+    def state(request):
+        if not hasattr(request, "_graph_state"):
+            request._graph_state = conditional_state(
+                scopes(request),
+                request.get_full_path(),
+                request.META.get("HTTP_ACCEPT", ""),
+            )
+        return request._graph_state
+
+    def decorator(view):
+        @wraps(view)
+        def pinned(request, *args, **kwargs):
+            # Another worker's write bumps the counters without reaching
+            # this process's cache: the body must match the ETag's versions
+            with read_cache.pinned(state(request)[2]):
+                return view(request, *args, **kwargs)
+
+        return condition(
+            etag_func=lambda request, *args, **kwargs: state(request)[0],
+            last_modified_func=lambda request, *args, **kwargs: state(request)[1],
+        )(pinned)
+
+    return decorator
+
+
+def _entity(label: str, param: str):
+    return lambda request: entity_scopes(label, request.GET.get(param))
+
+
+def _label(label: str):
+    return lambda request: [label_tag(label)]
+
+
 # -----------------------
 # API ROOT
 # -----------------------
@@ -78,7 +188,16 @@ def api_root(request):
         # Utilitaire
         "search": _full(request, "search"),
         "query": _full(request, "query"),
-        
+        "query_async": _full(request, "query_async"),
+        "query_batch": _full(request, "query_batch"),
+        "bulk": _full(request, "bulk"),
+        "cache_stats": _full(request, "cache_stats"),
+        "db_stats": _full(request, "db_stats"),
+        "db_queries": _full(request, "db_queries"),
+        "llm_stats": _full(request, "llm_stats"),
+        "latency_stats": _full(request, "latency_stats"),
+        "startup": _full(request, "startup"),
+
     })
 
 
@@ -86,11 +205,15 @@ def api_root(request):
 # PATIENT
 # -----------------------
 
+@graph_conditional(_label("Patient"))
 @api_view(["GET"])
 def patients_list_view(request):
-    return Response(list_patients())
+    if _wants_stream(request):
+        return _ndjson(stream_patients())
+    return _page(request, list_patients)
 
 
+@graph_conditional(_entity("Patient", "name"))
 @api_view(["GET"])
 def patient_detail_view(request):
     name = request.GET.get("name")
@@ -135,22 +258,27 @@ def patient_add_visit_view(request):
     return Response({"status": "ok", "result": result})
 
 
+@graph_conditional(_entity("Patient", "name"))
 @api_view(["GET"])
 def patient_symptoms_view(request):
     name = request.GET.get("name")
     return Response(patient_symptoms(name))
 
 
+@graph_conditional(_entity("Patient", "name"))
 @api_view(["GET"])
 def patient_risk_factors_view(request):
     name = request.GET.get("name")
     return Response(patient_risk_factors(name))
 
 
+@graph_conditional(_entity("Patient", "name"))
 @api_view(["GET"])
 def patient_visits_view(request):
     name = request.GET.get("name")
-    return Response(patient_visits(name))
+    if _wants_stream(request):
+        return _ndjson(stream_patient_visits(name))
+    return _page(request, patient_visits, name)
 
 
 # -----------------------
@@ -177,12 +305,16 @@ def visit_add_test_view(request):
     return Response({"status": "ok", "result": result})
 
 
+@graph_conditional(_entity("Visit", "visit_id"))
 @api_view(["GET"])
 def visit_observations_view(request):
     visit_id = request.GET.get("visit_id")
-    return Response(visit_observations(visit_id))
+    if _wants_stream(request):
+        return _ndjson(stream_visit_observations(visit_id))
+    return _page(request, visit_observations, visit_id)
 
 
+@graph_conditional(_entity("Visit", "visit_id"))
 @api_view(["GET"])
 def visit_tests_view(request):
     visit_id = request.GET.get("visit_id")
@@ -202,12 +334,14 @@ def symptom_indicates_disease_view(request):
     return Response({"status": "ok", "result": result})
 
 
+@graph_conditional(_entity("Symptom", "symptom"))
 @api_view(["GET"])
 def diseases_for_symptom_view(request):
     symptom = request.GET.get("symptom")
     return Response(diseases_for_symptom(symptom))
 
 
+@graph_conditional(_entity("Disease", "disease"))
 @api_view(["GET"])
 def symptoms_for_disease_view(request):
     disease = request.GET.get("disease")
@@ -224,6 +358,7 @@ def disease_add_treatment_view(request):
     return Response({"status": "ok", "result": result})
 
 
+@graph_conditional(_entity("Disease", "disease"))
 @api_view(["GET"])
 def treatments_for_disease_view(request):
     disease = request.GET.get("disease")
@@ -242,6 +377,7 @@ def test_used_for_diagnosis_view(request):
     return Response({"status": "ok", "result": result})
 
 
+@graph_conditional(_entity("Test", "test_name"))
 @api_view(["GET"])
 def diseases_for_test_view(request):
     test_name = request.GET.get("test_name")
@@ -256,6 +392,7 @@ def observation_supports_disease_view(request):
     return Response({"status": "ok", "result": result})
 
 
+@graph_conditional(_entity("Observation", "observation"))
 @api_view(["GET"])
 def diseases_for_observation_view(request):
     obs_name = request.GET.get("observation")
@@ -266,17 +403,282 @@ def diseases_for_observation_view(request):
 # SEARCH
 # -----------------------
 
+@graph_conditional(lambda request: [GLOBAL_TAG])
 @api_view(["GET"])
 def search_view(request):
     term = request.GET.get("term", "")
-    return Response(search_graph(term))
+    mode = request.GET.get("mode", "fulltext")
+    labels = [l for l in request.GET.get("labels", "").split(",") if l] or None
 
+    if mode not in ("fulltext", "prefix"):
+        return Response({"error": "mode must be 'fulltext' or 'prefix'"}, status=400)
+    if _wants_stream(request):
+        return _ndjson(stream_search(term, labels=labels))
+
+    def read(limit, cursor):
+        return search_graph(term, labels=labels, limit=limit, cursor=cursor, mode=mode)
+
+    return _page(request, read, default=20, maximum=100)
+
+# text/event-stream must pass DRF's content negotiation to reach the view
 @api_view(["POST"])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
 def query_view(request):
     question = request.data.get("question")
 
     if not question:
         return Response({"error": "Missing field 'question'"}, status=400)
 
-    result = process_query(question)
+    mode = _event_mode(request)
+    try:
+        if mode:
+            events = stream_query(question)
+            # The first event (extraction) is pulled here: a Groq outage is
+            # still a 503, not an error in the middle of a 200 stream
+            return _event_response(mode, _event_stream(mode, next(events), events))
+        result = process_query(question)
+    except LLMUnavailable as exc:
+        return _llm_unavailable(exc)
     return Response(result)
+
+
+# ---------------------------
+# STREAMED ANSWERS (?stream=sse | ?stream=ndjson)
+# ---------------------------
+
+def _event_mode(request) -> str | None:
+    """"sse", "ndjson", ou None : réponse JSON unique (défaut)."""
+    mode = request.GET.get("stream", "").lower()
+    if mode == "sse" or (not mode and "text/event-stream" in request.META.get("HTTP_ACCEPT", "")):
+        return "sse"
+    if mode in ("1", "true", "ndjson"):
+        return "ndjson"
+    return None
+
+
+def _event_stream(mode, first, events):
+    yield event_bytes(mode, *first)
+    try:
+        for event, data in events:
+            yield event_bytes(mode, event, data)
+    except Exception as exc:
+        # Headers are gone already: the failure becomes the last event
+        yield event_bytes(mode, "error", {"error": f"{type(exc).__name__}: {exc}"})
+
+
+async def _aevent_stream(mode, first, events):
+    yield event_bytes(mode, *first)
+    try:
+        async for event, data in events:
+            yield event_bytes(mode, event, data)
+    except Exception as exc:
+        yield event_bytes(mode, "error", {"error": f"{type(exc).__name__}: {exc}"})
+
+
+def _event_response(mode, chunks) -> StreamingHttpResponse:
+    content_type = "text/event-stream" if mode == "sse" else "application/x-ndjson"
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: send each event at once
+    return response
+
+
+def _json_response(result) -> HttpResponse:
+    # Plain Django views: serialized here rather than by the DRF renderer
+    with timed("serialize"):
+        return HttpResponse(dumps(result), content_type="application/json")
+
+
+def _llm_unavailable(exc):
+    # Extraction impossible right now: say so instead of an empty answer
+    response = JsonResponse({"error": str(exc), "reason": exc.reason}, status=503)
+    if exc.retry_after:
+        response["Retry-After"] = str(int(exc.retry_after + 0.999))
+    return response
+
+
+async def _close_loop_clients(request):
+    # Under ASGI there is one long-lived loop and its Neo4j driver / Groq
+    # client are reused; under WSGI async_to_sync runs each async view in a
+    # new loop, whose driver and client would otherwise never be closed
+    if not isinstance(request, ASGIRequest):
+        await close_async_driver()
+        await close_async_client()
+
+
+def _loop_scoped(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            await _close_loop_clients(request)
+    return wrapper
+
+
+# DRF views are sync-only: this one is a plain async Django view so that,
+# under ASGI, the LLM call and the graph lookups do not hold a thread.
+@csrf_exempt
+@_loop_scoped
+async def query_async_view(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    question = data.get("question") if isinstance(data, dict) else None
+    if not question:
+        return JsonResponse({"error": "Missing field 'question'"}, status=400)
+
+    mode = _event_mode(request)
+    try:
+        if mode and not isinstance(request, ASGIRequest):
+            # Under WSGI this view's loop ends (and finalizes its async
+            # generators) before the body is sent: stream the sync pipeline
+            events = stream_query(question)
+            first = await asyncio.to_thread(next, events)
+            return _event_response(mode, _event_stream(mode, first, events))
+        if mode:
+            events = astream_query(question)
+            first = await anext(events)
+            return _event_response(mode, _aevent_stream(mode, first, events))
+        result = await aprocess_query(question)
+    except LLMUnavailable as exc:
+        return _llm_unavailable(exc)
+    return _json_response(result)
+
+
+@csrf_exempt
+@_loop_scoped
+async def query_batch_view(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    questions = data.get("questions") if isinstance(data, dict) else None
+    if not isinstance(questions, list) or not questions:
+        return JsonResponse({"error": "'questions' must be a non-empty list"}, status=400)
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        return JsonResponse({"error": "Every question must be a non-empty string"}, status=400)
+
+    max_questions = getattr(settings, "QUERY_BATCH_MAX_QUESTIONS", 5000)
+    if len(questions) > max_questions:
+        return JsonResponse({"error": f"Too many questions (max {max_questions})"}, status=400)
+
+    result = await aprocess_batch(questions)
+    return _json_response(result)
+
+
+# -----------------------
+# BULK INGEST
+# -----------------------
+
+@api_view(["POST"])
+def bulk_view(request):
+    nodes = request.data.get("nodes", [])
+    relationships = request.data.get("relationships", [])
+
+    if not isinstance(nodes, list) or not isinstance(relationships, list):
+        return Response({"error": "'nodes' and 'relationships' must be lists"}, status=400)
+
+    max_rows = getattr(settings, "BULK_MAX_ROWS", 50000)
+    if len(nodes) + len(relationships) > max_rows:
+        return Response({"error": f"Too many rows (max {max_rows})"}, status=400)
+
+    try:
+        chunk_size = int(request.data.get("chunk_size") or getattr(settings, "BULK_CHUNK_SIZE", 500))
+    except (TypeError, ValueError):
+        return Response({"error": "'chunk_size' must be an integer"}, status=400)
+
+    result = bulk_write(nodes, relationships, chunk_size=chunk_size)
+    return Response({"status": "partial" if result["failed"] else "ok", **result})
+
+
+# -----------------------
+# CACHE
+# -----------------------
+
+@api_view(["GET"])
+def cache_stats_view(request):
+    return Response({
+        "graph_read": read_cache.stats(),
+        "llm_extraction": extraction_cache.stats(),
+    })
+
+
+@api_view(["GET"])
+def llm_stats_view(request):
+    return Response(llm_gateway.stats())
+
+
+def metrics_view(request):
+    """Exposition Prometheus (texte) : latences, compteurs et état de la passerelle Groq."""
+    llm = llm_gateway.stats()
+    cache = read_cache.stats()
+    cypher = query_profiler.stats()
+    gauges = {
+        "graphapi_llm_queue_depth": ("Groq calls waiting for the rate limit or a slot", llm["queue_depth"]),
+        "graphapi_llm_in_flight": ("Groq calls in progress", llm["in_flight"]),
+        "graphapi_llm_concurrency_limit": ("Adaptive Groq concurrency limit", llm["concurrency_limit"]),
+        "graphapi_llm_circuit_open": ("1 while the Groq circuit breaker is not closed", int(llm["circuit"] != "closed")),
+        "graphapi_read_cache_entries": ("Graph read cache entries", cache["size"]),
+    }
+    counters = {
+        "graphapi_llm_calls_total": ("Groq extraction calls", llm["calls"]),
+        "graphapi_llm_retries_total": ("Groq call retries", llm["retries"]),
+        "graphapi_llm_rate_limited_total": ("Groq 429 answers", llm["rate_limited"]),
+        "graphapi_llm_rejected_total": ("Groq calls refused by the gateway", llm["rejected"]),
+        "graphapi_llm_tokens_total": ("Groq tokens used", llm["tokens_used"]),
+        "graphapi_read_cache_hits_total": ("Graph read cache hits", cache["hits"]),
+        "graphapi_read_cache_misses_total": ("Graph read cache misses", cache["misses"]),
+        "graphapi_cypher_statements_total": ("Cypher statements run (profiler)", cypher["calls"]),
+        "graphapi_cypher_slow_total": ("Cypher statements over QUERY_SLOW_MS", cypher["slow"]),
+    }
+    return HttpResponse(
+        metrics.prometheus(gauges, counters),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@api_view(["GET"])
+def latency_stats_view(request):
+    return Response(metrics.summary())
+
+
+@api_view(["GET"])
+def db_stats_view(request):
+    return Response(get_backend().metrics())
+
+
+QUERY_SORTS = ("total_ms", "max_ms", "mean_ms", "calls", "rows", "bytes", "slow")
+
+
+@api_view(["GET", "DELETE"])
+def db_queries_view(request):
+    """Requêtes Cypher les plus coûteuses du processus ; DELETE remet les compteurs à zéro."""
+    if request.method == "DELETE":
+        query_profiler.reset()
+        return Response(status=204)
+    sort = request.GET.get("sort", "total_ms")
+    if sort not in QUERY_SORTS:
+        return Response({"error": f"sort must be one of {', '.join(QUERY_SORTS)}"}, status=400)
+    try:
+        limit = page_size(request.GET.get("limit"), default=20, maximum=200)
+    except ValueError:
+        return Response({"error": "limit must be a positive integer"}, status=400)
+    return Response({
+        "profiler": query_profiler.stats(),
+        "statements": query_profiler.top(limit, sort),
+    })
+
+
+@api_view(["GET"])
+def startup_view(request):
+    return Response(startup_report.as_dict())
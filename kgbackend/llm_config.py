@@ -1,9 +1,49 @@
+import asyncio
 import os
+import threading
+import weakref
+
 from dotenv import load_dotenv
-from groq import Groq
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-client = Groq(api_key=GROQ_API_KEY)
+# Created on first use: importing this module must not touch the network
+# (nor pay for importing the groq SDK). No SDK retries: the calls go through
+# graphapi.services.llm_gateway, which retries with its own backoff
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                _client = Groq(api_key=GROQ_API_KEY, max_retries=0)
+    return _client
+
+
+# The async client holds an HTTP pool bound to the event loop it was used on
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    from groq import AsyncGroq
+
+    loop = asyncio.get_running_loop()
+    async_client = _async_clients.get(loop)
+    if async_client is None:
+        async_client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0)
+        _async_clients[loop] = async_client
+    return async_client
+
+
+async def close_async_client():
+    # Under WSGI each async view gets its own short-lived loop: close the
+    # client (and its HTTP pool) before the loop goes away
+    async_client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if async_client is not None:
+        await async_client.close()
@@ -39,7 +39,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'graphapi.services.startup.FirstRequestTimingMiddleware',
+    'graphapi.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'graphapi.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -119,3 +122,130 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Graph read cache (graphapi/services/cache.py)
+# 0 for either value disables the cache
+
+GRAPH_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", 2048))
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", 300))
+
+
+# Dictionary entity extraction (graphapi/services/entity_matcher.py)
+# The Groq call is skipped when the matcher confidence reaches the threshold
+
+ENTITY_MATCHER_ENABLED = os.getenv("ENTITY_MATCHER_ENABLED", "true").lower() == "true"
+ENTITY_MATCHER_MIN_CONFIDENCE = float(os.getenv("ENTITY_MATCHER_MIN_CONFIDENCE", 0.75))
+ENTITY_MATCHER_TTL = float(os.getenv("ENTITY_MATCHER_TTL", 300))
+
+# Typo-tolerant resolution of the extracted names (entity_resolver.py):
+# up to MAX_DISTANCE edits for names of 8+ letters, 1 below, 0 up to 3; the
+# second edit is only found when one of the two is an extra letter. Matches
+# within AUTO_DISTANCE edits (and not tied) replace the extracted name, the
+# others are only suggested in the answer's "corrections"
+ENTITY_RESOLVER_ENABLED = os.getenv("ENTITY_RESOLVER_ENABLED", "true").lower() == "true"
+ENTITY_RESOLVER_MAX_DISTANCE = int(os.getenv("ENTITY_RESOLVER_MAX_DISTANCE", 2))
+ENTITY_RESOLVER_AUTO_DISTANCE = int(os.getenv("ENTITY_RESOLVER_AUTO_DISTANCE", 1))
+
+
+# LLM extraction cache (graphapi/services/extraction_cache.py)
+# SQLite file shared by every worker on the host, empty path disables it
+
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", str(BASE_DIR / "extraction_cache.sqlite3"))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", 50000))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+# Groq call gateway (graphapi/services/llm_gateway.py): account limits per
+# worker (0 = unlimited), AIMD concurrency between MIN and MAX, retries with
+# jitter, circuit breaker. Calls that would queue longer than
+# LLM_QUEUE_TIMEOUT seconds get a 503 instead
+
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 6000))
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 200))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", 1))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", 16))
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", 5))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", 0.5))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", 8))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+
+
+# Batch questions (/api/query/batch/): extractions and graph plans in
+# flight at once, per request
+
+QUERY_BATCH_MAX_QUESTIONS = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", 5000))
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", 16))
+
+
+# Bulk ingest (/api/bulk/)
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", 50000))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+
+
+# Worker startup (graphapi/services/startup.py, report on /api/startup/)
+# Preload imports the service modules at boot; the warm-up opens Neo4j /
+# Groq and loads the matcher vocabularies in a background thread. Both run
+# from kgbackend/wsgi.py / asgi.py only, never for manage.py commands
+
+STARTUP_PRELOAD = os.getenv("STARTUP_PRELOAD", "true").lower() == "true"
+GRAPH_WARMUP = os.getenv("GRAPH_WARMUP", "false").lower() == "true"
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 0))
+
+
+# JSON responses: orjson renderer (falls back to the stdlib when orjson is
+# missing), browsable API kept for GET in a browser
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "graphapi.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Response compression (graphapi/middleware.py): brotli when the `brotli`
+# package is installed and the client accepts it, gzip otherwise
+
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", 4))
+
+
+# Conditional GET (graphapi/services/versions.py): ETag / Last-Modified
+# from per-entity graph version counters, 304 without running Cypher
+
+GRAPH_ETAGS = os.getenv("GRAPH_ETAGS", "true").lower() == "true"
+
+
+# Graph backend (graphapi/services/backends/): "neo4j" or "memory", an
+# embedded in-process graph loaded from / saved to GRAPH_SNAPSHOT_PATH
+# (one copy per worker: for edge deployments, tests and demos)
+
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+GRAPH_SNAPSHOT_PATH = os.getenv("GRAPH_SNAPSHOT_PATH", "")
+GRAPH_SNAPSHOT_AUTOSAVE = os.getenv("GRAPH_SNAPSHOT_AUTOSAVE", "false").lower() == "true"
+
+
+# Differential diagnosis (graphapi/services/diagnosis.py): top-k diseases
+# ranked over the INDICATES weights (numpy when installed). Missing weights
+# count DIAGNOSIS_DEFAULT_WEIGHT; DIAGNOSIS_PROFILE_WEIGHT blends in how much
+# of each disease's symptom profile the question covers
+
+DIAGNOSIS_TOP_K = int(os.getenv("DIAGNOSIS_TOP_K", 10))
+DIAGNOSIS_DEFAULT_WEIGHT = float(os.getenv("DIAGNOSIS_DEFAULT_WEIGHT", 0.5))
+DIAGNOSIS_PROFILE_WEIGHT = float(os.getenv("DIAGNOSIS_PROFILE_WEIGHT", 0.3))
+DIAGNOSIS_REFRESH_SECONDS = float(os.getenv("DIAGNOSIS_REFRESH_SECONDS", 300))
+
+
+# Latency metrics (graphapi/services/metrics.py): per endpoint / intent /
+# stage histograms served at /metrics (Prometheus text), Server-Timing header
+# with the stages of each response
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
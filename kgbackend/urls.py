@@ -17,8 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from graphapi.views import metrics_view
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/", include("graphapi.urls")),
+    path("metrics", metrics_view, name="metrics"),
    
 ]
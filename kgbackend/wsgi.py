@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kgbackend.settings')
 
 application = get_wsgi_application()
+
+# Server processes only: preload the service modules, optional warm-up
+from graphapi.services.startup import boot  # noqa: E402
+
+boot()